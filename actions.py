@@ -0,0 +1,143 @@
+# actions.py - batched moderation side-effects
+#
+# on_message does not call the API itself anymore, it queues actions here.
+# A worker drains the queue in short windows and per window
+#   - keeps one timeout per member (the longest) and skips members that are
+#     already timed out for at least that long
+#   - deletes messages per channel with bulk delete (up to 100 per call)
+#   - merges all notices for a channel into one message
+# API calls run with bounded concurrency. The queue is bounded too, so when the
+# worker falls behind the handlers wait in put() instead of piling up memory.
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from background import ensure_task
+
+logger = logging.getLogger("moana_bot")
+
+BULK_MAX = 100
+BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)  # discord refuses older messages
+MESSAGE_MAX = 2000
+
+
+class ModerationDispatcher:
+    def __init__(self, timeout_fn, window: float = 1.0, concurrency: int = 4, max_queue: int = 5000):
+        """timeout_fn(member, minutes, reason) is awaited for every timeout (try_timeout_member)."""
+        self.timeout_fn = timeout_fn
+        self.window = window
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self._sem = asyncio.Semaphore(concurrency)
+        self._active = {}  # (guild_id, member_id) -> monotonic time the timeout ends
+        self._worker = None
+        self.queued = 0
+        self.api_calls = 0
+
+    # producers ----------------------------------------------------------------
+
+    async def timeout(self, member, minutes: float, reason: str):
+        await self._put(("timeout", member, minutes, reason))
+
+    async def delete(self, message):
+        await self._put(("delete", message))
+
+    async def notice(self, channel, text: str):
+        await self._put(("notice", channel, text))
+
+    async def _put(self, item):
+        self.queued += 1
+        await self.queue.put(item)
+
+    # worker -------------------------------------------------------------------
+
+    def start(self):
+        """Start the worker."""
+        self._worker = ensure_task(self._worker, self._run)
+        return self._worker
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            await asyncio.sleep(self.window)  # let the rest of the wave arrive
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.flush(batch)
+            except Exception as e:
+                logger.exception("Moderation dispatcher flush failed: %s", e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def flush(self, batch):
+        """Coalesce a batch of queued actions and run the resulting API calls."""
+        now = time.monotonic()
+        self._active = {k: end for k, end in self._active.items() if end > now}
+
+        timeouts = {}  # key -> (member, minutes, reason)
+        deletes = {}   # channel id -> (channel, [messages])
+        notices = {}   # channel id -> (channel, [lines])
+        for item in batch:
+            kind = item[0]
+            if kind == "timeout":
+                _, member, minutes, reason = item
+                key = (member.guild.id, member.id)
+                if self._active.get(key, 0) >= now + minutes * 60:
+                    continue
+                if key not in timeouts or timeouts[key][1] < minutes:
+                    timeouts[key] = (member, minutes, reason)
+            elif kind == "delete":
+                message = item[1]
+                entry = deletes.setdefault(message.channel.id, (message.channel, {}))
+                entry[1][message.id] = message
+            elif kind == "notice":
+                _, channel, text = item
+                lines = notices.setdefault(channel.id, (channel, []))[1]
+                if text not in lines:
+                    lines.append(text)
+
+        calls = []
+        for key, (member, minutes, reason) in timeouts.items():
+            self._active[key] = now + minutes * 60
+            calls.append(self.timeout_fn(member, minutes, reason))
+        for channel, messages in deletes.values():
+            calls.extend(self._delete_calls(channel, list(messages.values())))
+        for channel, lines in notices.values():
+            for chunk in _chunks(lines, MESSAGE_MAX):
+                calls.append(channel.send(chunk))
+        if calls:
+            self.api_calls += len(calls)
+            await asyncio.gather(*(self._limited(c) for c in calls))
+
+    def _delete_calls(self, channel, messages):
+        cutoff = datetime.now(timezone.utc) - BULK_MAX_AGE
+        young = [m for m in messages if m.created_at > cutoff]
+        old = [m for m in messages if m.created_at <= cutoff]
+        calls = []
+        for i in range(0, len(young), BULK_MAX):
+            part = young[i:i + BULK_MAX]
+            calls.append(part[0].delete() if len(part) == 1 else channel.delete_messages(part))
+        calls.extend(m.delete() for m in old)
+        return calls
+
+    async def _limited(self, coro):
+        async with self._sem:
+            try:
+                await coro
+            except Exception as e:
+                logger.exception("Moderation action failed: %s", e)
+
+
+def _chunks(lines, limit):
+    """Join lines into messages of at most `limit` characters."""
+    chunk = ""
+    for line in lines:
+        line = line[:limit]
+        if chunk and len(chunk) + 1 + len(line) > limit:
+            yield chunk
+            chunk = ""
+        chunk = f"{chunk}\n{line}" if chunk else line
+    if chunk:
+        yield chunk
@@ -0,0 +1,283 @@
+# archive.py - compressed transcript archive with a full-text index
+#
+# When a ticket is closed, its transcript file is handed to TranscriptArchive,
+# which does everything else on its own thread: read the file back, gzip it
+# (when it is not compressed yet) and index it into a local SQLite database.
+# One row per ticket in `transcripts` (guild, owner, channel, date, file) and
+# one matching FTS5 row with the authors and the text of all messages, so
+# /transcript search is a single indexed query. Searches run on a second
+# thread with their own connection (WAL), so they never wait for indexing.
+# Transcripts older than the retention period are pruned (row and file) once
+# a day.
+
+import asyncio
+import gzip
+import html
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from background import ensure_task, open_db
+
+logger = logging.getLogger("moana_bot")
+
+# transcript file names: [guild id_]channel name_yyyymmddhhmmss.ext (older files have no guild id)
+_FILENAME = re.compile(r"^(?:(\d{15,20})_)?(.+?)_\d{14}\.")
+
+
+def parse_filename(name: str) -> tuple:
+    """(guild id or None, channel name) from a transcript file name."""
+    m = _FILENAME.match(name)
+    if m is None:
+        return None, name.split("_")[0]
+    return (int(m.group(1)) if m.group(1) else None), m.group(2)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id            INTEGER PRIMARY KEY,
+    guild_id      INTEGER NOT NULL,
+    channel_id    INTEGER,
+    owner_id      INTEGER,
+    channel_name  TEXT NOT NULL,
+    closed_at     REAL NOT NULL,
+    path          TEXT NOT NULL UNIQUE,
+    messages      INTEGER NOT NULL,
+    bytes         INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_guild ON transcripts (guild_id, closed_at);
+CREATE INDEX IF NOT EXISTS transcripts_owner ON transcripts (guild_id, owner_id, closed_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+    authors, content, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_TXT_LINE = re.compile(r"^\[[^\]]*\] (.*) \((\d+)\): (.*)$")
+_HTML_LINE = re.compile(r'<span class="a">(.*?)</span><span class="c">(.*?)</span>', re.S)
+
+
+class Hit(NamedTuple):
+    channel_name: str
+    owner_id: Optional[int]
+    closed_at: float
+    path: str
+    messages: int
+    snippet: str
+
+
+def read_messages(path: str):
+    """(author, author_id or None, content) for every message of a transcript file in any of the formats."""
+    opener = gzip.open if path.endswith(".gz") else open
+    name = path[:-3] if path.endswith(".gz") else path
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        if name.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    m = json.loads(line)
+                    yield m.get("author", ""), m.get("author_id"), m.get("content", "")
+        elif name.endswith(".html"):
+            for a, c in _HTML_LINE.findall(f.read()):
+                yield html.unescape(a), None, html.unescape(c)
+        else:
+            for line in f:
+                match = _TXT_LINE.match(line.rstrip("\n"))
+                if match:
+                    yield match.group(1), int(match.group(2)), match.group(3)
+
+
+def fts_query(text: str) -> str:
+    """User input as an FTS5 query: every word must occur, a word ending in * is a prefix."""
+    words = []
+    for w in text.split():
+        prefix = w.endswith("*")
+        w = w.rstrip("*")
+        if w:
+            words.append('"' + w.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(words)
+
+
+class TranscriptArchive:
+    def __init__(self, path: str, retention_days: Optional[float] = 365):
+        self.path = path
+        self.retention_days = retention_days
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        self._search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-search")
+        self._local = threading.local()  # one connection per thread
+        self._pending = set()  # futures of transcripts that are not indexed yet
+        self._pruner = None
+
+    async def _run(self, fn, *args, executor=None):
+        return await asyncio.get_running_loop().run_in_executor(executor or self._executor, fn, *args)
+
+    def _conn(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = open_db(self.path, SCHEMA)
+        return db
+
+    # indexing (archive thread) ------------------------------------------------
+
+    @staticmethod
+    def _compress(path: str) -> str:
+        if path.endswith(".gz"):
+            return path
+        with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+        return path + ".gz"
+
+    def _insert(self, guild_id: int, channel_id: Optional[int], owner_id: Optional[int], channel_name: str,
+                closed_at: float, path: str, messages: int, size: int, authors: str, content: str):
+        db = self._conn()
+        with db:
+            old = db.execute("SELECT id FROM transcripts WHERE path = ?", (path,)).fetchone()
+            if old:  # archived again (backfill after a crash)
+                db.execute("DELETE FROM transcripts_fts WHERE rowid = ?", old)
+            cur = db.execute(
+                "INSERT OR REPLACE INTO transcripts (guild_id, channel_id, owner_id, channel_name, closed_at, path, messages, bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (guild_id, channel_id, owner_id, channel_name, closed_at, path, messages, size))
+            db.execute("INSERT INTO transcripts_fts (rowid, authors, content) VALUES (?, ?, ?)",
+                       (cur.lastrowid, authors, content))
+
+    def _add(self, path: str, guild_id: int, channel_id: Optional[int], owner_id: Optional[int],
+             channel_name: str, closed_at: float):
+        authors = {}
+        lines = []
+        for author, author_id, content in read_messages(path):
+            authors[author_id or author] = author
+            lines.append(content)
+        path = self._compress(path)
+        content = "\n".join(lines)
+        names = " ".join(f"{name} {key}" if key != name else name for key, name in authors.items())
+        self._insert(guild_id, channel_id, owner_id, channel_name, closed_at, path,
+                     len(lines), len(content.encode("utf-8")), names, content)
+        return path
+
+    def submit(self, path: str, guild_id: int, channel_id: Optional[int] = None, owner_id: Optional[int] = None,
+               channel_name: str = "", closed_at: Optional[float] = None):
+        """Hand a transcript file to the archive thread. Returns at once, errors are logged."""
+        fut = self._executor.submit(self._add, path, guild_id, channel_id, owner_id,
+                                    channel_name or parse_filename(os.path.basename(path))[1],
+                                    closed_at or time.time())
+        self._pending.add(fut)
+        fut.add_done_callback(self._done)
+        return fut
+
+    def _done(self, fut):
+        self._pending.discard(fut)
+        e = fut.exception()
+        if e is not None:
+            logger.error("Archiving transcript failed: %s", e, exc_info=e)
+
+    def _backfill(self, folder: str, default_guild_id: Optional[int]) -> int:
+        known = {row[0] for row in self._conn().execute("SELECT path FROM transcripts")}
+        count = 0
+        for entry in os.scandir(folder):
+            path = entry.path
+            if not entry.is_file() or path in known or path + ".gz" in known or path.endswith(".tmp"):
+                continue
+            guild_id, channel_name = parse_filename(entry.name)
+            if guild_id is None:
+                guild_id = default_guild_id
+            if guild_id is None:
+                # filing it under the wrong guild would make it searchable by that guild's staff
+                logger.warning(f"Not archiving {path}: no guild id in the file name")
+                continue
+            try:
+                self._add(path, guild_id, None, None, channel_name, entry.stat().st_mtime)
+                count += 1
+            except Exception as e:
+                logger.warning(f"Could not archive {path}: {e}")
+        return count
+
+    async def backfill(self, folder: str, default_guild_id: Optional[int]) -> int:
+        """Archive transcript files that are not in the index yet (from before the archive existed).
+        Files without a guild id in their name go to default_guild_id, or are skipped when it is None."""
+        count = await self._run(self._backfill, folder, default_guild_id)
+        if count:
+            logger.info(f"Archived {count} existing transcripts from {folder}")
+        return count
+
+    # search ------------------------------------------------------------------
+
+    def _search(self, guild_id: int, text: str, owner_id: Optional[int], author_id: Optional[int],
+                since: Optional[float], limit: int) -> list:
+        db = self._conn()
+        where = ["t.guild_id = ?"]
+        params = [guild_id]
+        if owner_id:
+            where.append("t.owner_id = ?")
+            params.append(owner_id)
+        if since:
+            where.append("t.closed_at >= ?")
+            params.append(since)
+        match = fts_query(text)
+        if author_id:
+            match = f'authors : "{author_id}"' + (f" AND ({match})" if match else "")
+        if match:
+            sql = ("SELECT t.channel_name, t.owner_id, t.closed_at, t.path, t.messages, "
+                   "snippet(transcripts_fts, 1, '**', '**', '…', 12) "
+                   "FROM transcripts_fts JOIN transcripts t ON t.id = transcripts_fts.rowid "
+                   f"WHERE transcripts_fts MATCH ? AND {' AND '.join(where)} ORDER BY rank LIMIT ?")
+            params.insert(0, match)
+        else:
+            sql = ("SELECT t.channel_name, t.owner_id, t.closed_at, t.path, t.messages, '' FROM transcripts t "
+                   f"WHERE {' AND '.join(where)} ORDER BY t.closed_at DESC LIMIT ?")
+        params.append(limit)
+        return [Hit(*row) for row in db.execute(sql, params)]
+
+    async def search(self, guild_id: int, text: str = "", owner_id: Optional[int] = None,
+                     author_id: Optional[int] = None, since: Optional[float] = None, limit: int = 10) -> list:
+        """Transcripts of a guild matching all words of `text` (best match first), optionally filtered
+        by ticket owner, message author and close date. Without text the newest ones come first."""
+        return await self._run(self._search, guild_id, text, owner_id, author_id, since, limit,
+                               executor=self._search_executor)
+
+    # retention ---------------------------------------------------------------
+
+    def _prune(self, cutoff: float) -> int:
+        db = self._conn()
+        rows = db.execute("SELECT id, path FROM transcripts WHERE closed_at < ?", (cutoff,)).fetchall()
+        if not rows:
+            return 0
+        with db:
+            db.executemany("DELETE FROM transcripts_fts WHERE rowid = ?", [(r[0],) for r in rows])
+            db.executemany("DELETE FROM transcripts WHERE id = ?", [(r[0],) for r in rows])
+        for _, path in rows:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return len(rows)
+
+    async def prune(self) -> int:
+        """Delete transcripts (index rows and files) older than the retention period."""
+        if not self.retention_days:
+            return 0
+        count = await self._run(self._prune, time.time() - self.retention_days * 86400)
+        if count:
+            logger.info(f"Pruned {count} transcripts older than {self.retention_days} days")
+        return count
+
+    async def _prune_loop(self, interval: float):
+        while True:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.exception("Pruning transcripts failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def start_pruner(self, interval: float = 86400.0):
+        """Prune now and then every `interval` seconds."""
+        self._pruner = ensure_task(self._pruner, self._prune_loop, interval)
+        return self._pruner
+
+    async def flush(self):
+        """Wait until every submitted transcript is indexed."""
+        await self._run(lambda: None)  # one worker thread, so this runs after everything before it
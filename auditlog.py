@@ -0,0 +1,277 @@
+# auditlog.py - moderation and ticket events to the log channel, batched
+#
+# Commands and handlers call audit.event(...), which only builds the embed
+# payload and appends it to a queue: it never waits for Discord. A worker sends
+# the queue per log channel as messages of up to 10 embeds (and at most 6000
+# characters, Discord's limit per message). A channel is sent as soon as it has
+# 10 embeds waiting, everything else every `interval` seconds.
+#
+# When a send fails because of an outage (5xx, network errors, timeouts) the
+# embeds are appended to a JSONL spill file on the writer thread, and replayed
+# every `replay_interval` seconds, and at startup for events of the previous
+# run. Any other failure (403/404 for a channel the bot cannot see or write
+# to, 400 for an embed Discord refuses) would fail again, those events are
+# dropped and logged. When the queue is over `max_queue` new events are spilled
+# straight to the file, so memory stays bounded during an outage.
+#
+# A replay reads the spill file in order from an offset kept in memory and
+# stops at the first outage failure, leaving the rest of the file where it is:
+# an event is written to disk once, however long the outage lasts. (After a
+# crash during a replay the file is replayed from the start, so the part that
+# was already sent shows up twice.)
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+import aiohttp
+
+from background import ensure_task
+from embeds import LIMITS, PrebuiltEmbed
+
+logger = logging.getLogger("moana_bot")
+
+EMBEDS_PER_MESSAGE = 10
+CHARS_PER_MESSAGE = 6000
+REPLAY_CHUNK = 500       # spilled events read per step of a replay
+RED = 0xe74c3c
+ORANGE = 0xe67e22
+GREEN = 0x2ecc71
+
+
+def _cut(text, limit: int) -> str:
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _outage(e: Exception) -> bool:
+    """True when a send may work later: Discord 5xx, network errors, timeouts."""
+    status = getattr(e, "status", None)
+    if status is not None:
+        return status >= 500
+    return isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+
+def _size(payload: dict) -> int:
+    """Characters Discord counts towards the 6000 per message."""
+    n = len(payload.get("title", "")) + len(payload.get("description", ""))
+    n += len(payload.get("footer", {}).get("text", ""))
+    for f in payload.get("fields", ()):
+        n += len(f["name"]) + len(f["value"])
+    return n
+
+
+class AuditSink:
+    def __init__(self, channel_for, spill_path: str, color: int, footer: str, interval: float = 5.0,
+                 replay_interval: float = 60.0, max_queue: int = 5000):
+        """channel_for(guild_id) returns the log channel of a guild, or None."""
+        self.channel_for = channel_for
+        self.spill_path = spill_path
+        self.color = color
+        self.footer = footer
+        self.interval = interval
+        self.replay_interval = replay_interval
+        self.max_queue = max_queue
+        self.queue = deque()          # (guild_id, payload)
+        self.events = 0
+        self.messages = 0
+        self.spilled = 0
+        self.dropped = 0
+        self._wake = None             # asyncio.Event, set when a channel has a full message waiting
+        self._counts = {}             # guild_id -> queued events
+        self._replay_offset = 0       # bytes of the .replay file already sent (or dropped)
+        self._worker = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auditlog")
+
+    # producers ----------------------------------------------------------------
+
+    def event(self, guild_id: Optional[int], title: str, description: str = "", fields=(), color: Optional[int] = None,
+              user=None):
+        """Queue an audit embed. fields: (name, value) pairs. user: shown as author (mention and id)."""
+        if guild_id is None:
+            return
+        payload = {"type": "rich", "title": _cut(title, LIMITS["title"]), "color": self.color if color is None else color,
+                   "timestamp": datetime.now(timezone.utc).isoformat()}
+        if description:
+            payload["description"] = _cut(description, LIMITS["description"])
+        fields = [{"name": _cut(name, LIMITS["name"]), "value": _cut(value, LIMITS["value"]) or "\u200b",
+                   "inline": True} for name, value in fields]
+        if user is not None:
+            fields.append({"name": "Door", "value": f"{user.mention} ({user.id})", "inline": True})
+        if fields:
+            payload["fields"] = fields[:25]
+        if self.footer:
+            payload["footer"] = {"text": self.footer}
+        self.events += 1
+        if len(self.queue) >= self.max_queue:
+            self._spill([(guild_id, payload)])
+            return
+        self.queue.append((guild_id, payload))
+        n = self._counts[guild_id] = self._counts.get(guild_id, 0) + 1
+        if n >= EMBEDS_PER_MESSAGE and self._wake is not None:
+            self._wake.set()
+
+    # spill file (writer thread) -----------------------------------------------
+
+    def _append(self, entries):
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for guild_id, payload in entries:
+                    f.write(json.dumps({"guild_id": guild_id, "embed": payload}) + "\n")
+        except Exception as e:
+            logger.exception("Writing %d audit events to %s failed: %s", len(entries), self.spill_path, e)
+
+    def _read_spilled(self, offset: int, limit: int) -> list:
+        """Up to `limit` spilled events from `offset` on, as (end offset, guild_id, payload). At offset 0 the
+        spill file is moved aside first (events that fail meanwhile go to a new one)."""
+        replay = self.spill_path + ".replay"
+        if not os.path.exists(replay):
+            if offset or not os.path.exists(self.spill_path):
+                return []
+            os.replace(self.spill_path, replay)
+        entries = []
+        with open(replay, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                try:
+                    data = json.loads(line)
+                    entries.append((offset, data["guild_id"], data["embed"]))
+                except (ValueError, KeyError):
+                    continue  # a line cut off by a crash
+                if len(entries) >= limit:
+                    break
+        return entries
+
+    def _replayed(self):
+        try:
+            os.remove(self.spill_path + ".replay")
+        except FileNotFoundError:
+            pass
+
+    def _spill(self, entries):
+        self.spilled += len(entries)
+        self._executor.submit(self._append, list(entries))
+
+    # worker -------------------------------------------------------------------
+
+    def start(self):
+        """Start the worker."""
+        self._worker = ensure_task(self._worker, self._run)
+        return self._worker
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        last_replay = 0.0
+        # fixed deadline for the full flush: a guild that keeps filling messages wakes the worker
+        # before any timeout, that must not hold back the partial batches of other guilds or the replay
+        deadline = loop.time() + self.interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            full_only = loop.time() < deadline
+            if not full_only:
+                deadline = loop.time() + self.interval
+            try:
+                await self.flush(full_only)
+                if not full_only and loop.time() - last_replay >= self.replay_interval:
+                    last_replay = loop.time()
+                    await self.replay()
+            except Exception as e:
+                logger.exception("Audit log flush failed: %s", e)
+
+    def _messages(self, payloads):
+        """Split payloads into messages of at most 10 embeds and 6000 characters."""
+        batch, size = [], 0
+        for p in payloads:
+            n = _size(p)
+            if batch and (len(batch) >= EMBEDS_PER_MESSAGE or size + n > CHARS_PER_MESSAGE):
+                yield batch
+                batch, size = [], 0
+            batch.append(p)
+            size += n
+        if batch:
+            yield batch
+
+    async def flush(self, full_only: bool = False):
+        """Send the queue. full_only: only guilds with at least 10 embeds waiting, in full messages."""
+        by_guild = {}
+        keep = deque()
+        while self.queue:
+            guild_id, payload = self.queue.popleft()
+            by_guild.setdefault(guild_id, []).append(payload)
+        for guild_id, payloads in by_guild.items():
+            if full_only:
+                cut = len(payloads) - len(payloads) % EMBEDS_PER_MESSAGE
+                keep.extend((guild_id, p) for p in payloads[cut:])
+                payloads = payloads[:cut]
+            if payloads:
+                await self._send(guild_id, payloads)
+        self.queue.extendleft(reversed(keep))
+        self._counts = {}
+        for guild_id, _ in self.queue:
+            self._counts[guild_id] = self._counts.get(guild_id, 0) + 1
+
+    async def _deliver(self, channel, guild_id: int, batch: list) -> bool:
+        """Send one message. False on an outage (nothing sent, try again later); other failures
+        drop the batch."""
+        try:
+            await channel.send(embeds=[PrebuiltEmbed(p) for p in batch])
+            self.messages += 1
+        except Exception as e:
+            if _outage(e):
+                return False
+            self.dropped += len(batch)
+            logger.warning(f"Audit log send for guild {guild_id} failed, {len(batch)} events dropped: {e!r}")
+        return True
+
+    async def _send(self, guild_id: int, payloads: list):
+        channel = self.channel_for(guild_id)
+        if channel is None:
+            self.dropped += len(payloads)
+            return
+        messages = list(self._messages(payloads))
+        for i, batch in enumerate(messages):
+            if not await self._deliver(channel, guild_id, batch):
+                self._spill([(guild_id, p) for b in messages[i:] for p in b])
+                logger.warning(f"Audit log send for guild {guild_id} failed, "
+                               f"{sum(len(b) for b in messages[i:])} events spilled to disk")
+                return
+
+    async def replay(self) -> int:
+        """Send the events from the spill file, in order, until an outage failure.
+        Returns the amount sent (or dropped)."""
+        loop = asyncio.get_running_loop()
+        done = 0
+        while True:
+            entries = await loop.run_in_executor(self._executor, self._read_spilled, self._replay_offset,
+                                                 REPLAY_CHUNK)
+            if not entries:
+                if self._replay_offset:
+                    await loop.run_in_executor(self._executor, self._replayed)
+                    self._replay_offset = 0
+                    logger.info(f"Replayed {done} audit events from {self.spill_path}")
+                return done
+            # consecutive events of one guild go out together
+            for guild_id, group in itertools.groupby(entries, key=lambda e: e[1]):
+                group = list(group)
+                channel = self.channel_for(guild_id)
+                sent = 0
+                for batch in self._messages([payload for _, _, payload in group]):
+                    if channel is None:
+                        self.dropped += len(batch)
+                    elif not await self._deliver(channel, guild_id, batch):
+                        return done  # still down, the rest stays in the file
+                    sent += len(batch)
+                    done += len(batch)
+                    self._replay_offset = group[sent - 1][0]
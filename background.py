@@ -0,0 +1,26 @@
+# background.py - small helpers shared by the long-running parts of the bot
+#
+# Background tasks (sweepers, workers, watchers) are started from on_ready,
+# which fires again after every reconnect, so starting one must be a no-op
+# while it still runs. The local SQLite stores (tickets, bulk jobs, scheduler,
+# transcript archive) all open their database the same way: WAL, so readers do
+# not wait for the writer thread, synchronous=NORMAL, schema created on open.
+
+import asyncio
+import sqlite3
+
+
+def ensure_task(task, coro_fn, *args) -> asyncio.Task:
+    """`task` while it runs, else a new task for coro_fn(*args) on the running loop."""
+    if task is None or task.done():
+        task = asyncio.get_running_loop().create_task(coro_fn(*args))
+    return task
+
+
+def open_db(path: str, schema: str) -> sqlite3.Connection:
+    """Connect to a local SQLite store (WAL) and create its tables."""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(schema)
+    return db
@@ -0,0 +1,1179 @@
+# bench.py - offline microbenchmarks for the bot helpers
+# Run: python3 bench.py            (all benchmarks)
+#      python3 bench.py spam       (only one)
+# None of these need a Discord token or network.
+
+import asyncio
+import gc
+import logging
+import os
+import resource
+import sys
+import time
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+
+
+# keep the bot's log lines out of the benchmark output
+logging.getLogger("moana_bot").addHandler(logging.NullHandler())
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_spam(users: int = 100_000, rounds: int = 10):
+    """Messages/sec and memory of the spam limiter with `users` simulated users."""
+    from ratelimit import SpamLimiter
+
+    def old_path(tracker, uid, now, window=8, limit=6):
+        lst = tracker.get(uid, [])
+        lst = [t for t in lst if now - t < window]
+        lst.append(now)
+        tracker[uid] = lst
+        return len(lst) > limit
+
+    total = users * rounds
+
+    gc.collect()
+    tracemalloc.start()
+    old = {}
+    t0 = time.perf_counter()
+    for r in range(rounds):
+        now = time.monotonic()
+        for uid in range(users):
+            old_path(old, uid, now)
+    old_secs = time.perf_counter() - t0
+    old_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del old
+
+    gc.collect()
+    tracemalloc.start()
+    clock = [0.0]
+    limiter = SpamLimiter(6, 8, max_users=users, clock=lambda: clock[0])
+    t0 = time.perf_counter()
+    for r in range(rounds):
+        clock[0] = r * 0.5
+        for uid in range(users):
+            limiter.hit(uid)
+    new_secs = time.perf_counter() - t0
+    new_mem = tracemalloc.get_traced_memory()[0]
+    # everyone goes quiet: the old dict keeps all lists, the limiter sweeps them
+    clock[0] += 60
+    limiter.sweep()
+    swept_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"spam: {users} users x {rounds} msgs")
+    print(f"  dict+list   {total / old_secs:>12,.0f} msg/s  {old_mem / 1e6:8.1f} MB (never shrinks)")
+    print(f"  SpamLimiter {total / new_secs:>12,.0f} msg/s  {new_mem / 1e6:8.1f} MB, {swept_mem / 1e6:.1f} MB after sweep")
+    print(f"  max rss {_rss_mb():.1f} MB")
+
+
+class _FakeUser:
+    def __init__(self, uid):
+        self.id = uid
+        self.bot = False
+
+    def __str__(self):
+        return f"user{self.id}#0001"
+
+
+class _FakeMessage:
+    def __init__(self, mid, author, content):
+        self.id = mid
+        self.author = author
+        self.content = content
+        self.created_at = datetime.utcnow()
+        self.attachments = ()
+
+
+class _FakeHistoryChannel:
+    """Channel whose history is generated lazily, page by page like the real API."""
+
+    def __init__(self, name, count):
+        self.name = name
+        self.count = count
+        self._users = [_FakeUser(i) for i in range(50)]
+
+    async def history(self, limit=None, oldest_first=False):
+        n = self.count if limit is None else min(limit, self.count)
+        for i in range(n):
+            if i % 100 == 0:
+                await asyncio.sleep(0)  # a page fetch
+            yield _FakeMessage(i, self._users[i % 50], f"bericht {i} " + "lorem ipsum " * 8)
+
+
+async def _lag_probe(stop, interval=0.005):
+    """Max overshoot of a short sleep while something else runs on the loop."""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - t0 - interval)
+    return worst
+
+
+def bench_transcript(messages: int = 50_000):
+    """Peak memory and event-loop lag of saving a transcript of a mocked channel."""
+    from transcripts import save_transcript
+
+    async def old_save(channel, folder):
+        msgs = []
+        async for m in channel.history(limit=None, oldest_first=True):
+            t = m.created_at.strftime("%Y-%m-%d %H:%M:%S")
+            msgs.append(f"[{t}] {m.author} ({m.author.id}): {m.content}")
+        with open(os.path.join(folder, "old.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(msgs))
+
+    async def run(label, coro_fn):
+        channel = _FakeHistoryChannel("ticket-bench", messages)
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_lag_probe(stop))
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        await coro_fn(channel)
+        secs = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        stop.set()
+        lag = await probe
+        print(f"  {label:<16} {secs:6.2f}s  peak {peak / 1e6:7.1f} MB  max loop lag {lag * 1000:7.1f} ms")
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"transcript: {messages} messages")
+
+        async def main():
+            await run("list+join", lambda ch: old_save(ch, folder))
+            for fmt in ("txt", "jsonl", "html"):
+                await run(f"stream {fmt}", lambda ch: save_transcript(ch, fmt=fmt, folder=folder))
+            await run("stream txt.gz", lambda ch: save_transcript(ch, compress=True, folder=folder))
+
+        asyncio.run(main())
+
+
+def bench_archive(tickets: int = 20_000, messages: int = 30, queries: int = 200):
+    """Index rate, size and search latency of the transcript archive with `tickets` closed tickets."""
+    import random
+    from archive import TranscriptArchive
+
+    rnd = random.Random(1)
+    words = ["script", "werkt", "niet", "prijs", "garage", "update", "crash", "fout", "betaling", "license",
+             "hallo", "bedankt", "vraag", "server", "esx", "qbcore", "menu", "auto", "huis", "wapen"]
+    words += [f"woord{i}" for i in range(2000)]  # long tail vocabulary
+    users = [(f"user{i}#0001", 10 ** 17 + i) for i in range(5000)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        archive = TranscriptArchive(os.path.join(folder, "archive.db"))
+        t0 = time.perf_counter()
+        now = time.time()
+        for i in range(tickets):
+            owner = rnd.choice(users)
+            staff = rnd.choice(users[:20])
+            lines = [" ".join(rnd.choices(words, k=rnd.randint(3, 15))) for _ in range(messages)]
+            archive._insert(1, i, owner[1], f"ticket-{owner[0][:-5]}", now - rnd.random() * 300 * 86400,
+                            f"{folder}/t{i}.txt.gz", messages, 0,
+                            f"{owner[0]} {owner[1]} {staff[0]} {staff[1]}", "\n".join(lines))
+        index_secs = time.perf_counter() - t0
+        size = os.path.getsize(os.path.join(folder, "archive.db")) + os.path.getsize(os.path.join(folder, "archive.db-wal"))
+        print(f"archive: {tickets} tickets x {messages} messages")
+        print(f"  index       {tickets / index_secs:10,.0f} tickets/s   db {size / 1e6:.1f} MB")
+
+        async def main():
+            cases = {
+                "common word": lambda: ("script", None, None),
+                "two words": lambda: (f"{rnd.choice(words[:20])} {rnd.choice(words[20:])}", None, None),
+                "rare word": lambda: (rnd.choice(words[20:]), None, None),
+                "prefix": lambda: ("woord12*", None, None),
+                "owner only": lambda: ("", rnd.choice(users)[1], None),
+                "author+word": lambda: ("crash", None, rnd.choice(users[:20])[1]),
+            }
+            for label, make in cases.items():
+                times = []
+                for _ in range(queries):
+                    text, owner, author = make()
+                    t = time.perf_counter()
+                    await archive.search(1, text, owner_id=owner, author_id=author)
+                    times.append((time.perf_counter() - t) * 1000)
+                times.sort()
+                print(f"  {label:<12} p50 {times[len(times) // 2]:7.2f} ms   p95 {times[int(len(times) * 0.95)]:7.2f} ms")
+
+            # what the close handler pays on the event loop
+            path = os.path.join(folder, "ticket-x_1.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                for i in range(2000):
+                    f.write(f"[2025-01-01 10:00:00] user{i % 7}#0001 ({i % 7}): bericht {i} over een script\n")
+            await archive.flush()  # archive thread is running already in the bot
+            t = time.perf_counter()
+            archive.submit(path, 1, 1, 1, "ticket-x")
+            submit_us = (time.perf_counter() - t) * 1e6
+            t = time.perf_counter()
+            await archive.flush()
+            print(f"  close path  submit {submit_us:.0f} us on the loop, 2000-message transcript "
+                  f"gzipped+indexed in {(time.perf_counter() - t) * 1000:.0f} ms on the archive thread")
+
+        asyncio.run(main())
+
+
+def bench_embeds(renders: int = 50_000):
+    """Building embeds with nextcord.Embed per response vs the compiled templates (needs nextcord)."""
+    try:
+        import nextcord
+    except ImportError:
+        print("embeds: skipped, nextcord not installed")
+        return
+    from embeds import EmbedTemplates
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    blue, footer = 0x3498db, "Moana Scripts - 2025"
+    templates = EmbedTemplates(os.path.join(here, "embeds.json"), blue, footer)
+    templates.load()
+    intro = templates.templates["ticket_intro"].payload["description"]
+
+    def old_review():
+        embed = nextcord.Embed(title="⭐ Nieuwe Review", color=blue)
+        embed.add_field(name="Product", value="Moana Hub", inline=False)
+        embed.add_field(name="Product Sterren", value="5", inline=True)
+        embed.add_field(name="Service Sterren", value="4", inline=True)
+        embed.add_field(name="Reviewer", value="<@1234>", inline=False)
+        embed.add_field(name="Opmerking", value="" or "Geen extra opmerking.", inline=False)
+        embed.set_footer(text=footer)
+        return embed
+
+    def new_review():
+        return templates.render("review", product="Moana Hub", stars="5", service="4", reviewer="<@1234>", message="")
+
+    def old_ticket():
+        embed = nextcord.Embed(title="Ticket voor user#1", description=intro.format(mention="<@1234>"), color=blue)
+        embed.add_field(name="Gebruiker", value="<@1234>", inline=True)
+        embed.add_field(name="Status", value="Open", inline=True)
+        embed.set_footer(text=footer)
+        return embed
+
+    def new_ticket():
+        return templates.render("ticket_intro", member="user#1", mention="<@1234>")
+
+    def old_panel():
+        embed = nextcord.Embed(title="🎫 Ticket Panel", description="Klik op de knop hieronder om een ticket te openen.\nOnze staff helpt je zo snel mogelijk!", color=blue)
+        embed.set_footer(text=footer)
+        return embed
+
+    def new_panel():
+        return templates.render("ticket_panel")
+
+    print(f"embeds: {renders:,} renders each, build + to_dict() (what nextcord does on send)")
+    for name, old, new in (("review", old_review, new_review), ("ticket intro", old_ticket, new_ticket),
+                           ("panel (static)", old_panel, new_panel)):
+        assert old().to_dict() == new().to_dict(), name
+        row = []
+        for fn in (old, new):
+            t0 = time.perf_counter()
+            for _ in range(renders):
+                fn().to_dict()
+            us = (time.perf_counter() - t0) / renders * 1e6
+            gc.collect()
+            tracemalloc.start()
+            keep = [fn().to_dict() for _ in range(1000)]
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del keep
+            row.append(f"{us:6.2f} us {size / 1000:6.0f} B")
+        print(f"  {name:<15} nextcord.Embed {row[0]}   template {row[1]}")
+
+
+def bench_stats(calls: int = 200_000):
+    """Overhead of the Stats.timed wrapper around an async handler."""
+    from stats import Stats
+
+    async def handler(x):
+        return x
+
+    timed = Stats().timed("bench")(handler)
+
+    async def loop(fn):
+        t0 = time.perf_counter()
+        for i in range(calls):
+            await fn(i)
+        return time.perf_counter() - t0
+
+    async def main():
+        bare = await loop(handler)
+        wrapped = await loop(timed)
+        per_call = (wrapped - bare) / calls * 1e6
+        print(f"stats: {calls} awaited calls")
+        print(f"  bare   {bare * 1e6 / calls:6.2f} us/call")
+        print(f"  timed  {wrapped * 1e6 / calls:6.2f} us/call  (+{per_call:.2f} us overhead)")
+
+    asyncio.run(main())
+
+
+def bench_rules(words: int = 10_000, messages: int = 20_000):
+    """Throughput of the rule engine with `words` banned words/phrases vs a naive loop."""
+    import random
+    from rules import CompiledRules
+
+    rnd = random.Random(1)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+
+    def word(n):
+        return "".join(rnd.choice(alphabet) for _ in range(n))
+
+    banned = [word(rnd.randint(5, 10)) for _ in range(words)]
+    banned += [f"{word(4)} {word(5)}" for _ in range(words // 10)]
+    domains = [f"{word(6)}.com" for _ in range(words // 10)]
+    vocab = [word(rnd.randint(2, 9)) for _ in range(5000)]
+    corpus = []
+    for i in range(messages):
+        parts = [rnd.choice(vocab) for _ in range(rnd.randint(3, 25))]
+        if i % 50 == 0:
+            parts.append(rnd.choice(banned))
+        if i % 40 == 0:
+            parts.append(f"https://{rnd.choice(domains)}/x")
+        corpus.append(" ".join(parts))
+
+    cfg = {"words": {"banned": banned}, "links": {"block_unknown": False, "deny": domains}, "caps": {"enabled": False}}
+    t0 = time.perf_counter()
+    rules = CompiledRules(cfg)
+    compile_secs = time.perf_counter() - t0
+
+    def naive(content):
+        # one sequential branch per rule, like adding more `if` checks to on_message
+        lowered = content.lower()
+        for w in banned:
+            if w in lowered:
+                return w
+        for d in domains:
+            if d in lowered:
+                return d
+        return None
+
+    sample = corpus[:2000]
+    t0 = time.perf_counter()
+    for c in sample:
+        naive(c)
+    naive_rate = len(sample) / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    hits = sum(1 for c in corpus if rules.check(c))
+    rate = len(corpus) / (time.perf_counter() - t0)
+
+    print(f"rules: {len(banned)} words/phrases, {len(domains)} denied domains, {messages} messages")
+    print(f"  compile        {compile_secs * 1000:8.1f} ms")
+    print(f"  naive loop     {naive_rate:>10,.0f} msg/s (first {len(sample)} messages)")
+    print(f"  CompiledRules  {rate:>10,.0f} msg/s ({hits} hits)")
+
+
+def bench_perms(members: int = 2000, roles_per_member: int = 150, rounds: int = 20):
+    """Old is_staff (get_role + `in member.roles`) vs the PermissionCache."""
+    from perms import PermissionCache
+
+    class Role:
+        def __init__(self, rid):
+            self.id = rid
+
+    class Perms:
+        manage_messages = False
+        administrator = False
+
+    roles = [Role(i) for i in range(1, 301)]
+    staff_role = roles[-1]
+
+    class Guild:
+        id = 1
+
+        def get_role(self, rid):
+            return staff_role if rid == staff_role.id else None
+
+    class Member:
+        def __init__(self, mid):
+            self.id = mid
+            self.guild = guild
+
+        @property
+        def roles(self):
+            # like nextcord: a new list on every access
+            return [roles[(self.id + i) % 299] for i in range(roles_per_member)]
+
+        @property
+        def guild_permissions(self):
+            return Perms()
+
+    guild = Guild()
+    people = [Member(i) for i in range(members)]
+
+    def old_is_staff(member):
+        if member.guild.get_role(staff_role.id) in member.roles:
+            return True
+        return member.guild_permissions.manage_messages
+
+    tiers = {staff_role.id: "staff"}
+    cache = PermissionCache(lambda guild_id: tiers)
+    total = members * rounds
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for m in people:
+            old_is_staff(m)
+    old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for m in people:
+            cache.has(m)
+    new = time.perf_counter() - t0
+
+    print(f"perms: {members} members with {roles_per_member} roles, {rounds} checks each")
+    print(f"  get_role + roles scan {total / old:>12,.0f} checks/s")
+    print(f"  PermissionCache       {total / new:>12,.0f} checks/s ({cache.hits} hits, {cache.misses} misses)")
+
+
+class _FakeRest:
+    """Counts API calls made on the fake objects below, with a small fake latency."""
+
+    def __init__(self, latency: float = 0.002):
+        self.calls = {}
+        self.latency = latency
+
+    async def call(self, route):
+        self.calls[route] = self.calls.get(route, 0) + 1
+        await asyncio.sleep(self.latency)
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+
+class _FakeGuild:
+    def __init__(self, gid=1):
+        self.id = gid
+
+
+class _FakeMember(_FakeUser):
+    def __init__(self, uid, guild, rest):
+        super().__init__(uid)
+        self.guild = guild
+        self.rest = rest
+        self.mention = f"<@{uid}>"
+
+    async def timeout(self, until, reason=None):
+        await self.rest.call("PATCH /guilds/{guild_id}/members/{user_id}")
+
+
+class _FakeChannel:
+    def __init__(self, cid, rest):
+        self.id = cid
+        self.rest = rest
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("POST /channels/{channel_id}/messages")
+
+    async def delete_messages(self, messages):
+        await self.rest.call("POST /channels/{channel_id}/messages/bulk-delete")
+
+
+class _FakeChannelMessage(_FakeMessage):
+    def __init__(self, mid, author, content, channel):
+        super().__init__(mid, author, content)
+        self.channel = channel
+        self.created_at = datetime.now(timezone.utc)
+
+    async def delete(self):
+        await self.channel.rest.call("DELETE /channels/{channel_id}/messages/{message_id}")
+
+
+def bench_actions(messages: int = 500, raiders: int = 50, channels: int = 3):
+    """API calls for a flood of rule-breaking messages: direct calls vs ModerationDispatcher."""
+    from actions import ModerationDispatcher
+
+    async def timeout_fn(member, minutes, reason):
+        await member.timeout(None, reason=reason)
+
+    def flood(rest):
+        guild = _FakeGuild()
+        members = [_FakeMember(1000 + i, guild, rest) for i in range(raiders)]
+        chans = [_FakeChannel(i, rest) for i in range(channels)]
+        return [_FakeChannelMessage(i, members[i % raiders], "https://spam.example", chans[i % channels])
+                for i in range(messages)]
+
+    async def direct():
+        rest = _FakeRest()
+        t0 = time.perf_counter()
+        for m in flood(rest):
+            await m.delete()
+            await timeout_fn(m.author, 5, "link")
+            await m.channel.send(f"{m.author.mention} is tijdelijk gemute.")
+        return rest, time.perf_counter() - t0
+
+    async def batched():
+        rest = _FakeRest()
+        dispatcher = ModerationDispatcher(timeout_fn, window=0.05, concurrency=4)
+        dispatcher.start()
+        t0 = time.perf_counter()
+        for m in flood(rest):
+            await dispatcher.delete(m)
+            await dispatcher.timeout(m.author, 5, "link")
+            await dispatcher.notice(m.channel, f"{m.author.mention} is tijdelijk gemute.")
+        await dispatcher.queue.join()
+        return rest, time.perf_counter() - t0
+
+    async def main():
+        print(f"actions: {messages} offending messages from {raiders} accounts in {channels} channels")
+        for label, fn in (("direct", direct), ("dispatcher", batched)):
+            rest, secs = await fn()
+            detail = ", ".join(f"{n} {route.split()[0]} {route.split('/')[-1]}" for route, n in sorted(rest.calls.items()))
+            print(f"  {label:<11} {rest.total:5} API calls in {secs:5.2f}s  ({detail})")
+
+    asyncio.run(main())
+
+
+class _RateLimited(Exception):
+    status = 429
+
+    def __init__(self, retry_after):
+        super().__init__(f"429, retry after {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class _MockRoute:
+    """One REST route with a Discord-like bucket: `limit` requests per `per` seconds, more gets a 429.
+    `storm` is the chance of a 429 anyway (shared/global limits)."""
+
+    def __init__(self, limit: int, per: float, latency: float, storm: float, seed: int = 1):
+        import random
+        self.limit = limit
+        self.per = per
+        self.latency = latency
+        self.storm = storm
+        self.rnd = random.Random(seed)
+        self.used = 0
+        self.reset = 0.0
+        self.requests = 0
+        self.limited = 0
+        self.ok = set()
+
+    async def __call__(self, uid):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        if now >= self.reset:
+            self.reset, self.used = now + self.per, 0
+        if self.used >= self.limit:
+            self.limited += 1
+            raise _RateLimited(self.reset - now)
+        if self.rnd.random() < self.storm:
+            self.limited += 1
+            raise _RateLimited(self.per)
+        self.used += 1
+        self.ok.add(uid)
+
+
+def bench_bulk(targets: int = 500, limit: int = 10, per: float = 0.2, latency: float = 0.03, storm: float = 0.02):
+    """/massban style job against a mock route with 429s: unbounded gather, 4 workers, BulkRunner."""
+    from bulk import BulkRunner
+
+    ids = list(range(10**17, 10**17 + targets))
+
+    async def retrying(route, uid):
+        while True:
+            try:
+                return await route(uid)
+            except _RateLimited as e:
+                await asyncio.sleep(e.retry_after)
+
+    async def unbounded(route):
+        await asyncio.gather(*(retrying(route, uid) for uid in ids))
+
+    async def workers(route):
+        sem = asyncio.Semaphore(4)
+
+        async def one(uid):
+            async with sem:
+                await retrying(route, uid)
+        await asyncio.gather(*(one(uid) for uid in ids))
+
+    async def runner(route):
+        with tempfile.TemporaryDirectory() as tmp:
+            bulk = BulkRunner(os.path.join(tmp, "bulk.db"), concurrency=4, rate=10.0,
+                              max_rate=limit / per, progress_interval=0.5)
+            job = await bulk.create(1, "ban", {}, ids)
+            await bulk.run(job, route)
+            bulk.flush()
+
+    async def main():
+        print(f"bulk: {targets} bans, route limit {limit}/{per}s ({limit / per:.0f}/s), "
+              f"{latency * 1000:.0f}ms latency, {storm:.0%} extra 429s")
+        for label, fn in (("unbounded", unbounded), ("4 workers", workers), ("BulkRunner", runner)):
+            route = _MockRoute(limit, per, latency, storm)
+            t0 = time.perf_counter()
+            await fn(route)
+            secs = time.perf_counter() - t0
+            print(f"  {label:<11} {len(route.ok) / secs:6.1f} bans/s  {secs:6.2f}s  {route.requests:6} requests"
+                  f"  {route.limited:6} x 429  ({len(route.ok)} done)")
+
+    asyncio.run(main())
+
+
+def bench_joins(joins: int = 1000, seconds: float = 60.0, speedup: float = 100.0):
+    """1000 joins in 60s: per-join welcomes vs JoinPipeline (time runs `speedup` times faster)."""
+    from joins import JoinPipeline
+
+    scale = 1 / speedup
+    interval = seconds / joins * scale
+
+    class Guild(_FakeGuild):
+        member_count = 5000
+
+    async def run(label, make_pipeline):
+        rest = _FakeRest(latency=0.0005)
+        guild = Guild()
+        members = [_FakeMember(i, guild, rest) for i in range(joins)]
+        channel = _FakeChannel(1, rest)
+        joined = {}
+        latencies = []
+        loop = asyncio.get_running_loop()
+
+        async def welcome(batch):
+            await channel.send()
+            done = loop.time()
+            latencies.extend((done - joined[m.id]) / scale for m in batch)
+
+        async def quarantine(member):
+            await rest.call("PUT /guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+
+        pipeline = make_pipeline(welcome, quarantine)
+        t0 = loop.time()
+        for i, m in enumerate(members):
+            await asyncio.sleep(max(0.0, t0 + i * interval - loop.time()))
+            joined[m.id] = loop.time()
+            if pipeline is None:
+                await welcome([m])
+            else:
+                pipeline.add(m)
+        await asyncio.sleep(5 * scale + 0.05)  # let the last window flush
+        await asyncio.gather(*getattr(pipeline, "_tasks", ()))
+        sends = rest.calls.get("POST /channels/{channel_id}/messages", 0)
+        quarantined = rest.total - sends
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+        print(f"  {label:<22} {sends:5} welcome sends  {quarantined:5} quarantined  "
+              f"welcome latency p50 {p50:5.2f}s p99 {p99:5.2f}s")
+
+    async def main():
+        print(f"joins: {joins} joins in {seconds:.0f}s (simulated {speedup:.0f}x faster)")
+        await run("per-join send", lambda w, q: None)
+        await run("batched, no raid mode", lambda w, q: JoinPipeline(
+            w, q, window=3 * scale, raid_joins=10 ** 9, raid_window=10 * scale))
+        await run("batched + raid mode", lambda w, q: JoinPipeline(
+            w, q, window=3 * scale, raid_joins=10, raid_window=10 * scale, raid_cooldown=120 * scale))
+
+    asyncio.run(main())
+
+
+def bench_guilds(guilds: int = 1000, members: int = 50, events: int = 20):
+    """Memory per guild in multi-guild mode: config registry plus per-guild handler state."""
+    import json
+    from guildconfig import GuildConfigRegistry
+    from joins import JoinPipeline
+    from perms import PermissionCache
+    from ratelimit import SpamLimiter
+
+    class Perms:
+        manage_messages = False
+        administrator = False
+
+    class Role:
+        def __init__(self, rid):
+            self.id = rid
+
+    class Member(_FakeUser):
+        def __init__(self, uid, guild):
+            super().__init__(uid)
+            self.guild = guild
+            self.roles = [Role(guild.id * 10 + 1)]
+            self.guild_permissions = Perms()
+
+    async def main():
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "guilds.json")
+            data = {"defaults": {}, "guilds": {
+                str(g): {"welcome_channel": g * 10 + 2, "ticket_category": g * 10 + 3, "staff_role": g * 10 + 1,
+                         "log_channel": g * 10 + 4} for g in range(1, guilds + 1)}}
+            with open(path, "w") as f:
+                json.dump(data, f)
+
+            gc.collect()
+            tracemalloc.start()
+            registry = GuildConfigRegistry(path)
+            t0 = time.perf_counter()
+            registry.load()
+            load_ms = (time.perf_counter() - t0) * 1000
+            config_mem = tracemalloc.get_traced_memory()[0]
+
+            spam = SpamLimiter(6, 8, max_users=guilds * members)
+            perms = PermissionCache(lambda gid: registry.get(gid).staff_tiers)
+
+            async def nothing(*args):
+                pass
+
+            joins = JoinPipeline(nothing, nothing, window=0.01)
+            guild_objs = [_FakeGuild(g) for g in range(1, guilds + 1)]
+            people = [[Member(g.id * 100000 + i, g) for i in range(members)] for g in guild_objs]
+            base = tracemalloc.get_traced_memory()[0]
+
+            # mocked gateway traffic: messages (spam + perms + config lookups) and joins
+            t0 = time.perf_counter()
+            n = 0
+            for _ in range(events):
+                for g, ms in zip(guild_objs, people):
+                    for m in ms:
+                        spam.hit((g.id, m.id))
+                        perms.has(m)
+                        registry.get(g.id).welcome_channel
+                        n += 1
+            for g, ms in zip(guild_objs, people):
+                joins.add(ms[0])
+            secs = time.perf_counter() - t0
+            await asyncio.sleep(0.05)
+            state_mem = tracemalloc.get_traced_memory()[0] - base
+            tracemalloc.stop()
+
+        print(f"guilds: {guilds} guilds, {members} active members each, {n} message events")
+        print(f"  config load    {load_ms:8.1f} ms   {config_mem / guilds / 1024:6.2f} KiB/guild")
+        print(f"  handler state  {n / secs:>10,.0f} events/s   {state_mem / guilds / 1024:6.2f} KiB/guild")
+
+    asyncio.run(main())
+
+
+_STARTUP_RUN = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import nextcord
+t_nextcord = time.perf_counter() - t0
+sys.path.insert(0, sys.argv[1])
+import main
+t_import = time.perf_counter() - t0
+bot = main.bot
+syncs = []
+
+async def sync_all_application_commands(*args, **kwargs):
+    syncs.append(len(bot.get_all_application_commands()))
+
+async def start():
+    bot.sync_all_application_commands = sync_all_application_commands
+    bot._connection.application_id = 1
+    await bot.on_connect()
+    bot.dispatch("ready")
+    tickets = bot.get_cog("Tickets")
+    while not tickets.views_added:
+        await asyncio.sleep(0.001)
+
+asyncio.run(start())
+t_ready = time.perf_counter() - t0
+print(json.dumps({"nextcord": t_nextcord, "import": t_import, "ready": t_ready, "syncs": len(syncs),
+                  "commands": len(bot.get_all_application_commands()),
+                  "forms_modals_loaded": "cogs.forms_modals" in sys.modules}))
+"""
+
+
+def bench_startup(restarts: int = 3):
+    """Import time, time to ready and command syncs for a few restarts (needs nextcord)."""
+    import json
+    import shutil
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="moana-startup-")
+    for name in ("rules.json", "guilds.json", "embeds.json"):
+        if os.path.exists(os.path.join(here, name)):
+            shutil.copy(os.path.join(here, name), workdir)
+    env = dict(os.environ, TOKEN="bench")
+    env.pop("FORCE_COMMAND_SYNC", None)
+    print(f"startup: {restarts} restarts, gateway and REST faked")
+    try:
+        for i in range(restarts):
+            proc = subprocess.run([sys.executable, "-c", _STARTUP_RUN, here], cwd=workdir, env=env,
+                                  capture_output=True, text=True)
+            if proc.returncode:
+                print("  skipped: " + (proc.stderr.strip().splitlines() or ["failed"])[-1])
+                return
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"  restart {i + 1}: import {r['import'] * 1000:6.0f} ms (nextcord {r['nextcord'] * 1000:4.0f} ms)"
+                  f"   ready {r['ready'] * 1000:6.0f} ms   syncs {r['syncs']}   commands {r['commands']}"
+                  f"   forms modals loaded: {r['forms_modals_loaded']}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_members(members: int = 100_000, roles: int = 50, lookups: int = 200):
+    """Memory of `members` cached nextcord Members vs MemberSnapshots, and /roleinfo counting (needs nextcord)."""
+    try:
+        import nextcord
+    except ImportError:
+        print("members: skipped, nextcord not installed")
+        return
+    from members import MemberSnapshot, MemberStore
+
+    role_data = [{"id": str(r), "name": f"rol{r}", "permissions": "0", "position": r, "color": 0,
+                  "hoist": False, "managed": False, "mentionable": False} for r in range(2, roles + 2)]
+    guild_data = {"id": "1", "name": "bench", "roles": role_data, "member_count": members}
+
+    def payload(i):
+        return {"user": {"id": str(10**17 + i), "username": f"user{i}", "discriminator": "0",
+                         "avatar": f"{i:032x}", "global_name": None},
+                "roles": [str(2 + i % roles), str(2 + (i + 1 + i // roles % (roles - 1)) % roles)],
+                "joined_at": "2024-05-01T12:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+
+    # full cache: what nextcord keeps after chunking (Member + its User in the state). The client gets its
+    # own loop: earlier benchmarks' asyncio.run() leave no current one behind
+    loop = asyncio.new_event_loop()
+    client = nextcord.Client(intents=nextcord.Intents.all(), loop=loop)
+    gc.collect()
+    tracemalloc.start()
+    guild = nextcord.Guild(data=guild_data, state=client._connection)
+    for i in range(members):
+        guild._add_member(nextcord.Member(data=payload(i), guild=guild, state=client._connection))
+    full, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    gc.collect()
+    tracemalloc.start()
+    store = MemberStore(compact=True)
+    store._role_counts[guild.id] = {}
+    for i in range(members):
+        data = payload(i)
+        store.add(guild.id, MemberSnapshot.from_payload(data, store._roles(int(r) for r in data["roles"])))
+    compact, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"members: {members:,} members, {roles} roles")
+    print(f"  nextcord member cache {full / 2**20:8.1f} MiB ({full / members:5.0f} B/member)")
+    print(f"  compact snapshots     {compact / 2**20:8.1f} MiB ({compact / members:5.0f} B/member)")
+
+    role = guild.get_role(2)
+    t0 = time.perf_counter()
+    for _ in range(lookups // 20):
+        n_scan = len(role.members)
+    scan = (time.perf_counter() - t0) / (lookups // 20)
+    t0 = time.perf_counter()
+    for _ in range(lookups):
+        n_count = store.role_count(guild.id, role.id)
+    count = (time.perf_counter() - t0) / lookups
+    print(f"  /roleinfo count: len(role.members) {scan * 1000:8.2f} ms   role_count {count * 1e6:6.2f} us"
+          f"   ({n_scan} == {n_count})")
+    loop.close()
+
+
+class _DupeMessage:
+    __slots__ = ("guild", "channel", "author", "content", "raid")
+
+    def __init__(self, guild, channel, author, content, raid):
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.raid = raid  # raid wave number, None for normal chat
+
+
+def _raid_corpus(messages: int, guilds: int, raids: int, raid_size: int, seconds: float, seed: int = 7):
+    """Normal chat with copy-paste raid waves mixed in: [(time, message)] in time order."""
+    import random
+    rnd = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    # frequent words are short, like in real chat
+    vocab = sorted(("".join(rnd.choice(letters) for _ in range(rnd.randint(2, 9))) for _ in range(3000)), key=len)
+    cum, total = [], 0.0
+    for i in range(len(vocab)):
+        total += 1 / (i + 1)  # zipf-ish, like real chat
+        cum.append(total)
+    replies = ("ok", "haha", "thanks", "ja", "nee", "lol", "goedemorgen", "welkom!", "gg")
+    guild_objs = [_FakeGuild(g) for g in range(1, guilds + 1)]
+    channels = {g.id: [_FakeGuild(g.id * 1000 + c) for c in range(20)] for g in guild_objs}
+    users = [_FakeUser(i) for i in range(20000)]
+    templates = [
+        "FREE NITRO for everyone who joins in the next hour, claim it here https://dlscord-gift.example/claim",
+        "@everyone this server is getting raided, join our new server instead discord.gg/xyz123abc",
+        "selling cheap accounts and scripts dm me for prices, fast delivery and lots of vouches",
+        "check out my new video about the best free scripts 2025 https://youtu.example/watch?v=abc",
+        "congratulations you won a steam gift card, log in with your account to receive it now",
+    ]
+
+    def mutate(text):
+        r = rnd.random()
+        if r < 0.2:
+            return text
+        if r < 0.4:
+            return text + " " + " ".join(rnd.choices(vocab, k=rnd.randint(1, 3)))
+        if r < 0.55:
+            i = rnd.randrange(len(text))
+            return text[:i] + "\u200b" + text[i:]
+        if r < 0.7:
+            return "".join(c.upper() if rnd.random() < 0.3 else c for c in text)
+        if r < 0.85:
+            return text.replace(" ", "  ") + f" {rnd.randint(1, 99999)}"
+        return "".join(chr(ord(c) + 0xFEE0) if "a" <= c <= "z" and rnd.random() < 0.5 else c for c in text)
+
+    events = []
+    normal = messages - raids * raid_size
+    for _ in range(normal):
+        g = rnd.choice(guild_objs)
+        if rnd.random() < 0.2:
+            content = rnd.choice(replies)
+        else:
+            content = " ".join(rnd.choices(vocab, cum_weights=cum, k=rnd.randint(3, 20)))
+        events.append((rnd.uniform(0, seconds), _DupeMessage(g, rnd.choice(channels[g.id]), rnd.choice(users),
+                                                             content, None)))
+    uid = len(users)
+    for wave in range(raids):
+        g = guild_objs[wave % guilds]
+        start = rnd.uniform(0, seconds - 30)
+        text = templates[wave % len(templates)]
+        accounts = [_FakeUser(uid + i) for i in range(raid_size // 5)]
+        uid += len(accounts)
+        for _ in range(raid_size):
+            content = text if wave == 0 else mutate(text)  # wave 0: plain copies
+            events.append((start + rnd.uniform(0, 20), _DupeMessage(g, rnd.choice(channels[g.id][:5]),
+                                                                    rnd.choice(accounts), content, wave)))
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def bench_dupes(messages: int = 100_000, guilds: int = 3, raids: int = 5, raid_size: int = 1000,
+                seconds: float = 1000.0):
+    """Copy-paste raid detection on a synthetic corpus: latency per message, memory, hits and false positives."""
+    from dupes import DuplicateDetector
+
+    events = _raid_corpus(messages, guilds, raids, raid_size, seconds)
+    raid_total = sum(1 for _, m in events if m.raid is not None)
+    print(f"dupes: {len(events):,} messages in {seconds:.0f}s, {guilds} guilds, "
+          f"{raids} raid waves of {raid_size} ({raid_total:,} raid messages)")
+
+    def run(threshold, trace):
+        clock = [0.0]
+        detector = DuplicateDetector(window=30, threshold=threshold, clock=lambda: clock[0])
+        lat = [0] * len(events)
+        flags = []
+        perf = time.perf_counter_ns
+        gc.collect()
+        if trace:
+            tracemalloc.start()
+        for i, (t, m) in enumerate(events):
+            clock[0] = t
+            t0 = perf()
+            flag = detector.check(m)
+            lat[i] = perf() - t0
+            if flag:
+                flags.append((i, flag.messages))
+        mem = tracemalloc.get_traced_memory() if trace else None
+        tracemalloc.stop()
+        return detector, lat, flags, mem
+
+    for label, threshold in (("exact hash only", 1.01), ("MinHash", 0.6)):
+        detector, lat, flags, _ = run(threshold, False)
+        _, _, _, (current, peak) = run(threshold, True)
+        caught = {}
+        first = {}
+        false_pos = 0
+        for i, flagged in flags:
+            for m in flagged:
+                if m.raid is None:
+                    false_pos += 1
+                else:
+                    caught[m.raid] = caught.get(m.raid, 0) + 1
+                    first.setdefault(m.raid, i)
+        # raid copies posted up to the one that got the wave flagged
+        before = {}
+        for i, (_, m) in enumerate(events):
+            if m.raid is not None and i <= first.get(m.raid, -1):
+                before[m.raid] = before.get(m.raid, 0) + 1
+        hits = sum(caught.values())
+        lat.sort()
+        n = len(lat)
+        print(f"  {label}:")
+        print(f"    latency p50 {lat[n // 2] / 1000:5.1f} us  p99 {lat[int(n * 0.99)] / 1000:5.1f} us  "
+              f"max {lat[-1] / 1000:6.1f} us  ({n / (sum(lat) / 1e9):,.0f} msg/s)")
+        print(f"    memory {current / 2**20:5.2f} MiB at the end, {peak / 2**20:5.2f} MiB peak, "
+              f"{len(detector):,} clusters ({current / max(1, len(detector)):,.0f} B each), "
+              f"{detector.checked:,} messages tracked")
+        print(f"    flagged {hits:,}/{raid_total:,} raid messages ({hits / raid_total:.1%}), "
+              f"{false_pos} normal messages, copies until flagged per wave: "
+              f"{[before.get(w, '-') for w in range(raids)]}")
+
+
+def bench_scheduler(jobs: int = 100_000, spread: float = 5.0):
+    """Scheduler with `jobs` pending jobs: insert cost, memory, wakeup precision and reload time,
+    against one sleeping task per job. Jobs are due from 5s on, after all of them are inserted."""
+    import random
+    from scheduler import Scheduler
+
+    rnd = random.Random(3)
+    offsets = [5.0 + rnd.random() * spread for _ in range(jobs)]
+
+    def pct(values, *ps):
+        values = sorted(values)
+        return [values[min(len(values) - 1, int(len(values) * p))] * 1000 for p in ps]
+
+    async def tasks_run():
+        late = []
+
+        async def sleeper(due):
+            await asyncio.sleep(due - time.time())
+            late.append(time.time() - due)
+
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        now = time.time()
+        tasks = [asyncio.ensure_future(sleeper(now + off)) for off in offsets]
+        insert = time.perf_counter() - t0
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        await asyncio.gather(*tasks)
+        return insert, mem, late
+
+    async def scheduler_run(path):
+        late = []
+        sched = Scheduler(path)
+        sched.load()
+
+        async def handler(job):
+            late.append(time.time() - job.due)
+
+        sched.register("bench", handler)
+        sched.start()
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        now = time.time()
+        for i, off in enumerate(offsets):
+            sched.schedule("bench", now + off, guild_id=1, channel_id=i)
+        insert = time.perf_counter() - t0
+        queued = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        await sched.flush()
+        write = time.perf_counter() - t0
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        while sched.fired < jobs:
+            await asyncio.sleep(0.1)
+        await sched.flush()
+        return insert, queued, mem, late, write
+
+    def reload(path):
+        # a restart with all jobs still pending: the rows of the first run are deleted once they ran,
+        # so write them again in one go
+        sched = Scheduler(path)
+        now = time.time()
+        for i, off in enumerate(offsets):
+            sched.schedule("bench", now + off, guild_id=1, channel_id=i)
+        sched._executor.submit(lambda: None).result()
+        t0 = time.perf_counter()
+        n = Scheduler(path).load()
+        return n, time.perf_counter() - t0
+
+    print(f"scheduler: {jobs:,} jobs due between 5s and {5 + spread:.0f}s from now")
+    insert, mem, late = asyncio.run(tasks_run())
+    p50, p99, pmax = pct(late, 0.5, 0.99, 1.0)
+    print(f"  task per job   insert {insert / jobs * 1e6:5.2f} us/job  {mem / 2**20:6.1f} MiB ({mem / jobs:5.0f} B/job)"
+          f"  late p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  max {pmax:6.2f} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        insert, queued, mem, late, write = asyncio.run(scheduler_run(os.path.join(tmp, "s.db")))
+        reloaded, reload_secs = reload(os.path.join(tmp, "s.db"))
+    p50, p99, pmax = pct(late, 0.5, 0.99, 1.0)
+    print(f"  Scheduler      insert {insert / jobs * 1e6:5.2f} us/job  {mem / 2**20:6.1f} MiB ({mem / jobs:5.0f} B/job)"
+          f"  late p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  max {pmax:6.2f} ms")
+    print(f"  {queued / 2**20:.1f} MiB before the queued rows were written, sqlite write {write:.2f}s, "
+          f"reload of {reloaded:,} jobs {reload_secs:.2f}s")
+
+
+class _AuditChannel:
+    """Log channel with a fake send latency that can be switched to failing (503)."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.down = False
+        self.sent = []
+
+    async def send(self, content=None, embeds=()):
+        await asyncio.sleep(self.latency)
+        if self.down:
+            err = Exception("503 Service Unavailable")
+            err.status = 503
+            raise err
+        self.sent.append(len(embeds))
+
+
+def bench_audit(events: int = 5000, rate: float = 1000.0):
+    """Audit log sink: cost of audit.event() for the caller, messages per event, and an outage
+    (spill to disk, replay) against one send per event."""
+    from auditlog import AuditSink
+
+    async def run(path):
+        channel = _AuditChannel()
+        sink = AuditSink(lambda guild_id: channel, path, 0x3498db, "bench", interval=0.5, replay_interval=0.5)
+        sink.start()
+        costs = []
+        t_start = time.perf_counter()
+        for i in range(events):
+            if i == events // 2:
+                channel.down = True   # Discord goes down halfway
+            t0 = time.perf_counter_ns()
+            sink.event(1, "Time-out", fields=[("Lid", f"<@{i}> ({i})"), ("Duur", "10 min")])
+            costs.append(time.perf_counter_ns() - t0)
+            if i % 100 == 0:
+                await asyncio.sleep(100 / rate)
+        await asyncio.sleep(1.5)
+        spilled = sink.spilled
+        channel.down = False          # ... and comes back, the spill file is replayed
+        while sum(channel.sent) < events and time.perf_counter() - t_start < 60:
+            await asyncio.sleep(0.1)
+        return channel, sink, costs, spilled, time.perf_counter() - t_start
+
+    async def direct():
+        # one send per event, awaited by the command (the old /logtest way)
+        channel = _AuditChannel()
+        t0 = time.perf_counter()
+        for _ in range(200):
+            await channel.send("log line")
+        return (time.perf_counter() - t0) / 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        channel, sink, costs, spilled, secs = asyncio.run(run(os.path.join(tmp, "spill.jsonl")))
+    per_send = asyncio.run(direct())
+    costs.sort()
+    print(f"audit: {events:,} events at {rate:.0f}/s, Discord down for the second half")
+    print(f"  direct send      {events:,} messages, command waits {per_send * 1000:.1f} ms per event")
+    print(f"  AuditSink        event() p50 {costs[len(costs) // 2] / 1000:.1f} us  p99 {costs[int(len(costs) * 0.99)] / 1000:.1f} us, "
+          f"{len(channel.sent):,} messages ({sum(channel.sent) / max(1, len(channel.sent)):.1f} embeds each)")
+    print(f"  outage: {spilled:,} events spilled to disk, {sum(channel.sent):,}/{events:,} delivered after replay "
+          f"({secs:.1f}s), {sink.dropped} dropped")
+
+
+BENCHMARKS = {
+    "spam": bench_spam,
+    "transcript": bench_transcript,
+    "archive": bench_archive,
+    "embeds": bench_embeds,
+    "stats": bench_stats,
+    "rules": bench_rules,
+    "perms": bench_perms,
+    "actions": bench_actions,
+    "bulk": bench_bulk,
+    "joins": bench_joins,
+    "guilds": bench_guilds,
+    "members": bench_members,
+    "dupes": bench_dupes,
+    "scheduler": bench_scheduler,
+    "audit": bench_audit,
+    "startup": bench_startup,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -0,0 +1,99 @@
+# botlog.py - non-blocking logging for the bot
+#
+# Handlers log through a QueueHandler, which only puts the record on a queue.
+# A QueueListener thread does the formatting and the disk I/O, rotates the file
+# by size or time and gzips rotated files, so logging never blocks the gateway
+# loop. Optional JSON lines mode carries guild/channel/user ids and latency.
+
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from datetime import datetime, timezone
+
+# fields that can be passed with extra=... and end up in JSON records
+CONTEXT_FIELDS = ("guild_id", "channel_id", "user_id", "handler", "latency_ms")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def ctx(obj=None, **extra) -> dict:
+    """Build extra=... for a log call from an Interaction, Message or Member.
+
+    logger.info("Ticket claimed", extra=ctx(interaction))
+    """
+    if obj is not None:
+        guild = getattr(obj, "guild", None)
+        channel = getattr(obj, "channel", None)
+        user = getattr(obj, "user", None) or getattr(obj, "author", None)
+        if user is None and hasattr(obj, "guild_permissions"):
+            user = obj  # a Member
+        if guild is not None:
+            extra.setdefault("guild_id", guild.id)
+        if channel is not None:
+            extra.setdefault("channel_id", channel.id)
+        if user is not None:
+            extra.setdefault("user_id", user.id)
+    return extra
+
+
+def setup_logging(name: str = "moana_bot", path: str = "logs/bot.log", json_mode: bool = False,
+                  rotate: str = "size", max_bytes: int = 10 * 1024 * 1024, backups: int = 10,
+                  compress: bool = True, level: int = logging.INFO) -> logging.Logger:
+    """Configure `name` to log through a background thread and return the logger.
+
+    rotate is "size" (rotate at max_bytes) or "time" (rotate at midnight UTC).
+    """
+    if rotate == "time":
+        fh = logging.handlers.TimedRotatingFileHandler(path, when="midnight", utc=True,
+                                                       backupCount=backups, encoding="utf-8")
+    else:
+        fh = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes,
+                                                  backupCount=backups, encoding="utf-8")
+    if compress:
+        fh.namer = _gzip_namer
+        fh.rotator = _gzip_rotator
+    if json_mode:
+        fh.setFormatter(JsonFormatter())
+    else:
+        fh.setFormatter(logging.Formatter("%(asctime)s %(levelname)s: %(message)s"))
+
+    q = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(q, fh, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # flush what is still queued on exit
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.addHandler(logging.handlers.QueueHandler(q))
+    return logger
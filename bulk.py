@@ -0,0 +1,292 @@
+# bulk.py - bulk moderation jobs (/massban, /masstimeout, /massrole)
+#
+# A job is one action (ban, timeout, add role) for a list of user ids. The job
+# and the state of every target are stored in SQLite (one thread, like
+# ticketstore.py), so a job that was interrupted by a restart continues with
+# the targets that are still pending, and failed targets can be run again.
+#
+# A few workers per job send the requests through a RouteBucket per
+# (guild, action), the same unit Discord rate limits these routes by. The
+# bucket spaces requests at its current rate. A 429 pauses the bucket for
+# retry_after, lowers the rate by a quarter and puts the target back in the
+# queue; every success raises the rate a little again (AIMD). Other errors
+# (unknown member, missing permissions) fail only that target.
+
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from background import open_db
+
+logger = logging.getLogger("moana_bot")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bulk_jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id    INTEGER NOT NULL,
+    kind        TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    author_id   INTEGER,
+    channel_id  INTEGER,
+    message_id  INTEGER,
+    status      TEXT NOT NULL DEFAULT 'running',
+    created_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS bulk_targets (
+    job_id      INTEGER NOT NULL,
+    user_id     INTEGER NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'pending',
+    error       TEXT,
+    PRIMARY KEY (job_id, user_id)
+) WITHOUT ROWID;
+"""
+
+
+class RouteBucket:
+    """Spaces requests on one route at an adaptive rate (requests per second)."""
+
+    def __init__(self, rate: float, min_rate: float = 0.5, max_rate: float = 50.0, step: float = 20.0,
+                 clock=time.monotonic):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step  # rate increase per second without 429s
+        self.clock = clock
+        self.rate_limited = 0
+        self._next = 0.0  # monotonic time the next request may start
+
+    async def acquire(self):
+        while True:
+            now = self.clock()
+            if self._next <= now:
+                self._next = now + 1 / self.rate
+                return
+            await asyncio.sleep(self._next - now)
+
+    def success(self):
+        self.rate = min(self.max_rate, self.rate + self.step / self.rate)
+
+    def limited(self, retry_after: float):
+        self.rate_limited += 1
+        self.rate = max(self.min_rate, self.rate * 0.75)
+        self._next = max(self._next, self.clock() + retry_after)
+
+
+def retry_after(e) -> float:
+    """Seconds to wait from a 429 (nextcord.HTTPException or anything with retry_after)."""
+    value = getattr(e, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(e, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class BulkJob:
+    def __init__(self, id: int, guild_id: int, kind: str, params: dict, author_id: Optional[int],
+                 channel_id: Optional[int], message_id: Optional[int], status: str, created_at: float,
+                 pending: list, done: int = 0, failed: Optional[dict] = None):
+        self.id = id
+        self.guild_id = guild_id
+        self.kind = kind
+        self.params = params
+        self.author_id = author_id
+        self.channel_id = channel_id
+        self.message_id = message_id  # progress message, edited while the job runs
+        self.status = status
+        self.created_at = created_at
+        self.pending = pending        # user ids still to do
+        self.done = done
+        self.failed = failed or {}    # user id -> error
+        self.total = len(pending) + done + len(self.failed)
+        self.started = time.monotonic()
+        self.done_at_start = done
+
+    @property
+    def rate(self) -> float:
+        """Targets per second in this run."""
+        secs = time.monotonic() - self.started
+        return (self.done - self.done_at_start) / secs if secs > 0 else 0.0
+
+
+class BulkRunner:
+    def __init__(self, path: str, concurrency: int = 4, rate: float = 10.0, max_rate: float = 50.0,
+                 attempts: int = 5, progress_interval: float = 2.0):
+        self.path = path
+        self.concurrency = concurrency
+        self.rate = rate
+        self.max_rate = max_rate
+        self.attempts = attempts  # per target, for 5xx/network errors (429s are retried until done)
+        self.progress_interval = progress_interval
+        self.buckets = {}         # (guild_id, kind) -> RouteBucket
+        self.running = {}         # job id -> task
+        self.requests = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk")
+        self._db = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # database (executor thread) -------------------------------------------------
+
+    def _conn(self):
+        if self._db is None:
+            self._db = open_db(self.path, SCHEMA)
+        return self._db
+
+    def _create(self, guild_id, kind, params, author_id, channel_id, targets, created_at) -> int:
+        db = self._conn()
+        with db:
+            cur = db.execute("INSERT INTO bulk_jobs (guild_id, kind, params, author_id, channel_id, created_at) "
+                             "VALUES (?, ?, ?, ?, ?, ?)",
+                             (guild_id, kind, json.dumps(params), author_id, channel_id, created_at))
+            db.executemany("INSERT OR IGNORE INTO bulk_targets (job_id, user_id) VALUES (?, ?)",
+                           [(cur.lastrowid, uid) for uid in targets])
+        return cur.lastrowid
+
+    def _execute(self, sql: str, params: tuple):
+        with self._conn() as db:
+            db.execute(sql, params)
+
+    def _save(self, results):
+        with self._conn() as db:
+            db.executemany("UPDATE bulk_targets SET state = ?, error = ? WHERE job_id = ? AND user_id = ?", results)
+
+    def _load(self, where: str, params: tuple) -> list:
+        db = self._conn()
+        jobs = []
+        for row in db.execute(f"SELECT id, guild_id, kind, params, author_id, channel_id, message_id, status, "
+                              f"created_at FROM bulk_jobs WHERE {where}", params).fetchall():
+            targets = db.execute("SELECT user_id, state, error FROM bulk_targets WHERE job_id = ?", (row[0],)).fetchall()
+            job = BulkJob(*row[:3], json.loads(row[3]), *row[4:],
+                          pending=[uid for uid, state, _ in targets if state == "pending"],
+                          done=sum(1 for _, state, _ in targets if state == "done"),
+                          failed={uid: error for uid, state, error in targets if state == "failed"})
+            jobs.append(job)
+        return jobs
+
+    def _reset_failed(self, job_id: int):
+        with self._conn() as db:
+            db.execute("UPDATE bulk_targets SET state = 'pending', error = NULL WHERE job_id = ? AND state = 'failed'",
+                       (job_id,))
+            db.execute("UPDATE bulk_jobs SET status = 'running', finished_at = NULL WHERE id = ?", (job_id,))
+
+    # jobs -----------------------------------------------------------------------
+
+    async def create(self, guild_id: int, kind: str, params: dict, targets: list,
+                     author_id: Optional[int] = None, channel_id: Optional[int] = None) -> BulkJob:
+        targets = list(dict.fromkeys(targets))
+        created_at = time.time()
+        job_id = await self._run(self._create, guild_id, kind, params, author_id, channel_id, targets, created_at)
+        return BulkJob(job_id, guild_id, kind, params, author_id, channel_id, None, "running", created_at, targets)
+
+    async def set_message(self, job: BulkJob, channel_id: int, message_id: int):
+        job.channel_id, job.message_id = channel_id, message_id
+        await self._run(self._execute, "UPDATE bulk_jobs SET channel_id = ?, message_id = ? WHERE id = ?",
+                        (channel_id, message_id, job.id))
+
+    async def unfinished(self) -> list:
+        """Jobs that were still running when the bot stopped."""
+        return await self._run(self._load, "status = 'running'", ())
+
+    async def get(self, job_id: int) -> Optional[BulkJob]:
+        jobs = await self._run(self._load, "id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    async def retry_failed(self, job_id: int) -> Optional[BulkJob]:
+        """Mark the failed targets of a job pending again and return the job (not started)."""
+        await self._run(self._reset_failed, job_id)
+        return await self.get(job_id)
+
+    def bucket(self, guild_id: int, kind: str) -> RouteBucket:
+        b = self.buckets.get((guild_id, kind))
+        if b is None:
+            b = self.buckets[(guild_id, kind)] = RouteBucket(self.rate, max_rate=self.max_rate)
+        return b
+
+    def start(self, job: BulkJob, action, progress=None) -> asyncio.Task:
+        """Run a job in the background. action(user_id) does one request, progress(job) is awaited
+        every progress_interval seconds and at the end."""
+        task = self.running.get(job.id)
+        if task is None or task.done():
+            task = self.running[job.id] = asyncio.get_running_loop().create_task(self.run(job, action, progress))
+        return task
+
+    async def run(self, job: BulkJob, action, progress=None) -> BulkJob:
+        bucket = self.bucket(job.guild_id, job.kind)
+        queue = asyncio.Queue()
+        for uid in job.pending:
+            queue.put_nowait((uid, 0))
+        results = []  # (state, error, job_id, user_id), written in batches
+
+        async def worker():
+            while True:
+                uid, tries = await queue.get()
+                try:
+                    await bucket.acquire()
+                    self.requests += 1
+                    await action(uid)
+                except Exception as e:
+                    status = getattr(e, "status", None)
+                    if status == 429:
+                        bucket.limited(retry_after(e))
+                        queue.put_nowait((uid, tries))
+                    elif (status is None or status >= 500) and tries + 1 < self.attempts:
+                        queue.put_nowait((uid, tries + 1))
+                    else:
+                        job.failed[uid] = str(e)[:200] or type(e).__name__
+                        results.append(("failed", job.failed[uid], job.id, uid))
+                else:
+                    bucket.success()
+                    job.done += 1
+                    results.append(("done", None, job.id, uid))
+                finally:
+                    queue.task_done()
+
+        async def report():
+            if results:
+                batch = results[:]
+                del results[:]
+                await self._run(self._save, batch)
+            if progress:
+                try:
+                    await progress(job)
+                except Exception as e:
+                    logger.debug(f"Bulk job {job.id} progress failed: {e}")
+
+        async def ticker():
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                await report()
+
+        job.started, job.done_at_start = time.monotonic(), job.done
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, max(1, len(job.pending))))]
+        tick = asyncio.create_task(ticker())
+        try:
+            await queue.join()
+        except asyncio.CancelledError:
+            # shutdown: keep what is done, the rest stays pending for the next start
+            self._executor.submit(self._save, results[:])
+            raise
+        finally:
+            for task in workers + [tick]:
+                task.cancel()
+            self.running.pop(job.id, None)
+        job.pending = []
+        job.status = "done"
+        await self._run(self._execute, "UPDATE bulk_jobs SET status = 'done', finished_at = ? WHERE id = ?",
+                        (time.time(), job.id))
+        await report()
+        logger.info(f"Bulk job {job.id} ({job.kind}) finished: {job.done} done, {len(job.failed)} failed, "
+                    f"{bucket.rate_limited} rate limits")
+        return job
+
+    def flush(self):
+        """Wait for pending database writes (tests/benchmarks)."""
+        self._executor.submit(lambda: None).result()
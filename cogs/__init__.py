@@ -0,0 +1 @@
+# cogs - command groups of the bot, each one an extension loaded by main.py
@@ -0,0 +1,42 @@
+# cogs/forms.py - /embed, /review and /suggesties
+#
+# These are used a few times a day, so the modal classes live in
+# cogs/forms_modals.py and are only imported when one of the commands is used
+# for the first time.
+
+import importlib
+
+import nextcord
+from nextcord import Interaction
+from nextcord.ext import commands
+
+_modals = None
+
+
+def modals():
+    """cogs.forms_modals, imported on first use."""
+    global _modals
+    if _modals is None:
+        _modals = importlib.import_module("cogs.forms_modals")
+    return _modals
+
+
+class Forms(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @nextcord.slash_command(name="embed", description="Maak een custom embed.")
+    async def embed_cmd(self, interaction: Interaction):
+        await interaction.response.send_modal(modals().EmbedModal())
+
+    @nextcord.slash_command(name="review", description="Laat een review achter.")
+    async def review_cmd(self, interaction: Interaction):
+        await interaction.response.send_modal(modals().ReviewModal())
+
+    @nextcord.slash_command(name="suggesties", description="Nieuwe suggestie")
+    async def suggest_cmd(self, interaction: Interaction):
+        await interaction.response.send_modal(modals().SuggestModal())
+
+
+def setup(bot: commands.Bot):
+    bot.add_cog(Forms(bot))
@@ -0,0 +1,72 @@
+# cogs/forms_modals.py - modals for Embed / Review / Suggest (imported lazily by cogs/forms.py)
+
+import nextcord
+from nextcord import Interaction
+from nextcord.ui import Modal, TextInput
+
+from botlog import ctx
+from config import BLUE, FOOTER
+from core import embeds, logger, stats
+
+
+class EmbedModal(Modal):
+    def __init__(self):
+        super().__init__("Maak een Embed")
+        self.author = TextInput(label="Author naam (opt)", required=False, max_length=100)
+        self.title = TextInput(label="Titel", required=True, max_length=256)
+        self.description = TextInput(label="Beschrijving", style=nextcord.TextInputStyle.paragraph, required=True, max_length=4000)
+        self.image = TextInput(label="Afbeelding URL (opt)", required=False, max_length=1000)
+        self.add_item(self.author)
+        self.add_item(self.title)
+        self.add_item(self.description)
+        self.add_item(self.image)
+
+    @stats.timed("modal.embed")
+    async def callback(self, interaction: Interaction):
+        embed = nextcord.Embed(title=self.title.value, description=self.description.value, color=BLUE)
+        if self.author.value:
+            embed.set_author(name=self.author.value)
+        if self.image.value:
+            embed.set_image(url=self.image.value)
+        embed.set_footer(text=FOOTER)
+        await interaction.response.send_message(embed=embed)
+
+class ReviewModal(Modal):
+    def __init__(self):
+        super().__init__("Laat een review achter")
+        self.product = TextInput(label="Welk product?", required=True)
+        self.stars = TextInput(label="Aantal sterren (1-5)", required=True, max_length=2)
+        self.service = TextInput(label="Service sterren (1-5)", required=True, max_length=2)
+        self.message = TextInput(label="Review bericht", style=nextcord.TextInputStyle.paragraph, required=False)
+        self.add_item(self.product)
+        self.add_item(self.stars)
+        self.add_item(self.service)
+        self.add_item(self.message)
+
+    @stats.timed("modal.review")
+    async def callback(self, interaction: Interaction):
+        embed = embeds.render("review", product=self.product.value, stars=self.stars.value, service=self.service.value,
+                              reviewer=interaction.user.mention, message=self.message.value)
+        await interaction.response.send_message(embed=embed)
+        logger.info(f"Review by {interaction.user}", extra=ctx(interaction))
+
+class SuggestModal(Modal):
+    def __init__(self):
+        super().__init__("Nieuwe suggestie")
+        self.naam = TextInput(label="Naam", required=True)
+        self.tijd = TextInput(label="Tijd", required=False)
+        self.datum = TextInput(label="Datum", required=False)
+        self.suggestie = TextInput(label="Suggestie", style=nextcord.TextInputStyle.paragraph, required=True)
+        self.extra = TextInput(label="Extra", style=nextcord.TextInputStyle.paragraph, required=False)
+        self.add_item(self.naam)
+        self.add_item(self.tijd)
+        self.add_item(self.datum)
+        self.add_item(self.suggestie)
+        self.add_item(self.extra)
+
+    @stats.timed("modal.suggest")
+    async def callback(self, interaction: Interaction):
+        embed = embeds.render("suggestion", naam=self.naam.value, tijd=self.tijd.value, datum=self.datum.value,
+                              suggestie=self.suggestie.value, extra=self.extra.value)
+        await interaction.response.send_message(embed=embed)
+        logger.info(f"Suggestion by {interaction.user}", extra=ctx(interaction))
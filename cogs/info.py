@@ -0,0 +1,134 @@
+# cogs/info.py - info and utility commands (ping, user/server/role info, say, announce, stats, reminders)
+
+import time
+
+import nextcord
+from nextcord import Interaction, SlashOption
+from nextcord.ext import commands
+
+from config import BLUE, FOOTER, REMINDER_MAX
+from core import guild_configs, is_staff, logger, member_store, scheduler, stats
+
+MAX_REMINDER_MINUTES = 365 * 24 * 60
+
+
+class Info(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        scheduler.register("reminder", self._reminder_job)
+
+    @nextcord.slash_command(name="ping", description="Check bot latency")
+    async def ping(self, interaction: Interaction):
+        embed = nextcord.Embed(title="Pong!", description=f"{round(self.bot.latency*1000)}ms", color=BLUE)
+        embed.set_footer(text=FOOTER)
+        await interaction.response.send_message(embed=embed)
+
+    @nextcord.slash_command(name="userinfo", description="Get user info")
+    async def userinfo(self, interaction: Interaction, member: nextcord.Member = SlashOption(required=False)):
+        member = await member_store.lookup(interaction.guild, member or interaction.user)
+        embed = nextcord.Embed(title=f"Info - {member}", color=BLUE)
+        embed.add_field(name="ID", value=str(member.id), inline=True)
+        embed.add_field(name="Account aangemaakt", value=member.created_at.strftime("%Y-%m-%d"), inline=True)
+        embed.add_field(name="Joined server", value=member.joined_at.strftime("%Y-%m-%d") if member.joined_at else "Onbekend", inline=True)
+        embed.set_thumbnail(url=member.avatar_url)
+        embed.set_footer(text=FOOTER)
+        await interaction.response.send_message(embed=embed)
+
+    @nextcord.slash_command(name="serverinfo", description="Server info")
+    async def serverinfo(self, interaction: Interaction):
+        g = interaction.guild
+        embed = nextcord.Embed(title=f"{g.name} - Info", color=BLUE)
+        embed.add_field(name="Server ID", value=str(g.id), inline=True)
+        embed.add_field(name="Members", value=str(g.member_count), inline=True)
+        embed.add_field(name="Channels", value=str(len(g.channels)), inline=True)
+        embed.set_footer(text=FOOTER)
+        await interaction.response.send_message(embed=embed)
+
+    @nextcord.slash_command(name="roleinfo", description="Info over een rol")
+    async def roleinfo(self, interaction: Interaction, role: nextcord.Role = SlashOption(required=True)):
+        embed = nextcord.Embed(title=f"Rol info - {role.name}", color=BLUE)
+        embed.add_field(name="ID", value=str(role.id), inline=True)
+        count = interaction.guild.member_count if role.is_default() else member_store.role_count(role.guild.id, role.id)
+        if count is None:  # guild not counted yet
+            count = len(role.members)
+        embed.add_field(name="Members", value=str(count), inline=True)
+        embed.set_footer(text=FOOTER)
+        await interaction.response.send_message(embed=embed)
+
+    @nextcord.slash_command(name="avatar", description="Bekijk avatar")
+    async def avatar(self, interaction: Interaction, member: nextcord.Member = SlashOption(required=False)):
+        member = await member_store.lookup(interaction.guild, member or interaction.user)
+        embed = nextcord.Embed(title=f"{member}'s avatar", color=BLUE)
+        embed.set_image(url=member.avatar_url)
+        embed.set_footer(text=FOOTER)
+        await interaction.response.send_message(embed=embed)
+
+    @nextcord.slash_command(name="say", description="Laat de bot iets zeggen (embed)")
+    async def say_cmd(self, interaction: Interaction, tekst: str = SlashOption(required=True)):
+        embed = nextcord.Embed(description=tekst, color=BLUE)
+        embed.set_footer(text=FOOTER)
+        await interaction.response.send_message(embed=embed)
+
+    @nextcord.slash_command(name="announce", description="Maak een grote announcement embed")
+    async def announce_cmd(self, interaction: Interaction, titel: str = SlashOption(required=True), bericht: str = SlashOption(required=True), kanaal: nextcord.TextChannel = SlashOption(required=False)):
+        if not interaction.user.guild_permissions.manage_guild:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        channel = kanaal or interaction.channel
+        embed = nextcord.Embed(title=titel, description=bericht, color=BLUE)
+        embed.set_footer(text=FOOTER)
+        await channel.send(embed=embed)
+        await interaction.response.send_message("Announcement gestuurd.", ephemeral=True)
+
+    @nextcord.slash_command(name="stats", description="Bot statistieken (staff)")
+    async def stats_cmd(self, interaction: Interaction):
+        if not is_staff(interaction.user):
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        rows = sorted(stats.handlers.items(), key=lambda kv: kv[1].count, reverse=True)[:20]
+        lines = [f"{'handler':<22}{'n':>7}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        for name, h in rows:
+            if not h.count:
+                continue
+            p50, p95, p99 = h.percentiles(0.5, 0.95, 0.99)
+            lines.append(f"{name[:21]:<22}{h.count:>7}{p50:>8.1f}{p95:>8.1f}{p99:>8.1f}")
+        lag50, lag99 = stats.loop_lag.percentiles(0.5, 0.99)
+        embed = nextcord.Embed(title="📊 Statistieken", description="```\n" + "\n".join(lines) + "\n```", color=BLUE)
+        embed.add_field(name="Gateway", value=f"{round(self.bot.latency*1000)}ms", inline=True)
+        embed.add_field(name="Loop lag", value=f"p50 {lag50:.1f}ms / p99 {lag99:.1f}ms / max {stats.loop_lag.max:.1f}ms", inline=True)
+        embed.add_field(name="REST", value=f"{stats.rest_total} calls, {stats.rate_limits} rate limits "
+                        f"({stats.global_rate_limits} global)", inline=True)
+        embed.add_field(name="Errors", value=str(sum(stats.errors.values())), inline=True)
+        embed.set_footer(text=FOOTER)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @nextcord.slash_command(name="remind", description="Herinner mij over een aantal minuten")
+    async def remind_cmd(self, interaction: Interaction,
+                         minuten: int = SlashOption(required=True, description="Over hoeveel minuten"),
+                         tekst: str = SlashOption(required=True, description="Waaraan herinnerd worden")):
+        if minuten < 1 or minuten > MAX_REMINDER_MINUTES:
+            return await interaction.response.send_message(f"Kies 1 tot {MAX_REMINDER_MINUTES} minuten.", ephemeral=True)
+        if scheduler.count("reminder", interaction.user.id) >= REMINDER_MAX:
+            return await interaction.response.send_message(f"Je hebt al {REMINDER_MAX} herinneringen staan.", ephemeral=True)
+        due = time.time() + minuten * 60
+        scheduler.schedule("reminder", due, interaction.guild.id if interaction.guild else None, interaction.channel.id,
+                           interaction.user.id, params={"text": tekst[:1500]})
+        await interaction.response.send_message(f"Ik herinner je <t:{int(due)}:R>.", ephemeral=True)
+
+    async def _reminder_job(self, job):
+        # channel gone: send it as a DM
+        target = self.bot.get_channel(job.channel_id) or await self.bot.fetch_user(job.user_id)
+        # only the owner is pinged, mentions in the text itself stay silent
+        await target.send(f"⏰ <@{job.user_id}> herinnering: {job.params['text']}",
+                          allowed_mentions=nextcord.AllowedMentions(users=[nextcord.Object(job.user_id)],
+                                                                    everyone=False, roles=False))
+        logger.info(f"Sent reminder {job.id} to user {job.user_id}")
+
+    @nextcord.slash_command(name="logtest", description="Stuur een test log naar logs kanaal")
+    async def logtest(self, interaction: Interaction):
+        logch = self.bot.get_channel(guild_configs.get(interaction.guild.id).log_channel)
+        if logch:
+            await logch.send(f"Log test by {interaction.user}")
+        await interaction.response.send_message("Log test gestuurd.", ephemeral=True)
+
+
+def setup(bot: commands.Bot):
+    bot.add_cog(Info(bot))
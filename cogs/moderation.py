@@ -0,0 +1,360 @@
+# cogs/moderation.py - moderation commands (purge, kick, ban, timeout, roles, channel locks, bulk jobs)
+
+import asyncio
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import nextcord
+from nextcord import Interaction, SlashOption
+from nextcord.ext import commands
+
+from auditlog import GREEN, ORANGE, RED
+from botlog import ctx
+from config import (BLUE, BULK_MAX_TARGETS, FOOTER, PURGE_FOLDER, PURGE_FORMAT, PURGE_GZIP, PURGE_MAX, PURGE_OLD_RATE,
+                    PURGE_SCAN_LIMIT)
+from core import audit, bulk_jobs, embeds, guild_configs, is_staff, logger, member_store, scheduler, try_timeout_member
+from purge import PurgeFilter, PurgeJob
+
+BULK_TITLES = {"ban": "Massban", "timeout": "Mass-timeout", "role": "Massrol"}
+BULK_PERMISSIONS = {"ban": "ban_members", "timeout": "moderate_members", "role": "manage_roles"}
+USER_ID = re.compile(r"\d{15,20}")
+MAX_TIMEOUT_MINUTES = 28 * 24 * 60
+MAX_LOCK_MINUTES = 30 * 24 * 60
+
+
+class Moderation(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.jobs_resumed = False
+        self.purges = {}  # channel id -> running purge task
+        scheduler.register("unlock", self._unlock_job)
+        scheduler.register("slowmode", self._slowmode_job)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.jobs_resumed:
+            self.jobs_resumed = True
+            # bulk jobs that were interrupted by a restart continue with the pending members
+            for job in await bulk_jobs.unfinished():
+                logger.info(f"Resuming bulk job {job.id} ({job.kind}), {len(job.pending)} members left")
+                self._start_job(job)
+
+    @nextcord.slash_command(name="purge", description="Verwijder berichten, optioneel gefilterd")
+    async def purge(self, interaction: Interaction,
+                    amount: int = SlashOption(required=True, description=f"Aantal berichten (max {PURGE_MAX})"),
+                    auteur: nextcord.User = SlashOption(required=False, description="Alleen berichten van deze gebruiker"),
+                    regex: str = SlashOption(required=False, description="Alleen berichten die hierop matchen"),
+                    links: bool = SlashOption(required=False, default=False, description="Alleen berichten met links"),
+                    bijlagen: bool = SlashOption(required=False, default=False, description="Alleen berichten met bijlagen"),
+                    bots: bool = SlashOption(required=False, default=False, description="Alleen berichten van bots")):
+        if not interaction.user.guild_permissions.manage_messages:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        channel = interaction.channel
+        task = self.purges.get(channel.id)
+        if task and not task.done():
+            return await interaction.response.send_message("Er loopt al een purge in dit kanaal.", ephemeral=True)
+        try:
+            match = PurgeFilter(auteur.id if auteur else None, regex, links, bijlagen, bots)
+        except (re.error, ValueError) as e:
+            return await interaction.response.send_message(f"Ongeldige regex: {e}", ephemeral=True)
+        amount = max(1, min(PURGE_MAX, amount))
+        # deferred: the purge runs in the background and edits this response with its progress
+        await interaction.response.defer(ephemeral=True)
+        archive = os.path.join(PURGE_FOLDER, f"{channel.id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{PURGE_FORMAT}"
+                               + (".gz" if PURGE_GZIP else ""))
+        job = PurgeJob(channel, match, amount, before=nextcord.Object(interaction.id), scan_limit=PURGE_SCAN_LIMIT,
+                       archive=archive, fmt=PURGE_FORMAT, compress=PURGE_GZIP, old_rate=PURGE_OLD_RATE)
+        self.purges[channel.id] = asyncio.get_running_loop().create_task(self._run_purge(interaction, job))
+        logger.info(f"{interaction.user} started a purge of {amount} messages in {channel}", extra=ctx(interaction))
+
+    async def _run_purge(self, interaction: Interaction, job: PurgeJob):
+        # the interaction token only allows edits for 15 minutes; long purges (old messages go one by one)
+        # continue their progress in a message in the channel, it is newer than the purge so it stays
+        token_expires = time.monotonic() + 14 * 60
+        status = None
+
+        async def progress(job):
+            nonlocal status
+            if job.finished:
+                embed = embeds.render("purge", count=job.deleted, scanned=job.scanned, failed=job.failed,
+                                      seconds=round(job.elapsed))
+            else:
+                embed = embeds.render("purge_progress", count=job.deleted, amount=job.amount, scanned=job.scanned,
+                                      failed=job.failed)
+            if status is not None:
+                await status.edit(embed=embed)
+            elif time.monotonic() < token_expires:
+                await interaction.edit_original_message(embed=embed)
+            else:
+                status = await job.channel.send(f"Purge door {interaction.user.mention}:", embed=embed,
+                                                allowed_mentions=nextcord.AllowedMentions.none())
+
+        try:
+            await job.run(progress)
+            logger.info(f"Purge in {job.channel} done: {job.deleted} deleted ({job.old} one by one), "
+                        f"{job.scanned} scanned, {job.failed} failed", extra=ctx(interaction))
+            audit.event(interaction.guild.id, "Purge", fields=[("Kanaal", job.channel.mention),
+                        ("Verwijderd", str(job.deleted)), ("Bekeken", str(job.scanned)), ("Mislukt", str(job.failed))],
+                        color=ORANGE, user=interaction.user)
+        except Exception as e:
+            logger.exception("Purge in %s failed: %s", job.channel, e)
+        finally:
+            self.purges.pop(job.channel.id, None)
+
+    @nextcord.slash_command(name="kick", description="Kick een gebruiker")
+    async def kick(self, interaction: Interaction, member: nextcord.Member = SlashOption(required=True), reason: str = SlashOption(required=False)):
+        if not interaction.user.guild_permissions.kick_members:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        await member.kick(reason=reason)
+        embed = embeds.render("kick", member=member, reason=reason)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        logger.info(f"{interaction.user} kicked {member}", extra=ctx(interaction))
+        audit.event(interaction.guild.id, "Kick", fields=[("Lid", f"{member} ({member.id})"), ("Reden", reason or "-")],
+                    color=RED, user=interaction.user)
+
+    @nextcord.slash_command(name="ban", description="Ban een gebruiker")
+    async def ban(self, interaction: Interaction, member: nextcord.Member = SlashOption(required=True), reason: str = SlashOption(required=False)):
+        if not interaction.user.guild_permissions.ban_members:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        await member.ban(reason=reason)
+        embed = embeds.render("ban", member=member, reason=reason)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        logger.info(f"{interaction.user} banned {member}", extra=ctx(interaction))
+        audit.event(interaction.guild.id, "Ban", fields=[("Lid", f"{member} ({member.id})"), ("Reden", reason or "-")],
+                    color=RED, user=interaction.user)
+
+    @nextcord.slash_command(name="timeout", description="Time-out een gebruiker (minuten)")
+    async def timeout_cmd(self, interaction: Interaction, member: nextcord.Member = SlashOption(required=True), minutes: int = SlashOption(required=True, description="Duur in minuten")):
+        if not interaction.user.guild_permissions.moderate_members:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        await try_timeout_member(member, minutes, f"Timed out by {interaction.user}")
+        embed = embeds.render("timeout", member=member, minutes=minutes)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        logger.info(f"{interaction.user} timed out {member} for {minutes} minutes", extra=ctx(interaction))
+        audit.event(interaction.guild.id, "Time-out", fields=[("Lid", f"{member.mention} ({member.id})"),
+                    ("Duur", f"{minutes} min")], color=ORANGE, user=interaction.user)
+
+    @nextcord.slash_command(name="giverol", description="Geef een rol aan iemand")
+    async def giverol_cmd(self, interaction: Interaction, member: nextcord.Member = SlashOption(required=True), role: nextcord.Role = SlashOption(required=True)):
+        if not interaction.user.guild_permissions.manage_roles:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        await member.add_roles(role)
+        embed = embeds.render("giverol", mention=member.mention, role=role.mention)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        logger.info(f"{interaction.user} gave role {role} to {member}", extra=ctx(interaction))
+        audit.event(interaction.guild.id, "Rol gegeven", fields=[("Lid", f"{member.mention} ({member.id})"),
+                    ("Rol", role.mention)], user=interaction.user)
+
+    @nextcord.slash_command(name="lock", description="Lock het huidige kanaal")
+    async def lock_cmd(self, interaction: Interaction,
+                       minuten: int = SlashOption(required=False, description="Automatisch unlocken na zoveel minuten")):
+        if not interaction.user.guild_permissions.manage_channels:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        channel = interaction.channel
+        await channel.set_permissions(interaction.guild.default_role, send_messages=False)
+        if minuten and minuten > 0:
+            minuten = min(minuten, MAX_LOCK_MINUTES)
+            scheduler.schedule("unlock", time.time() + minuten * 60, interaction.guild.id, channel.id,
+                               key=f"unlock:{channel.id}")
+            await interaction.response.send_message(f"Kanaal gelocked voor {minuten} minuten.", ephemeral=True)
+        else:
+            scheduler.cancel(f"unlock:{channel.id}")
+            await interaction.response.send_message("Kanaal gelocked.", ephemeral=True)
+        audit.event(interaction.guild.id, "Kanaal gelocked", fields=[("Kanaal", channel.mention),
+                    ("Duur", f"{minuten} min" if minuten and minuten > 0 else "tot /unlock")], color=ORANGE,
+                    user=interaction.user)
+
+    @nextcord.slash_command(name="unlock", description="Unlock het huidige kanaal")
+    async def unlock_cmd(self, interaction: Interaction):
+        if not interaction.user.guild_permissions.manage_channels:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        await interaction.channel.set_permissions(interaction.guild.default_role, send_messages=None)
+        scheduler.cancel(f"unlock:{interaction.channel.id}")
+        await interaction.response.send_message("Kanaal unlocked.", ephemeral=True)
+        audit.event(interaction.guild.id, "Kanaal unlocked", fields=[("Kanaal", interaction.channel.mention)],
+                    color=GREEN, user=interaction.user)
+
+    @nextcord.slash_command(name="slowmode", description="Zet slowmode in seconden")
+    async def slowmode_cmd(self, interaction: Interaction, seconds: int = SlashOption(required=True),
+                           minuten: int = SlashOption(required=False, description="Na zoveel minuten terug naar de oude slowmode")):
+        if not interaction.user.guild_permissions.manage_channels:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        channel = interaction.channel
+        job = scheduler.get(f"slowmode:{channel.id}")
+        # a running timed slowmode goes back to the value from before it, not to its own
+        previous = job.params["delay"] if job else channel.slowmode_delay
+        await channel.edit(slowmode_delay=max(0, seconds))
+        if minuten and minuten > 0:
+            minuten = min(minuten, MAX_LOCK_MINUTES)
+            scheduler.schedule("slowmode", time.time() + minuten * 60, interaction.guild.id, channel.id,
+                               params={"delay": previous}, key=f"slowmode:{channel.id}")
+            await interaction.response.send_message(f"Slowmode ingesteld op {seconds} sec voor {minuten} minuten.",
+                                                    ephemeral=True)
+        else:
+            scheduler.cancel(f"slowmode:{channel.id}")
+            await interaction.response.send_message(f"Slowmode ingesteld op {seconds} sec.", ephemeral=True)
+        audit.event(interaction.guild.id, "Slowmode", fields=[("Kanaal", channel.mention), ("Slowmode", f"{seconds} sec"),
+                    ("Duur", f"{minuten} min" if minuten and minuten > 0 else "-")], user=interaction.user)
+
+    # scheduled (see scheduler.py) ---------------------------------------------
+    async def _unlock_job(self, job):
+        channel = self.bot.get_channel(job.channel_id)
+        if channel is None:
+            return
+        await channel.set_permissions(channel.guild.default_role, send_messages=None, reason="Lock verlopen")
+        logger.info(f"Timed lock of {channel} ended")
+        audit.event(job.guild_id, "Kanaal unlocked", "Lock verlopen.", fields=[("Kanaal", channel.mention)], color=GREEN)
+
+    async def _slowmode_job(self, job):
+        channel = self.bot.get_channel(job.channel_id)
+        if channel is None:
+            return
+        await channel.edit(slowmode_delay=job.params["delay"], reason="Slowmode verlopen")
+        logger.info(f"Timed slowmode of {channel} ended, back to {job.params['delay']} sec")
+        audit.event(job.guild_id, "Slowmode", "Slowmode verlopen.", fields=[("Kanaal", channel.mention),
+                    ("Slowmode", f"{job.params['delay']} sec")])
+
+    # -----------------------
+    # BULK JOBS (/massban, /masstimeout, /massrole)
+    # -----------------------
+    def _select(self, interaction: Interaction, ids, met_rol, gejoind_minuten) -> list:
+        """Ids from the text plus the members matching the role/join filters, without staff."""
+        guild = interaction.guild
+        targets = [int(x) for x in USER_ID.findall(ids or "")]
+        if met_rol or gejoind_minuten:
+            joined_after = time.time() - gejoind_minuten * 60 if gejoind_minuten else None
+            targets += member_store.select(guild, met_rol.id if met_rol else None, joined_after)
+        staff_roles = set(guild_configs.get(guild.id).staff_tiers)
+        skip = {self.bot.user.id, interaction.user.id, guild.owner_id}
+        selected = []
+        for uid in dict.fromkeys(targets):
+            if uid in skip:
+                continue
+            member = guild.get_member(uid)
+            if member is not None:
+                if is_staff(member):
+                    continue
+            else:
+                snap = member_store.get(guild.id, uid)
+                if snap and staff_roles.intersection(snap.roles):
+                    continue
+            selected.append(uid)
+        return selected
+
+    def _action(self, job):
+        """One REST call per member, straight on bot.http (no member objects needed)."""
+        http, guild_id, params = self.bot.http, job.guild_id, job.params
+        reason = params.get("reason")
+        if job.kind == "ban":
+            return lambda uid: http.ban(uid, guild_id, reason=reason)
+        if job.kind == "timeout":
+            return lambda uid: http.edit_member(guild_id, uid, reason=reason,
+                                                communication_disabled_until=params["until"])
+        return lambda uid: http.add_role(guild_id, uid, params["role_id"], reason=reason)
+
+    def _progress_embed(self, job) -> nextcord.Embed:
+        finished = job.done + len(job.failed)
+        pct = finished * 100 // job.total if job.total else 100
+        bar = "█" * (pct // 10) + "░" * (10 - pct // 10)
+        embed = nextcord.Embed(title=f"{BULK_TITLES[job.kind]} #{job.id}", description=f"{bar} {pct}%", color=BLUE)
+        embed.add_field(name="Gelukt", value=f"{job.done}/{job.total}", inline=True)
+        embed.add_field(name="Mislukt", value=str(len(job.failed)), inline=True)
+        embed.add_field(name="Status", value="Klaar" if job.status == "done" else f"Bezig ({job.rate:.1f}/s)", inline=True)
+        if job.status == "done" and job.failed:
+            embed.add_field(name="Opnieuw proberen", value=f"`/massresume job:{job.id}`", inline=False)
+        embed.set_footer(text=FOOTER)
+        return embed
+
+    async def _progress(self, job):
+        if job.status == "done":
+            audit.event(job.guild_id, f"{BULK_TITLES[job.kind]} #{job.id} klaar",
+                        fields=[("Gelukt", f"{job.done}/{job.total}"), ("Mislukt", str(len(job.failed))),
+                                ("Gestart door", f"<@{job.author_id}>" if job.author_id else "-")], color=RED)
+        channel = self.bot.get_channel(job.channel_id)
+        if channel and job.message_id:
+            await channel.get_partial_message(job.message_id).edit(embed=self._progress_embed(job))
+
+    def _start_job(self, job):
+        return bulk_jobs.start(job, self._action(job), self._progress)
+
+    async def _start_bulk(self, interaction: Interaction, kind: str, params: dict, ids, met_rol, gejoind_minuten, bevestig):
+        if not (ids or met_rol or gejoind_minuten):
+            return await interaction.response.send_message("Geef ids, met_rol of gejoind_minuten op.", ephemeral=True)
+        targets = self._select(interaction, ids, met_rol, gejoind_minuten)
+        if not targets:
+            return await interaction.response.send_message("Geen leden gevonden (staff wordt overgeslagen).", ephemeral=True)
+        if len(targets) > BULK_MAX_TARGETS:
+            return await interaction.response.send_message(f"Te veel leden ({len(targets)}), maximaal {BULK_MAX_TARGETS} per keer.", ephemeral=True)
+        if not bevestig:
+            preview = " ".join(f"<@{uid}>" for uid in targets[:20]) + (f" en {len(targets) - 20} meer" if len(targets) > 20 else "")
+            return await interaction.response.send_message(
+                f"{BULK_TITLES[kind]}: {len(targets)} leden.\n{preview}\nVoer het commando opnieuw uit met `bevestig: True` om te starten.",
+                ephemeral=True)
+        job = await bulk_jobs.create(interaction.guild.id, kind, params, targets, interaction.user.id, interaction.channel.id)
+        await interaction.response.send_message(embed=self._progress_embed(job))
+        message = await interaction.original_message()
+        await bulk_jobs.set_message(job, interaction.channel.id, message.id)
+        self._start_job(job)
+        logger.info(f"{interaction.user} started bulk job {job.id} ({kind}) for {len(targets)} members", extra=ctx(interaction))
+        audit.event(interaction.guild.id, f"{BULK_TITLES[kind]} #{job.id} gestart", fields=[("Leden", str(len(targets))),
+                    ("Reden", params.get("reason") or "-")], color=RED, user=interaction.user)
+
+    @nextcord.slash_command(name="massban", description="Ban veel gebruikers tegelijk (ids, rol of recente joins)")
+    async def massban_cmd(self, interaction: Interaction,
+                          ids: str = SlashOption(required=False, description="User ids of mentions"),
+                          met_rol: nextcord.Role = SlashOption(required=False, description="Leden met deze rol"),
+                          gejoind_minuten: int = SlashOption(required=False, description="Leden die in de laatste N minuten gejoind zijn"),
+                          reason: str = SlashOption(required=False),
+                          bevestig: bool = SlashOption(required=False, default=False, description="Start de job (anders alleen een voorbeeld)")):
+        if not interaction.user.guild_permissions.ban_members:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        params = {"reason": reason or f"Massban by {interaction.user}"}
+        await self._start_bulk(interaction, "ban", params, ids, met_rol, gejoind_minuten, bevestig)
+
+    @nextcord.slash_command(name="masstimeout", description="Time-out veel gebruikers tegelijk (ids, rol of recente joins)")
+    async def masstimeout_cmd(self, interaction: Interaction,
+                              minutes: int = SlashOption(required=True, description="Duur in minuten"),
+                              ids: str = SlashOption(required=False, description="User ids of mentions"),
+                              met_rol: nextcord.Role = SlashOption(required=False, description="Leden met deze rol"),
+                              gejoind_minuten: int = SlashOption(required=False, description="Leden die in de laatste N minuten gejoind zijn"),
+                              bevestig: bool = SlashOption(required=False, default=False, description="Start de job (anders alleen een voorbeeld)")):
+        if not interaction.user.guild_permissions.moderate_members:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        # the end time is fixed now, so a resumed job does not extend the timeout
+        until = datetime.now(timezone.utc) + timedelta(minutes=max(1, min(MAX_TIMEOUT_MINUTES, minutes)))
+        params = {"reason": f"Timed out by {interaction.user}", "until": until.isoformat()}
+        await self._start_bulk(interaction, "timeout", params, ids, met_rol, gejoind_minuten, bevestig)
+
+    @nextcord.slash_command(name="massrole", description="Geef een rol aan veel gebruikers tegelijk (ids, rol of recente joins)")
+    async def massrole_cmd(self, interaction: Interaction,
+                           role: nextcord.Role = SlashOption(required=True, description="Rol die gegeven wordt"),
+                           ids: str = SlashOption(required=False, description="User ids of mentions"),
+                           met_rol: nextcord.Role = SlashOption(required=False, description="Leden met deze rol"),
+                           gejoind_minuten: int = SlashOption(required=False, description="Leden die in de laatste N minuten gejoind zijn"),
+                           bevestig: bool = SlashOption(required=False, default=False, description="Start de job (anders alleen een voorbeeld)")):
+        if not interaction.user.guild_permissions.manage_roles:
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        params = {"reason": f"Massrole by {interaction.user}", "role_id": role.id}
+        await self._start_bulk(interaction, "role", params, ids, met_rol, gejoind_minuten, bevestig)
+
+    @nextcord.slash_command(name="massresume", description="Probeer de mislukte leden van een bulk job opnieuw")
+    async def massresume_cmd(self, interaction: Interaction, job: int = SlashOption(required=True, description="Job nummer")):
+        found = await bulk_jobs.get(job)
+        if found is None or found.guild_id != interaction.guild.id:
+            return await interaction.response.send_message("Job niet gevonden.", ephemeral=True)
+        if not getattr(interaction.user.guild_permissions, BULK_PERMISSIONS[found.kind]):
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        if job in bulk_jobs.running:
+            return await interaction.response.send_message("Deze job loopt nog.", ephemeral=True)
+        if not found.failed and not found.pending:
+            return await interaction.response.send_message("Deze job heeft geen mislukte leden.", ephemeral=True)
+        found = await bulk_jobs.retry_failed(job)
+        self._start_job(found)
+        await interaction.response.send_message(f"Job #{job} hervat: {len(found.pending)} leden.", ephemeral=True)
+        logger.info(f"{interaction.user} resumed bulk job {job}", extra=ctx(interaction))
+
+
+def setup(bot: commands.Bot):
+    bot.add_cog(Moderation(bot))
@@ -0,0 +1,237 @@
+# cogs/tickets.py - ticket panel, ticket buttons, auto-close of idle tickets, /ticketpanel and /transcript search
+
+import time
+from datetime import datetime, timezone
+
+import nextcord
+from nextcord import Interaction, SlashOption
+from nextcord.ext import commands
+from nextcord.ui import Button, View
+
+from auditlog import GREEN
+from botlog import ctx
+from config import BLUE, FOOTER, MULTI_GUILD, TICKET_IDLE_HOURS, TRANSCRIPT_FORMAT, TRANSCRIPT_GZIP
+from core import audit, bot, embeds, guild_configs, is_staff, logger, scheduler, stats, ticket_store, transcript_archive
+from transcripts import save_transcript
+
+
+# -----------------------
+# CLOSING (button or inactivity)
+# -----------------------
+async def close_ticket(channel: nextcord.TextChannel, closed_by: str, owner_id=None):
+    """Save the transcript, mark the ticket closed, hand the transcript to the archive and delete the channel."""
+    summary = await save_transcript(channel, fmt=TRANSCRIPT_FORMAT, compress=TRANSCRIPT_GZIP)
+    await ticket_store.close(channel.id)
+    scheduler.cancel(f"ticket:{channel.id}")
+    if summary:
+        # compressing and indexing happens on the archive thread
+        transcript_archive.submit(summary.path, channel.guild.id, channel.id, owner_id, channel.name)
+    audit.event(channel.guild.id, "Ticket gesloten", fields=[("Ticket", channel.name),
+                ("Eigenaar", f"<@{owner_id}>" if owner_id else "onbekend"), ("Gesloten door", closed_by),
+                ("Berichten", str(summary.messages) if summary else "-")])
+    try:
+        await channel.delete(reason=f"Closed by {closed_by}")
+    except Exception as e:
+        logger.exception("Could not delete ticket channel: %s", e)
+
+def schedule_idle_close(channel_id: int, guild_id: int, last_activity: float):
+    if TICKET_IDLE_HOURS:
+        scheduler.schedule("ticket_idle", last_activity + TICKET_IDLE_HOURS * 3600, guild_id, channel_id,
+                           key=f"ticket:{channel_id}")
+
+async def ticket_idle_job(job):
+    """Close a ticket without messages for TICKET_IDLE_HOURS. Checked lazily: when it had messages
+    since, the job is moved to the last message instead (no database write per message)."""
+    ticket = ticket_store.get(job.channel_id)
+    if ticket is None or not TICKET_IDLE_HOURS:
+        return
+    channel = bot.get_channel(job.channel_id)
+    if channel is None:
+        await ticket_store.close(job.channel_id)
+        return
+    last = ticket.created_at
+    if channel.last_message_id:
+        last = max(last, nextcord.utils.snowflake_time(channel.last_message_id).timestamp())
+    if last + TICKET_IDLE_HOURS * 3600 > time.time() + 1:
+        schedule_idle_close(channel.id, channel.guild.id, last)
+        return
+    logger.info(f"Closing ticket {channel.name}: no messages for {TICKET_IDLE_HOURS} hours")
+    await close_ticket(channel, "inactiviteit", ticket.owner_id)
+
+scheduler.register("ticket_idle", ticket_idle_job)
+
+
+# -----------------------
+# TICKET UI (Views / Buttons)
+# -----------------------
+class TicketCloseConfirm(View):
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @nextcord.ui.button(label="Bevestig sluiten", style=nextcord.ButtonStyle.danger, custom_id="moana:ticket:close_confirm")
+    @stats.timed("ticket.close_confirm")
+    async def confirm(self, button: Button, interaction: Interaction):
+        # only staff or author
+        ticket = ticket_store.get(interaction.channel.id)
+        author_id = ticket.owner_id if ticket else None
+        if not (is_staff(interaction.user) or interaction.user.id == author_id):
+            return await interaction.response.send_message("Je mag dit niet doen.", ephemeral=True)
+        await interaction.response.send_message("Ticket wordt gesloten... Transcript wordt opgeslagen.", ephemeral=True)
+        logger.info(f"{interaction.user} closing ticket {interaction.channel.name}", extra=ctx(interaction))
+        await close_ticket(interaction.channel, str(interaction.user), author_id)
+
+    @nextcord.ui.button(label="Annuleer", style=nextcord.ButtonStyle.secondary, custom_id="moana:ticket:close_cancel")
+    @stats.timed("ticket.close_cancel")
+    async def cancel(self, button: Button, interaction: Interaction):
+        await interaction.response.send_message("Sluiten geannuleerd.", ephemeral=True)
+
+class TicketView(View):
+    # one persistent view handles the buttons of every ticket, the state comes from ticket_store
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @nextcord.ui.button(label="Claim Ticket", style=nextcord.ButtonStyle.success, custom_id="moana:ticket:claim")
+    @stats.timed("ticket.claim")
+    async def claim(self, button: Button, interaction: Interaction):
+        if not is_staff(interaction.user):
+            return await interaction.response.send_message("Je hebt geen permissie om te claimen.", ephemeral=True)
+        ticket = ticket_store.get(interaction.channel.id)
+        if ticket and ticket.claimer_id:
+            return await interaction.response.send_message(f"Deze ticket is al geclaimed door <@{ticket.claimer_id}>.", ephemeral=True)
+        await ticket_store.claim(interaction.channel.id, interaction.user.id)
+        await interaction.channel.send(f"**{interaction.user}** heeft deze ticket geclaimed. Het is de bedoeling dat {interaction.user.mention} nu het aanspreekpunt is.")
+        await interaction.response.send_message("Ticket geclaimed.", ephemeral=True)
+        logger.info(f"{interaction.user} claimed ticket in {interaction.channel.name}", extra=ctx(interaction))
+        audit.event(interaction.guild.id, "Ticket geclaimed", fields=[("Ticket", interaction.channel.mention)],
+                    user=interaction.user)
+
+    @nextcord.ui.button(label="Sluit Ticket", style=nextcord.ButtonStyle.danger, custom_id="moana:ticket:close")
+    @stats.timed("ticket.close")
+    async def close(self, button: Button, interaction: Interaction):
+        await interaction.response.send_message("Weet je het zeker? Bevestig hieronder:", view=TicketCloseConfirm(), ephemeral=True)
+
+# members whose ticket channel is being created right now (guards double clicks)
+tickets_opening = set()
+
+class OpenTicketView(View):
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @nextcord.ui.button(label="📩 Open Ticket", style=nextcord.ButtonStyle.primary, custom_id="moana:ticket:open")
+    @stats.timed("ticket.open")
+    async def open_ticket(self, button: Button, interaction: Interaction):
+        guild = interaction.guild
+        member = interaction.user
+        key = (guild.id, member.id)
+        existing = ticket_store.open_for(guild.id, member.id)
+        if existing and guild.get_channel(existing):
+            return await interaction.response.send_message(f"Je hebt al een open ticket: <#{existing}>", ephemeral=True)
+        if key in tickets_opening:
+            return await interaction.response.send_message("Je ticket wordt al aangemaakt.", ephemeral=True)
+        if existing:
+            # channel was removed without closing the ticket
+            await ticket_store.close(existing)
+        tickets_opening.add(key)
+        try:
+            await self._create_ticket(interaction, guild, member)
+        finally:
+            tickets_opening.discard(key)
+
+    async def _create_ticket(self, interaction: Interaction, guild: nextcord.Guild, member: nextcord.Member):
+        # builds overwrites
+        overwrites = {
+            guild.default_role: nextcord.PermissionOverwrite(view_channel=False),
+            member: nextcord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
+        }
+        cfg = guild_configs.get(guild.id)
+        for role_id in cfg.staff_tiers:
+            staff_role = guild.get_role(role_id)
+            if staff_role:
+                overwrites[staff_role] = nextcord.PermissionOverwrite(view_channel=True, send_messages=True, read_message_history=True)
+
+        category = bot.get_channel(cfg.ticket_category) if cfg.ticket_category else None
+        name = f"ticket-{member.name}".lower()[:90]
+        channel = await guild.create_text_channel(name=name, overwrites=overwrites, category=category)
+        ticket = await ticket_store.create(channel.id, guild.id, member.id)
+        schedule_idle_close(channel.id, guild.id, ticket.created_at)
+        embed = embeds.render("ticket_intro", member=member, mention=member.mention)
+        await channel.send(content=(f"<@&{cfg.staff_role}>" if cfg.staff_role else None), embed=embed, view=TicketView())
+        await interaction.response.send_message(f"Ticket aangemaakt: {channel.mention}", ephemeral=True)
+        logger.info(f"Ticket created {channel.name} for {member}", extra=ctx(interaction))
+        audit.event(guild.id, "Ticket geopend", fields=[("Ticket", channel.mention)], color=GREEN, user=member)
+
+class TicketPanelView(View):
+    @nextcord.ui.button(label="Maak Ticket Panel", style=nextcord.ButtonStyle.primary)
+    @stats.timed("ticket.panel")
+    async def create_panel(self, button: Button, interaction: Interaction):
+        await interaction.channel.send(embed=embeds.render("ticket_panel"), view=OpenTicketView())
+        await interaction.response.send_message("Ticket panel geplaatst!", ephemeral=True)
+        logger.info(f"Ticket panel created by {interaction.user} in {interaction.channel.name}", extra=ctx(interaction))
+
+
+class Tickets(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.views_added = False
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.views_added:
+            # the ticket buttons have fixed custom_ids, so these views handle
+            # messages sent before a restart as well
+            await ticket_store.load()
+            # tickets opened before auto-close existed (or after it was switched on)
+            for ticket in ticket_store.open_tickets():
+                if scheduler.get(f"ticket:{ticket.channel_id}") is None:
+                    schedule_idle_close(ticket.channel_id, ticket.guild_id, ticket.created_at)
+            self.bot.add_view(OpenTicketView())
+            self.bot.add_view(TicketView())
+            self.bot.add_view(TicketCloseConfirm())
+            self.views_added = True
+            # transcripts saved before the archive existed (or while it was down); old file names have
+            # no guild id, with several guilds there is no telling whose they are
+            await transcript_archive.backfill("transcripts", None if MULTI_GUILD else guild_configs.home.guild_id)
+
+    @nextcord.slash_command(name="ticketpanel", description="Maak een ticket panel.")
+    async def ticketpanel(self, interaction: Interaction):
+        view = TicketPanelView()
+        await interaction.response.send_message(embed=embeds.render("ticket_panel_creator"), view=view, ephemeral=True)
+
+    @nextcord.slash_command(name="transcript", description="Transcripts van gesloten tickets (staff)")
+    async def transcript(self, interaction: Interaction):
+        pass
+
+    @transcript.subcommand(name="search", description="Zoek in de transcripts van gesloten tickets")
+    async def transcript_search(self, interaction: Interaction,
+                                zoekterm: str = SlashOption(required=False, description="Woorden die in de ticket staan (woord* zoekt ook op begin van een woord)"),
+                                eigenaar: nextcord.User = SlashOption(required=False, description="Eigenaar van de ticket"),
+                                auteur: nextcord.User = SlashOption(required=False, description="Heeft in de ticket geschreven"),
+                                sinds: str = SlashOption(required=False, description="Gesloten na (JJJJ-MM-DD)")):
+        if not is_staff(interaction.user):
+            return await interaction.response.send_message("Geen permissie.", ephemeral=True)
+        since = None
+        if sinds:
+            try:
+                since = datetime.strptime(sinds, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+            except ValueError:
+                return await interaction.response.send_message("Gebruik JJJJ-MM-DD voor de datum.", ephemeral=True)
+        t0 = time.perf_counter()
+        hits = await transcript_archive.search(interaction.guild.id, zoekterm or "",
+                                               owner_id=eigenaar.id if eigenaar else None,
+                                               author_id=auteur.id if auteur else None, since=since)
+        ms = (time.perf_counter() - t0) * 1000
+        lines = []
+        for hit in hits:
+            date = datetime.fromtimestamp(hit.closed_at, timezone.utc).strftime("%Y-%m-%d")
+            owner = f"<@{hit.owner_id}>" if hit.owner_id else "onbekend"
+            line = f"**{hit.channel_name}** - {owner} - {date} - {hit.messages} berichten"
+            if hit.snippet:
+                line += "\n> " + hit.snippet.replace("\n", " ")[:200]
+            lines.append(line)
+        embed = nextcord.Embed(title="🔎 Transcripts", description="\n".join(lines) or "Geen transcripts gevonden.", color=BLUE)
+        embed.set_footer(text=f"{len(hits)} resultaten in {ms:.0f}ms - {FOOTER}")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+def setup(bot: commands.Bot):
+    bot.add_cog(Tickets(bot))
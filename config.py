@@ -0,0 +1,112 @@
+# config.py - settings of the Moana bot (imported by main.py, core.py and the cogs)
+
+import os
+
+# -----------------------
+# CONFIG - paste token to env var 'TOKEN' in Replit / host
+# -----------------------
+
+TOKEN = os.getenv("TOKEN")  # recommended to use env var
+if not TOKEN:
+    print("ERROR: zet je bot token in environment variable TOKEN")
+# home guild: used as is when there is no guilds.json (single guild setup)
+GUILD_ID = 1442599860128976948
+WELCOME_CHANNEL = 1446155435819143382
+TICKET_CATEGORY = 1446530882721808552
+STAFF_ROLE_ID = 1446217175923953704
+LOG_CHANNEL_ID = 1446227079824932975
+# staff roles and their tier ("staff" < "moderator" < "admin"), STAFF_ROLE_ID is pinged on tickets
+STAFF_TIERS = {
+    STAFF_ROLE_ID: "staff",
+}
+
+# multi-guild mode: per-guild settings come from GUILDS_FILE, commands are
+# registered globally and the bot is auto-sharded
+MULTI_GUILD = os.getenv("MULTI_GUILD") == "1"
+GUILDS_FILE = "guilds.json"
+# guilds that get the slash commands; None = global registration
+COMMAND_GUILD_IDS = None if MULTI_GUILD else [GUILD_ID]
+
+# command groups, loaded as extensions at startup (see cogs/)
+EXTENSIONS = ("cogs.tickets", "cogs.moderation", "cogs.info", "cogs.forms")
+# commands are only synced with Discord when their hash differs from the last sync
+COMMANDS_HASH_FILE = "data/commands.sha256"
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC") == "1"
+
+# member cache: "full" = nextcord caches every member (chunked at startup),
+# "compact" = only small snapshots of the fields we show, see members.py
+MEMBER_CACHE = os.getenv("MEMBER_CACHE", "full")
+MEMBER_FETCH_CACHE = 5000  # members fetched over REST that are kept (LRU) ...
+MEMBER_FETCH_TTL = 300     # ... for this many seconds
+
+# /purge: filtered purges run in the background, deleted messages are archived
+PURGE_MAX = 5000          # messages deleted per command
+PURGE_SCAN_LIMIT = 20000  # messages looked at per command (filters can skip most of them)
+PURGE_FOLDER = "purges"
+PURGE_FORMAT = "jsonl"    # archive format, like TRANSCRIPT_FORMAT
+PURGE_GZIP = True
+PURGE_OLD_RATE = 1.0      # single deletes/s for messages older than 14 days (adapts to 429s, max 5/s)
+
+# bulk moderation (/massban, /masstimeout, /massrole), jobs continue after a restart
+BULK_DB = "data/bulk.db"
+BULK_CONCURRENCY = 4      # requests in flight per job
+BULK_RATE = 10.0          # start rate per guild and action (requests/s), lowered on every 429
+BULK_MAX_RATE = 50.0
+BULK_MAX_TARGETS = 5000   # members per command
+
+# visual constants
+BLUE = 0x3498db
+FOOTER = "Moana Scripts - 2025"
+# texts and layout of the fixed embeds (welcome, tickets, forms, moderation), hot-reloaded
+EMBEDS_FILE = "embeds.json"
+
+# anti-spam/link settings
+SPAM_LIMIT = 6          # messages
+SPAM_WINDOW = 8         # seconds
+SPAM_TIMEOUT = 60       # seconds timeout for spam
+SPAM_MAX_USERS = 50000  # max tracked users, least recently active are evicted first
+
+# copy-paste spam: the same or nearly the same text from several accounts or channels (see dupes.py)
+DUPE_WINDOW = 30          # seconds a text is remembered after its last copy
+DUPE_USERS = 4            # accounts posting it ...
+DUPE_CHANNELS = 3         # ... or channels it is posted in, before it is flagged
+DUPE_MIN_LENGTH = 20      # shorter messages (after normalizing) are not tracked
+DUPE_MAX_CLUSTERS = 20000 # texts remembered over all guilds, least recently posted are dropped first
+DUPE_TIMEOUT_MINUTES = 10
+
+# member joins: welcomes are batched, join floods switch on raid mode
+JOIN_BATCH_WINDOW = 3     # seconds joins are collected into one welcome
+RAID_JOINS = 10           # more joins than this ...
+RAID_WINDOW = 10          # ... within this many seconds is a raid
+RAID_COOLDOWN = 120       # seconds raid mode stays on after the last burst
+QUARANTINE_ROLE_ID = None # role for members joining during a raid (None = timeout instead), home guild
+RAID_TIMEOUT_MINUTES = 30
+
+# ticket transcripts: "txt", "jsonl" or "html", optionally gzipped
+TRANSCRIPT_FORMAT = "txt"
+TRANSCRIPT_GZIP = False
+# closed transcripts are gzipped and indexed for /transcript search
+TRANSCRIPT_DB = "data/transcripts.db"
+TRANSCRIPT_RETENTION_DAYS = 365  # None = keep forever
+
+# ticket state (survives restarts, buttons keep working)
+TICKET_DB = "data/tickets.db"
+TICKET_IDLE_HOURS = 72    # tickets without messages for this long are closed with a transcript (None = never)
+
+# timed jobs (lock/slowmode for a while, ticket auto-close, reminders), survive restarts
+SCHEDULER_DB = "data/scheduler.db"
+REMINDER_MAX = 25         # pending reminders per member
+
+# audit log: moderation and ticket events go to the log channel of the guild, up to 10 embeds per message
+AUDIT_INTERVAL = 5.0      # seconds events are collected before they are sent
+AUDIT_SPILL = "data/audit_spill.jsonl"  # events that could not be sent, replayed later
+
+# instrumentation: prometheus textfile export (None = off)
+METRICS_FILE = os.getenv("METRICS_FILE")
+
+# moderation rules (links, invites, banned words, mentions, caps), hot-reloaded
+# link timeout length etc. are configured there
+RULES_FILE = "rules.json"
+
+# logging: structured JSON lines instead of plain text
+LOG_JSON = os.getenv("LOG_JSON") == "1"
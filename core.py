@@ -0,0 +1,132 @@
+# core.py - the bot and the objects shared by main.py and the cogs
+#
+# Everything here is created once at import. The cogs import from this module
+# (not from main.py, which runs as __main__ and would be imported a second time).
+
+import os
+from datetime import datetime, timedelta
+
+import nextcord
+from nextcord.ext import commands
+
+from actions import ModerationDispatcher
+from archive import TranscriptArchive
+from auditlog import AuditSink
+from botlog import ctx, setup_logging
+from bulk import BulkRunner
+from config import (AUDIT_INTERVAL, AUDIT_SPILL, BLUE, BULK_CONCURRENCY, BULK_DB, BULK_MAX_RATE, BULK_RATE,
+                    COMMAND_GUILD_IDS, DUPE_CHANNELS, DUPE_MAX_CLUSTERS, DUPE_MIN_LENGTH, DUPE_USERS, DUPE_WINDOW,
+                    EMBEDS_FILE, FOOTER, GUILDS_FILE, GUILD_ID, LOG_CHANNEL_ID, LOG_JSON, MEMBER_CACHE,
+                    MEMBER_FETCH_CACHE, MEMBER_FETCH_TTL, MULTI_GUILD, PURGE_FOLDER, QUARANTINE_ROLE_ID,
+                    RULES_FILE, SCHEDULER_DB, SPAM_LIMIT, SPAM_MAX_USERS, SPAM_WINDOW, STAFF_ROLE_ID, STAFF_TIERS,
+                    TICKET_CATEGORY, TICKET_DB, TRANSCRIPT_DB, TRANSCRIPT_RETENTION_DAYS, WELCOME_CHANNEL)
+from dupes import DuplicateDetector
+from embeds import EmbedTemplates
+from guildconfig import GuildConfig, GuildConfigRegistry
+from members import MemberStore
+from perms import PermissionCache
+from ratelimit import SpamLimiter
+from rules import RuleEngine
+from scheduler import Scheduler
+from stats import Stats
+from ticketstore import TicketStore
+
+# directories
+os.makedirs("logs", exist_ok=True)
+os.makedirs("transcripts", exist_ok=True)
+os.makedirs("data", exist_ok=True)
+os.makedirs(PURGE_FOLDER, exist_ok=True)
+
+# logging (written from a background thread, rotated and gzipped)
+logger = setup_logging("moana_bot", "logs/bot.log", json_mode=LOG_JSON,
+                       rotate="size", max_bytes=10 * 1024 * 1024, backups=10)
+
+intents = nextcord.Intents.default()
+intents.message_content = True
+intents.members = True
+intents.guilds = True
+
+# compact member cache: nextcord keeps no members, members.py keeps snapshots
+cache_options = {}
+if MEMBER_CACHE == "compact":
+    cache_options = dict(member_cache_flags=nextcord.MemberCacheFlags.none(), chunk_guilds_at_startup=False)
+
+# default_guild_ids registers every slash command for all these guilds at once
+if MULTI_GUILD:
+    bot = commands.AutoShardedBot(command_prefix="!", intents=intents, default_guild_ids=COMMAND_GUILD_IDS, **cache_options)
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents, default_guild_ids=COMMAND_GUILD_IDS, **cache_options)
+
+# handler timings, loop lag and REST counters (shown by /stats)
+stats = Stats()
+stats.install(bot)
+
+# link/word/mention rules, checked in one pass per message
+rule_engine = RuleEngine(RULES_FILE)
+rule_engine.load()
+
+# embed layouts from embeds.json, compiled once into payloads that only get their variables filled in
+embeds = EmbedTemplates(EMBEDS_FILE, BLUE, FOOTER)
+embeds.load()
+
+# per-guild channels and roles, O(1) lookup by guild id
+guild_configs = GuildConfigRegistry(GUILDS_FILE, home=GuildConfig(
+    GUILD_ID, welcome_channel=WELCOME_CHANNEL, ticket_category=TICKET_CATEGORY, staff_role=STAFF_ROLE_ID,
+    staff_tiers=STAFF_TIERS, log_channel=LOG_CHANNEL_ID, quarantine_role=QUARANTINE_ROLE_ID))
+if MULTI_GUILD:
+    guild_configs.load()
+
+# moderation/ticket events for the log channel: queued, sent in batches, spilled to disk when Discord fails
+audit = AuditSink(lambda guild_id: bot.get_channel(guild_configs.get(guild_id).log_channel), AUDIT_SPILL, BLUE, FOOTER,
+                  interval=AUDIT_INTERVAL)
+
+# resolved staff tiers per member, invalidated from member/role events
+perm_cache = PermissionCache(lambda guild_id: guild_configs.get(guild_id).staff_tiers)
+guild_configs.on_reload.append(perm_cache.clear)
+
+# member snapshots / REST lookups and per-role member counts, updated from raw member events
+member_store = MemberStore(compact=MEMBER_CACHE == "compact", fetch_cache_size=MEMBER_FETCH_CACHE,
+                           fetch_ttl=MEMBER_FETCH_TTL)
+member_store.install(bot)
+member_store.on_change.append(perm_cache.forget_member)
+
+# open/claimed tickets, loaded in on_ready
+ticket_store = TicketStore(TICKET_DB)
+
+# searchable archive of closed ticket transcripts, indexed off the event loop
+transcript_archive = TranscriptArchive(TRANSCRIPT_DB, retention_days=TRANSCRIPT_RETENTION_DAYS)
+
+# in-memory spam tracker: per-user ring buffers, idle users are swept
+spam_tracker = SpamLimiter(SPAM_LIMIT, SPAM_WINDOW, max_users=SPAM_MAX_USERS)
+
+# copy-paste spam over accounts and channels: fingerprints of recent texts per guild
+dupe_detector = DuplicateDetector(window=DUPE_WINDOW, min_users=DUPE_USERS, min_channels=DUPE_CHANNELS,
+                                  min_length=DUPE_MIN_LENGTH, max_clusters=DUPE_MAX_CLUSTERS)
+
+# timed jobs: one timer for all of them, handlers are registered by the cogs, started in on_ready
+scheduler = Scheduler(SCHEDULER_DB)
+scheduler.load()
+
+# helper functions
+def is_staff(member: nextcord.Member, tier: str = "staff") -> bool:
+    """Staff role (or higher tier) or manage_messages permission. Cached, see perms.py."""
+    return perm_cache.has(member, tier)
+
+async def try_timeout_member(member: nextcord.Member, minutes: int, reason: str):
+    """Try to timeout (mute) a member. If API not supporting, ignore."""
+    try:
+        until = datetime.utcnow() + timedelta(minutes=minutes)
+        # nextcord uses edit(timeout=...) in some versions; try both
+        try:
+            await member.timeout(until, reason=reason)
+        except Exception:
+            await member.edit(timeout=until)
+        logger.info(f"Timed out {member} for {minutes} minutes: {reason}", extra=ctx(member))
+    except Exception as e:
+        logger.exception("Failed to timeout member: %s", e)
+
+# bulk bans/timeouts/roles, rate limited per guild and action, resumed in on_ready
+bulk_jobs = BulkRunner(BULK_DB, concurrency=BULK_CONCURRENCY, rate=BULK_RATE, max_rate=BULK_MAX_RATE)
+
+# automatic moderation actions (timeouts, deletes, notices) are queued and coalesced
+mod_actions = ModerationDispatcher(try_timeout_member, window=1.0, concurrency=4)
@@ -0,0 +1,233 @@
+# dupes.py - copy-paste spam detection across users and channels
+#
+# The spam limiter counts messages per user. Raids where many accounts post the
+# same (or a slightly changed) text stay under that limit, so every message is
+# also fingerprinted here:
+#   - the content is normalized: NFKC (fullwidth and "bold" letters become
+#     plain ones), casefolded, zero-width characters, user/role/channel
+#     mentions and emoji ids removed, punctuation and whitespace collapsed
+#   - an exact hash of the normalized text
+#   - a bottom-k MinHash sketch: the k smallest hashes of its 5-character
+#     shingles. Two texts share a sketch value with a probability equal to
+#     their Jaccard similarity, so a copy with a word changed or appended
+#     still shares most of them.
+# The exact hash and the `bands` smallest sketch values, combined with the guild
+# id, are keys in one index key -> cluster. A message looks up its few keys and joins the
+# first cluster whose sketch is similar enough, or starts a new one, so a check
+# costs the same no matter how many messages were seen. A cluster is flagged
+# once `min_users` accounts posted it, or it was posted in `min_channels`
+# channels, within `window` seconds of each other; after that every further
+# copy is flagged directly.
+#
+# Clusters are kept in LRU order (last copy last) and expire from the front
+# `window` seconds after their last copy. Their number is capped and every
+# cluster keeps a bounded number of keys, users and messages, so memory does
+# not grow with the message rate. Expiry runs on every check and from a sweeper
+# task, so it also happens when the server goes quiet. When a flagged cluster
+# expires (or is evicted) with copies after the one that flagged it,
+# `on_expire(cluster)` is called, so those can be reported once instead of per
+# copy.
+
+import asyncio
+import itertools
+import logging
+import re
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from background import ensure_task
+
+logger = logging.getLogger("moana_bot")
+
+SHINGLE = 5      # characters per shingle
+MAX_TEXT = 1000  # characters of a message that are fingerprinted
+
+# custom emoji keep their name, mentions are dropped (raids mention different people)
+_NOISE = re.compile(r"<a?:(\w+):\d+>|<(?:@[!&]?|#)\d+>")
+_WORD = re.compile(r"\w+")
+_INVISIBLE = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\u200e\u200f\u2060\u2062\u2063\ufeff"), None)
+
+
+def normalize(text: str) -> str:
+    text = _NOISE.sub(lambda m: m.group(1) or " ", text[:MAX_TEXT])
+    text = unicodedata.normalize("NFKC", text.translate(_INVISIBLE)).casefold()
+    return " ".join(_WORD.findall(text))
+
+
+def sketch(text: str, k: int = 16) -> list:
+    """Bottom-k MinHash of a normalized text: the k smallest shingle hashes, ascending.
+    Uses hash(), so sketches are only comparable within one process."""
+    n = max(1, len(text) - SHINGLE + 1)
+    # all shingles text[i:i + SHINGLE] without a python-level loop
+    shingles = map(text.__getitem__, map(slice, range(n), range(SHINGLE, n + SHINGLE)))
+    return sorted(set(map(hash, shingles)))[:k]
+
+
+def similarity(a, b, k: int = 16) -> float:
+    """Jaccard estimate of two bottom-k sketches: the share of the k smallest values of
+    both that is in both."""
+    sa, sb = set(a), set(b)
+    union = sorted(sa | sb)[:k]
+    if not union:
+        return 0.0
+    return len(sa.intersection(sb, union)) / len(union)
+
+
+class Cluster:
+    """Messages with the same or nearly the same text in one guild."""
+
+    __slots__ = ("id", "guild_id", "text", "sketch", "keys", "users", "channels", "messages", "count",
+                 "first", "last", "flagged", "reported")
+
+    def __init__(self, id: int, guild_id: int, text: str, sketch: list, now: float):
+        self.id = id
+        self.guild_id = guild_id
+        self.text = text[:100]  # sample for logs
+        self.sketch = array("q", sketch)
+        self.keys = array("q")  # index keys pointing here
+        self.users = set()
+        self.channels = set()
+        self.messages = []      # copies not handed out yet
+        self.count = 0
+        self.first = now
+        self.last = now
+        self.flagged = False
+        self.reported = 0       # copies when it was flagged, the rest is summed up at expiry
+
+
+class Flag(NamedTuple):
+    cluster: Cluster
+    messages: list  # copies to act on: all of them when the cluster was just flagged, else this one
+    new: bool       # this message made the cluster cross the threshold
+
+
+class DuplicateDetector:
+    def __init__(self, window: float = 30.0, min_users: int = 4, min_channels: int = 3, min_length: int = 20,
+                 threshold: float = 0.6, k: int = 16, bands: int = 4, max_clusters: int = 20000,
+                 max_keys: int = 32, max_messages: int = 100, max_users: int = 1000, clock=time.monotonic):
+        self.window = window
+        self.min_users = min_users
+        self.min_channels = min_channels
+        self.min_length = min_length      # shorter texts ("hallo", "ok thanks") are not tracked
+        self.threshold = threshold        # estimated Jaccard similarity to join a cluster
+        self.k = k
+        self.bands = bands                # smallest sketch values used as index keys
+        self.max_clusters = max_clusters
+        self.max_keys = max_keys          # per cluster
+        self.max_messages = max_messages  # per cluster, held until it is flagged
+        self.max_users = max_users        # per cluster, users and channels
+        self.clock = clock
+        self.on_expire = None             # fn(cluster), for flagged clusters with copies after the flag
+        self.checked = 0
+        self.flagged = 0
+        self._index = {}                  # hash((guild_id, fingerprint)) -> Cluster
+        self._clusters = OrderedDict()    # cluster id -> Cluster, least recently hit first
+        self._ids = itertools.count(1)
+        self._sweeper = None
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def _drop(self, cluster: Cluster):
+        index = self._index
+        for key in cluster.keys:
+            if index.get(key) is cluster:
+                del index[key]
+        if cluster.flagged and cluster.count > cluster.reported and self.on_expire is not None:
+            self.on_expire(cluster)
+
+    def _add_keys(self, cluster: Cluster, keys):
+        index = self._index
+        for key in keys:
+            if len(cluster.keys) >= self.max_keys:
+                break
+            if index.get(key) is not cluster:
+                index[key] = cluster  # the newer cluster wins a shared key
+                cluster.keys.append(key)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop clusters without a copy in the last `window` seconds. Returns the amount dropped."""
+        cutoff = (self.clock() if now is None else now) - self.window
+        clusters = self._clusters
+        dropped = 0
+        while clusters:
+            cluster = clusters[next(iter(clusters))]
+            if cluster.last >= cutoff:
+                break
+            del clusters[cluster.id]
+            self._drop(cluster)
+            dropped += 1
+        return dropped
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                dropped = self.expire()
+                if dropped:
+                    logger.debug(f"Duplicate detector expired {dropped} clusters")
+            except Exception as e:
+                logger.exception("Duplicate detector sweep failed: %s", e)
+
+    def start_sweeper(self, interval: float = 30.0):
+        """Start the periodic sweeper task."""
+        self._sweeper = ensure_task(self._sweeper, self._sweep_loop, interval)
+        return self._sweeper
+
+    def check(self, message) -> Optional[Flag]:
+        """Register a guild message. Returns a Flag when it belongs to a flagged cluster."""
+        text = normalize(message.content)
+        if len(text) < self.min_length:
+            return None
+        now = self.clock()
+        self.expire(now)
+        self.checked += 1
+        guild_id = message.guild.id
+        exact = hash((guild_id, hash(text)))
+        cluster = self._index.get(exact)
+        if cluster is not None and cluster.guild_id != guild_id:
+            cluster = None  # hash collision
+        if cluster is None:
+            sk = sketch(text, self.k)
+            keys = [hash((guild_id, h)) for h in sk[:self.bands]]
+            tried = set()
+            for key in keys:
+                c = self._index.get(key)
+                if c is not None and c.guild_id == guild_id and c.id not in tried:
+                    if similarity(sk, c.sketch, self.k) >= self.threshold:
+                        cluster = c
+                        break
+                    tried.add(c.id)
+            if cluster is None:
+                if len(self._clusters) >= self.max_clusters:
+                    _, oldest = self._clusters.popitem(last=False)
+                    self._drop(oldest)
+                cluster = Cluster(next(self._ids), guild_id, text, sk, now)
+                self._clusters[cluster.id] = cluster
+            else:
+                self._clusters.move_to_end(cluster.id)
+            self._add_keys(cluster, [exact] + keys)
+        else:
+            self._clusters.move_to_end(cluster.id)
+
+        cluster.last = now
+        cluster.count += 1
+        if len(cluster.users) < self.max_users:
+            cluster.users.add(message.author.id)
+        if len(cluster.channels) < self.max_users:
+            cluster.channels.add(message.channel.id)
+        if cluster.flagged:
+            self.flagged += 1
+            return Flag(cluster, [message], False)
+        if len(cluster.messages) < self.max_messages:
+            cluster.messages.append(message)
+        if len(cluster.users) >= self.min_users or len(cluster.channels) >= self.min_channels:
+            cluster.flagged = True
+            cluster.reported = cluster.count
+            messages, cluster.messages = cluster.messages, []
+            self.flagged += len(messages)
+            return Flag(cluster, messages, True)
+        return None
@@ -0,0 +1,160 @@
+# embeds.py - embed templates from embeds.json, compiled once
+#
+# The fixed embeds of the bot (welcome, ticket intro and panels, review,
+# suggestion, moderation notices) are defined in embeds.json, so their texts
+# can be changed without touching the code. Strings use {name} placeholders
+# (str.format, write {{ and }} for literal braces); "defaults" fills in values
+# that are missing or empty. Color and footer default to BLUE and FOOTER.
+#
+# Every template is compiled into the payload dict nextcord would send
+# (Embed.to_dict() format). Rendering copies that dict and formats only the
+# strings that have placeholders; templates without placeholders render to one
+# shared embed. The result is a PrebuiltEmbed, whose to_dict() returns the
+# payload as is. The file is polled and recompiled in a thread on changes.
+
+import json
+import logging
+import os
+
+import nextcord
+
+from filewatch import WatchedFile
+
+logger = logging.getLogger("moana_bot")
+
+# discord limits for the strings that get filled in
+LIMITS = {"title": 256, "description": 4096, "name": 256, "value": 1024, "text": 2048}
+
+
+class PrebuiltEmbed(nextcord.Embed):
+    """Embed that sends a prebuilt payload. Treat it as read-only: reading attributes works
+    (through a normal Embed built on demand), but changes are not sent."""
+
+    __slots__ = ("_payload",)
+
+    def __init__(self, payload: dict):
+        self._payload = payload
+
+    def to_dict(self) -> dict:
+        return self._payload
+
+    def __getattr__(self, name):
+        if name == "_payload":
+            raise AttributeError(name)
+        return getattr(nextcord.Embed.from_dict(self._payload), name)
+
+
+class _Values(dict):
+    def __missing__(self, key):
+        # an unknown placeholder (typo in embeds.json) stays visible instead of failing the command
+        return "{" + key + "}"
+
+
+def _has_placeholders(value) -> bool:
+    return isinstance(value, str) and ("{" in value or "}" in value)
+
+
+class EmbedTemplate:
+    __slots__ = ("name", "payload", "defaults", "slots", "shared")
+
+    def __init__(self, name: str, cfg: dict, color: int, footer: str):
+        self.name = name
+        payload = {"type": "rich"}
+        for key in ("title", "description", "url"):
+            if cfg.get(key):
+                payload[key] = cfg[key]
+        c = cfg.get("color", color)
+        payload["color"] = int(c.lstrip("#"), 16) if isinstance(c, str) else c
+        text = cfg.get("footer", footer)
+        if text:
+            payload["footer"] = {"text": text}
+        if cfg.get("author"):
+            payload["author"] = {"name": cfg["author"]}
+        for key in ("image", "thumbnail"):
+            if cfg.get(key):
+                payload[key] = {"url": cfg[key]}
+        if cfg.get("fields"):
+            payload["fields"] = [{"name": f["name"], "value": f["value"], "inline": bool(f.get("inline", False))}
+                                 for f in cfg["fields"]]
+        self.payload = payload
+        self.defaults = cfg.get("defaults", {})
+
+        # (path, limit, format string) of every string with placeholders
+        self.slots = []
+        for key, value in payload.items():
+            if _has_placeholders(value):
+                self.slots.append(((key,), LIMITS.get(key), value))
+            elif isinstance(value, dict):
+                self.slots.extend(((key, sub), LIMITS.get(sub), v) for sub, v in value.items() if _has_placeholders(v))
+            elif isinstance(value, list):
+                for i, field in enumerate(value):
+                    self.slots.extend(((key, i, sub), LIMITS.get(sub), field[sub])
+                                      for sub in ("name", "value") if _has_placeholders(field[sub]))
+        self.shared = PrebuiltEmbed(payload) if not self.slots else None
+
+    def render(self, **values) -> PrebuiltEmbed:
+        if self.shared is not None:
+            return self.shared
+        for key, default in self.defaults.items():
+            if values.get(key) in (None, ""):
+                values[key] = default
+        values = _Values(values)
+        base = self.payload
+        payload = dict(base)
+        for path, limit, fmt in self.slots:
+            text = fmt.format_map(values)
+            if limit and len(text) > limit:
+                text = text[:limit - 1] + "…"
+            if len(path) == 1:
+                payload[path[0]] = text
+            elif len(path) == 2:
+                key, sub = path
+                d = payload[key]
+                if d is base[key]:
+                    d = payload[key] = dict(d)
+                d[sub] = text
+            else:
+                key, i, sub = path
+                fields = payload[key]
+                if fields is base[key]:
+                    fields = payload[key] = list(fields)
+                if fields[i] is base[key][i]:
+                    fields[i] = dict(fields[i])
+                fields[i][sub] = text or "\u200b"  # discord refuses empty field values
+        return PrebuiltEmbed(payload)
+
+
+class EmbedTemplates(WatchedFile):
+    """Loads embeds.json and keeps it up to date while the bot runs."""
+
+    watch_name = "embed templates"
+
+    def __init__(self, path: str, color: int, footer: str):
+        self.path = path
+        self.color = color
+        self.footer = footer
+        self.templates = {}
+        self._mtime = None
+        self._watcher = None
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        return mtime, {name: EmbedTemplate(name, cfg, self.color, self.footer) for name, cfg in data.items()}
+
+    def _apply(self, loaded):
+        self._mtime, self.templates = loaded
+
+    def load(self) -> bool:
+        """Load synchronously (at startup). Keeps the old templates if the file is broken."""
+        try:
+            self._apply(self._load())
+            logger.info(f"Loaded {len(self.templates)} embed templates from {self.path}")
+            return True
+        except Exception as e:
+            logger.exception("Loading embed templates failed: %s", e)
+        return False
+
+    def render(self, name: str, **values) -> nextcord.Embed:
+        return self.templates[name].render(**values)
@@ -0,0 +1,53 @@
+# filewatch.py - reload a config file when it changes
+#
+# rules.json, embeds.json and guilds.json are all loaded at startup and then
+# polled: every `interval` seconds the mtime is read in a thread, and only when
+# it changed the file is parsed (also in a thread) and swapped in on the event
+# loop. A broken file keeps the old version; its mtime is remembered so it is
+# not retried (and logged) every interval.
+
+import asyncio
+import logging
+import os
+
+from background import ensure_task
+
+logger = logging.getLogger("moana_bot")
+
+
+class WatchedFile:
+    """Mixin for objects loaded from `self.path`.
+
+    Subclasses set `watch_name` (for logs), optionally `watch_interval`, and implement _load() -> (mtime, ...),
+    which runs in a thread, and _apply(loaded), which runs on the loop. `self._mtime` holds the mtime of the
+    version in use."""
+
+    watch_name = "file"
+    watch_interval = 5.0
+    path = None
+    _mtime = None
+    _watcher = None
+
+    def _apply(self, loaded):
+        raise NotImplementedError
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            mtime = self._mtime
+            try:
+                mtime = (await asyncio.to_thread(os.stat, self.path)).st_mtime
+                if mtime == self._mtime:
+                    continue
+                self._apply(await asyncio.to_thread(self._load))
+                logger.info(f"Reloaded {self.watch_name} from {self.path}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                self._mtime = mtime
+                logger.exception("Reloading %s failed, keeping the old version: %s", self.watch_name, e)
+
+    def start_watcher(self, interval: float = None):
+        """Poll the file for changes."""
+        self._watcher = ensure_task(self._watcher, self._watch, interval or self.watch_interval)
+        return self._watcher
@@ -0,0 +1,117 @@
+# guildconfig.py - per-guild settings
+#
+# One process can serve many guilds. Every guild gets a GuildConfig with its
+# channels and roles, loaded from guilds.json and kept in a dict, so handlers
+# look up their settings with one dict access. The file is polled for changes
+# and reloaded in a thread (like rules.json). Guilds that are not in the file
+# use the "defaults" section; the home guild from main.py is always present so
+# a single-guild setup works without any file.
+#
+# guilds.json:
+# {
+#     "defaults": {"welcome_channel": null, ...},
+#     "guilds": {
+#         "1234": {"welcome_channel": 5678, "staff_tiers": {"91011": "staff"}, ...}
+#     }
+# }
+
+import json
+import logging
+import os
+from typing import Optional
+
+from filewatch import WatchedFile
+from perms import TIERS
+
+logger = logging.getLogger("moana_bot")
+
+FIELDS = ("welcome_channel", "ticket_category", "staff_role", "staff_tiers", "log_channel", "quarantine_role")
+
+
+class GuildConfig:
+    __slots__ = ("guild_id",) + FIELDS
+
+    def __init__(self, guild_id: int, welcome_channel: Optional[int] = None, ticket_category: Optional[int] = None,
+                 staff_role: Optional[int] = None, staff_tiers: Optional[dict] = None,
+                 log_channel: Optional[int] = None, quarantine_role: Optional[int] = None):
+        self.guild_id = guild_id
+        self.welcome_channel = welcome_channel
+        self.ticket_category = ticket_category
+        self.staff_role = staff_role            # pinged on new tickets
+        self.staff_tiers = {}                   # role_id -> tier
+        for role_id, tier in (staff_tiers or {}).items():
+            if tier in TIERS:
+                self.staff_tiers[int(role_id)] = tier
+            else:
+                logger.warning(f"Guild {guild_id}: unknown staff tier {tier!r} for role {role_id} skipped "
+                               f"(expected one of {', '.join(TIERS)})")
+        if staff_role and staff_role not in self.staff_tiers:
+            self.staff_tiers[staff_role] = "staff"
+        self.log_channel = log_channel
+        self.quarantine_role = quarantine_role
+
+    @classmethod
+    def from_dict(cls, guild_id: int, data: dict, defaults: dict = None) -> "GuildConfig":
+        merged = dict(defaults or {})
+        merged.update(data)
+        return cls(guild_id, **{k: merged.get(k) for k in FIELDS})
+
+    def __repr__(self):
+        return f"<GuildConfig {self.guild_id}>"
+
+
+class GuildConfigRegistry(WatchedFile):
+    watch_name = "guild config"
+    watch_interval = 10.0
+
+    def __init__(self, path: str, home: Optional[GuildConfig] = None):
+        self.path = path
+        self.home = home
+        self._configs = {home.guild_id: home} if home else {}
+        self._defaults = {}
+        self._fallback = {}  # guild_id -> default config, built on first use
+        self._mtime = None
+        self._watcher = None
+        self.on_reload = []  # callbacks, e.g. to drop caches that depend on the config
+
+    def get(self, guild_id: int) -> GuildConfig:
+        cfg = self._configs.get(guild_id)
+        if cfg is None:
+            cfg = self._fallback.get(guild_id)
+            if cfg is None:
+                cfg = self._fallback[guild_id] = GuildConfig.from_dict(guild_id, {}, self._defaults)
+        return cfg
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    def guild_ids(self) -> list:
+        return list(self._configs)
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        defaults = data.get("defaults", {})
+        configs = {int(gid): GuildConfig.from_dict(int(gid), cfg, defaults) for gid, cfg in data.get("guilds", {}).items()}
+        if self.home and self.home.guild_id not in configs:
+            configs[self.home.guild_id] = self.home
+        return mtime, defaults, configs
+
+    def _apply(self, loaded):
+        self._mtime, self._defaults, self._configs = loaded
+        self._fallback = {}
+        for cb in self.on_reload:
+            cb()
+
+    def load(self) -> bool:
+        """Load synchronously (at startup). Without a file only the home guild is known."""
+        try:
+            self._apply(self._load())
+            logger.info(f"Loaded config for {len(self._configs)} guilds from {self.path}")
+            return True
+        except FileNotFoundError:
+            logger.info(f"No {self.path}, running with the home guild config only.")
+        except Exception as e:
+            logger.exception("Loading guild config failed: %s", e)
+        return False
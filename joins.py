@@ -0,0 +1,120 @@
+# joins.py - member join pipeline: batched welcomes and raid mode
+#
+# on_member_join only hands the member to JoinPipeline.add(). Joins are
+# buffered per guild for `window` seconds and then welcomed with one embed.
+# A sliding window of join times detects raids: more than `raid_joins` joins
+# within `raid_window` seconds switches the guild into raid mode, where
+# welcomes are suppressed and every new member (including the ones still in
+# the buffer) is quarantined. Raid mode ends `raid_cooldown` seconds after the
+# join rate drops below the threshold.
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger("moana_bot")
+
+
+class _GuildJoins:
+    __slots__ = ("buffer", "stamps", "raid_until", "flush_task")
+
+    def __init__(self):
+        self.buffer = []
+        self.stamps = deque()
+        self.raid_until = 0.0
+        self.flush_task = None
+
+
+class JoinPipeline:
+    def __init__(self, welcome_fn, quarantine_fn, alert_fn=None, window: float = 3.0,
+                 raid_joins: int = 10, raid_window: float = 10.0, raid_cooldown: float = 120.0,
+                 concurrency: int = 4, clock=time.monotonic):
+        """welcome_fn(members) sends one welcome for a batch, quarantine_fn(member) handles
+        one member during a raid, alert_fn(guild, active, joins) is told when raid mode
+        switches on or off."""
+        self.welcome_fn = welcome_fn
+        self.quarantine_fn = quarantine_fn
+        self.alert_fn = alert_fn
+        self.window = window
+        self.raid_joins = raid_joins
+        self.raid_window = raid_window
+        self.raid_cooldown = raid_cooldown
+        self.clock = clock
+        self._sem = asyncio.Semaphore(concurrency)
+        self._guilds = {}  # guild_id -> _GuildJoins
+        self._tasks = set()  # keep references to fire-and-forget tasks
+
+    def _state(self, guild_id: int) -> _GuildJoins:
+        g = self._guilds.get(guild_id)
+        if g is None:
+            g = self._guilds[guild_id] = _GuildJoins()
+        return g
+
+    def in_raid(self, guild_id: int) -> bool:
+        g = self._guilds.get(guild_id)
+        return g is not None and g.raid_until > self.clock()
+
+    def add(self, member):
+        """Register a join. Never waits on the API."""
+        now = self.clock()
+        guild = member.guild
+        g = self._state(guild.id)
+        stamps = g.stamps
+        stamps.append(now)
+        while stamps and stamps[0] <= now - self.raid_window:
+            stamps.popleft()
+
+        was_raid = g.raid_until > now
+        if len(stamps) > self.raid_joins:
+            g.raid_until = now + self.raid_cooldown
+        if g.raid_until > now:
+            if not was_raid:
+                logger.warning(f"Raid mode on in {guild} ({len(stamps)} joins in {self.raid_window}s)")
+                self._spawn(self._alert(guild, True, len(stamps)))
+                # the members waiting for a welcome joined in the same wave
+                waiting, g.buffer = g.buffer, []
+                for m in waiting:
+                    self._spawn(self._quarantine(m))
+            self._spawn(self._quarantine(member))
+            return
+
+        if g.raid_until:
+            # raid mode ran out, noticed at the first normal join after it
+            g.raid_until = 0.0
+            logger.info(f"Raid mode off in {guild}")
+            self._spawn(self._alert(guild, False, len(stamps)))
+        g.buffer.append(member)
+        if g.flush_task is None or g.flush_task.done():
+            g.flush_task = asyncio.get_running_loop().create_task(self._flush_later(guild.id))
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_later(self, guild_id: int):
+        await asyncio.sleep(self.window)
+        g = self._guilds[guild_id]
+        members, g.buffer = g.buffer, []
+        if not members:
+            return
+        try:
+            await self.welcome_fn(members)
+        except Exception as e:
+            logger.exception("Welcome batch failed: %s", e)
+
+    async def _quarantine(self, member):
+        async with self._sem:
+            try:
+                await self.quarantine_fn(member)
+            except Exception as e:
+                logger.exception("Quarantine of %s failed: %s", member, e)
+
+    async def _alert(self, guild, active: bool, joins: int):
+        if self.alert_fn is None:
+            return
+        try:
+            await self.alert_fn(guild, active, joins)
+        except Exception as e:
+            logger.exception("Raid alert failed: %s", e)
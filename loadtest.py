@@ -0,0 +1,550 @@
+# loadtest.py - offline load test for the bot's event handlers
+#
+# Loads main.py (and its cogs) without connecting to Discord, puts a fake gateway in front of
+# the handlers and a fake REST layer behind them, then replays a synthetic (or
+# recorded) event stream at a fixed rate. Reports throughput, latency
+# percentiles per event kind, allocations and REST calls per route.
+#
+# Run: python3 loadtest.py                          (mixed traffic, 2000 events at 200/s)
+#      python3 loadtest.py --scenario raid --events 5000 --rate 1000
+#      python3 loadtest.py --replay events.jsonl    (one {"t": .., "kind": .., ...} per line)
+#      python3 loadtest.py --save base.json          then later
+#      python3 loadtest.py --compare base.json       (exit code 1 when p95 got worse)
+#
+# Needs nextcord installed (pip install -r requirements.txt), but no token.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = {
+    "chat": {"chat": 1.0},
+    "raid": {"link": 0.4, "spam": 0.2, "join": 0.4},
+    "tickets": {"ticket": 1.0},
+    "mixed": {"chat": 0.6, "link": 0.05, "spam": 0.05, "join": 0.1, "ticket": 0.05, "modal": 0.05, "command": 0.1},
+}
+
+WORDS = ("hallo", "script", "werkt", "niet", "help", "bedankt", "vraag", "prijs", "update", "server", "ik", "wil")
+
+
+# -----------------------
+# fake REST
+# -----------------------
+class FakeRest:
+    """Every API call of the fakes goes through call(), which counts it and waits `latency`."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = {}
+
+    async def call(self, route: str):
+        self.calls[route] = self.calls.get(route, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+_ids = iter(range(10 ** 15, 10 ** 16))
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+# -----------------------
+# fake models (only what the handlers use)
+# -----------------------
+class FakePermissions:
+    def __init__(self, value: bool):
+        self.value = value
+
+    def __getattr__(self, name):
+        return self.value
+
+
+class FakeRole:
+    def __init__(self, rid, guild, name="role"):
+        self.id = rid
+        self.guild = guild
+        self.name = name
+        self.mention = f"<@&{rid}>"
+        self.members = []
+        self.permissions = FakePermissions(False)
+
+    def is_default(self):
+        return self.id == self.guild.id
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMember:
+    def __init__(self, guild, name, staff=False, bot=False):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.bot = bot
+        self.mention = f"<@{self.id}>"
+        self.avatar = None
+        self.created_at = datetime.now(timezone.utc) - timedelta(days=400)
+        self.joined_at = datetime.now(timezone.utc)
+        self.roles = [guild.default_role] + ([guild.staff_role] if staff else [])
+        self.guild_permissions = FakePermissions(staff)
+
+    def __str__(self):
+        return f"{self.name}#0001"
+
+    async def timeout(self, until, reason=None):
+        await self.guild.rest.call("PATCH /guilds/{guild_id}/members/{user_id}")
+
+    async def edit(self, **kwargs):
+        await self.guild.rest.call("PATCH /guilds/{guild_id}/members/{user_id}")
+
+    async def kick(self, reason=None):
+        await self.guild.rest.call("DELETE /guilds/{guild_id}/members/{user_id}")
+
+    async def ban(self, reason=None, **kwargs):
+        await self.guild.rest.call("PUT /guilds/{guild_id}/bans/{user_id}")
+
+    async def add_roles(self, *roles, reason=None):
+        for _ in roles:
+            await self.guild.rest.call("PUT /guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content=""):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.created_at = datetime.now(timezone.utc)
+        self.raw_mentions = []
+        self.raw_role_mentions = []
+        self.attachments = []
+
+    async def delete(self):
+        await self.guild.rest.call("DELETE /channels/{channel_id}/messages/{message_id}")
+
+
+class FakeChannel:
+    def __init__(self, guild, name, history_size=50):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.overwrites = {}
+        self.history_size = history_size
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.rest.call("POST /channels/{channel_id}/messages")
+        return FakeMessage(self, self.guild.me, content or "")
+
+    async def delete_messages(self, messages):
+        await self.guild.rest.call("POST /channels/{channel_id}/messages/bulk-delete")
+
+    async def purge(self, limit=100, **kwargs):
+        await self.guild.rest.call("GET /channels/{channel_id}/messages")
+        await self.guild.rest.call("POST /channels/{channel_id}/messages/bulk-delete")
+        return [None] * limit
+
+    async def set_permissions(self, target, **kwargs):
+        await self.guild.rest.call("PUT /channels/{channel_id}/permissions/{overwrite_id}")
+
+    async def edit(self, **kwargs):
+        await self.guild.rest.call("PATCH /channels/{channel_id}")
+
+    async def delete(self, reason=None):
+        await self.guild.rest.call("DELETE /channels/{channel_id}")
+        self.guild.channels_by_id.pop(self.id, None)
+
+    async def history(self, limit=None, oldest_first=False, **kwargs):
+        n = self.history_size if limit is None else min(limit, self.history_size)
+        for i in range(n):
+            if i % 100 == 0:
+                await self.guild.rest.call("GET /channels/{channel_id}/messages")
+            yield FakeMessage(self, self.guild.me, f"bericht {i}")
+
+
+class FakeGuild:
+    def __init__(self, gid, rest, staff_role_id, members=200, channels=5):
+        self.id = gid
+        self.name = "Moana Scripts (loadtest)"
+        self.rest = rest
+        self.default_role = FakeRole(gid, self, "@everyone")
+        self.staff_role = FakeRole(staff_role_id, self, "Staff")
+        self.roles_by_id = {r.id: r for r in (self.default_role, self.staff_role)}
+        self.channels_by_id = {}
+        self.me = FakeMember(self, "MoanaBot", bot=True)
+        for i in range(channels):
+            self._add_channel(FakeChannel(self, f"chat-{i}"))
+        self.members = [FakeMember(self, f"user{i}") for i in range(members)]
+        self.staff = [FakeMember(self, f"staff{i}", staff=True) for i in range(max(1, members // 50))]
+        self.staff_role.members = list(self.staff)
+
+    @property
+    def member_count(self):
+        return len(self.members) + len(self.staff)
+
+    @property
+    def channels(self):
+        return list(self.channels_by_id.values())
+
+    def __str__(self):
+        return self.name
+
+    def _add_channel(self, channel):
+        self.channels_by_id[channel.id] = channel
+        return channel
+
+    def get_role(self, rid):
+        return self.roles_by_id.get(rid)
+
+    def get_channel(self, cid):
+        return self.channels_by_id.get(cid)
+
+    async def create_text_channel(self, name, overwrites=None, category=None, **kwargs):
+        await self.rest.call("POST /guilds/{guild_id}/channels")
+        return self._add_channel(FakeChannel(self, name))
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _callback(self):
+        self._done = True
+        await self.interaction.guild.rest.call("POST /interactions/{interaction_id}/{token}/callback")
+
+    async def send_message(self, *args, **kwargs):
+        await self._callback()
+
+    async def send_modal(self, modal):
+        await self._callback()
+
+    async def defer(self, **kwargs):
+        await self._callback()
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, *args, **kwargs):
+        await self.interaction.guild.rest.call("POST /webhooks/{application_id}/{token}")
+
+
+class FakeInteraction:
+    def __init__(self, user, channel):
+        self.id = next_id()
+        self.user = user
+        self.guild = channel.guild
+        self.channel = channel
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+# -----------------------
+# fake gateway: turns event kinds into handler calls
+# -----------------------
+class FakeGateway:
+    def __init__(self, main, guild, rnd):
+        from cogs import tickets
+        self.main = main
+        self.tickets = tickets
+        self.guild = guild
+        self.rnd = rnd
+        self.commands = {cmd.name: cmd for cmd in main.bot.get_all_application_commands()}
+        self._ticket_view = tickets.TicketView()
+        self._open_view = tickets.OpenTicketView()
+        self._confirm_view = tickets.TicketCloseConfirm()
+
+    def get_channel(self, cid):
+        if cid is None:
+            return None
+        return self.guild.get_channel(cid) or self._welcome_channel(cid)
+
+    def _welcome_channel(self, cid):
+        # channels from the config (welcome, log) are created on first use
+        ch = FakeChannel(self.guild, f"config-{cid}")
+        ch.id = cid
+        return self.guild._add_channel(ch)
+
+    def _text_channel(self):
+        return self.rnd.choice([c for c in self.guild.channels if c.name.startswith("chat-")])
+
+    def _member(self, name=None):
+        if name is not None:
+            return next((m for m in self.guild.members if m.name == name), None) or self.rnd.choice(self.guild.members)
+        return self.rnd.choice(self.guild.members)
+
+    async def dispatch(self, kind: str, event: dict):
+        await getattr(self, f"ev_{kind}")(event)
+
+    async def ev_chat(self, event):
+        content = event.get("content") or " ".join(self.rnd.choice(WORDS) for _ in range(self.rnd.randint(2, 12)))
+        await self.main.on_message(FakeMessage(self._text_channel(), self._member(event.get("user")), content))
+
+    async def ev_link(self, event):
+        content = event.get("content") or f"gratis scripts op https://spam{self.rnd.randint(1, 9)}.example/x"
+        await self.main.on_message(FakeMessage(self._text_channel(), self._member(event.get("user")), content))
+
+    async def ev_spam(self, event):
+        member = self._member(event.get("user"))
+        channel = self._text_channel()
+        for i in range(self.main.spam_tracker.limit + 2):
+            await self.main.on_message(FakeMessage(channel, member, f"spam {i}"))
+
+    async def ev_join(self, event):
+        member = FakeMember(self.guild, event.get("user") or f"new{next_id() % 100000}")
+        self.guild.members.append(member)
+        await self.main.on_member_join(member)
+
+    async def ev_ticket(self, event):
+        main, tickets = self.main, self.tickets
+        member = self._member(event.get("user"))
+        staff = self.rnd.choice(self.guild.staff)
+        panel = self._text_channel()
+        await tickets.OpenTicketView.open_ticket(self._open_view, None, FakeInteraction(member, panel))
+        cid = main.ticket_store.open_for(self.guild.id, member.id)
+        channel = self.guild.get_channel(cid) if cid else None
+        if channel is None:
+            return
+        await tickets.TicketView.claim(self._ticket_view, None, FakeInteraction(staff, channel))
+        await tickets.TicketView.close(self._ticket_view, None, FakeInteraction(staff, channel))
+        await tickets.TicketCloseConfirm.confirm(self._confirm_view, None, FakeInteraction(staff, channel))
+
+    async def ev_modal(self, event):
+        from cogs.forms_modals import ReviewModal
+        modal = ReviewModal()
+        for attr, value in (("product", "Moana Garage"), ("stars", "5"), ("service", "4"), ("message", "Top!")):
+            setattr(modal, attr, SimpleNamespace(value=value))
+        await ReviewModal.callback(modal, FakeInteraction(self._member(event.get("user")), self._text_channel()))
+
+    async def ev_command(self, event):
+        name = event.get("command") or self.rnd.choice(("ping", "userinfo", "serverinfo", "roleinfo", "timeout", "kick"))
+        staff = self.rnd.choice(self.guild.staff)
+        inter = FakeInteraction(staff, self._text_channel())
+        target = self._member(event.get("user"))
+        # calling the command object passes the cog as self
+        callback = self.commands[name]
+        if name == "userinfo":
+            await callback(inter, member=target)
+        elif name == "roleinfo":
+            await callback(inter, role=self.guild.staff_role)
+        elif name == "timeout":
+            await callback(inter, member=target, minutes=5)
+        elif name == "kick":
+            await callback(inter, member=target, reason="loadtest")
+        else:
+            await callback(inter)
+
+
+# -----------------------
+# runner
+# -----------------------
+def load_bot(workdir: str):
+    """Import main.py inside workdir, so logs/, data/ and transcripts/ end up there."""
+    for name in ("rules.json", "guilds.json", "embeds.json"):
+        if os.path.exists(os.path.join(HERE, name)):
+            shutil.copy(os.path.join(HERE, name), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, HERE)
+    os.environ.setdefault("TOKEN", "loadtest")
+    import main
+    return main
+
+
+def synthetic_stream(scenario: str, events: int, rate: float, rnd):
+    kinds, weights = zip(*SCENARIOS[scenario].items())
+    for i in range(events):
+        yield {"t": i / rate, "kind": rnd.choices(kinds, weights)[0]}
+
+
+def replay_stream(path: str, rate_scale: float):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                event["t"] = float(event.get("t", 0)) / rate_scale
+                yield event
+
+
+def percentile(data, q):
+    if not data:
+        return 0.0
+    return data[min(len(data) - 1, int(q * len(data)))]
+
+
+async def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="moana-loadtest-")
+    main = load_bot(workdir)
+    rnd = random.Random(args.seed)
+    rest = FakeRest(args.latency)
+    import config
+    guild = FakeGuild(config.GUILD_ID, rest, config.STAFF_ROLE_ID, members=args.members)
+    gateway = FakeGateway(main, guild, rnd)
+
+    # nothing may reach the real gateway/REST
+    main.bot.get_channel = gateway.get_channel
+
+    async def no_commands(message):
+        pass
+
+    main.bot.process_commands = no_commands
+    main.bot.ws = SimpleNamespace(latency=0.042)  # /ping reads the gateway latency
+    await main.ticket_store.load()
+    main.mod_actions.start()
+    main.stats.start()
+    main.scheduler.start()
+    main.audit.start()
+
+    if args.replay:
+        stream = list(replay_stream(args.replay, args.rate_scale))
+    else:
+        stream = list(synthetic_stream(args.scenario, args.events, args.rate, rnd))
+
+    latencies = {}
+    errors = {}
+
+    async def fire(event):
+        kind = event["kind"]
+        t0 = time.perf_counter()
+        try:
+            await gateway.dispatch(kind, event)
+        except Exception as e:
+            errors[kind] = errors.get(kind, 0) + 1
+            if errors[kind] == 1:
+                print(f"  first {kind} error: {e!r}", file=sys.stderr)
+        latencies.setdefault(kind, []).append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    snap_before = tracemalloc.take_snapshot()
+    loop = asyncio.get_running_loop()
+    tasks = []
+    start = loop.time()
+    for event in stream:
+        # sleep(0) when behind schedule still lets the handlers run
+        await asyncio.sleep(max(0.0, start + event["t"] - loop.time()))
+        tasks.append(asyncio.create_task(fire(event)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+    # let the batching windows (moderation actions, welcomes) drain
+    await asyncio.sleep(max(main.mod_actions.window, main.join_pipeline.window) + 0.5)
+    await main.mod_actions.queue.join()
+    current, peak = tracemalloc.get_traced_memory()
+    snap_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    result = {
+        "scenario": args.replay or args.scenario,
+        "events": len(stream),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(stream) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {},
+        "errors": errors,
+        "rest_calls": dict(sorted(rest.calls.items())),
+        "rest_total": rest.total,
+        "alloc_peak_mb": round(peak / 1e6, 2),
+        "alloc_net_mb": round(current / 1e6, 2),
+        "loop_lag_max_ms": round(main.stats.loop_lag.max, 2),
+    }
+    for kind, values in sorted(latencies.items()):
+        values.sort()
+        result["latency_ms"][kind] = {
+            "n": len(values),
+            "p50": round(percentile(values, 0.5), 3),
+            "p95": round(percentile(values, 0.95), 3),
+            "p99": round(percentile(values, 0.99), 3),
+        }
+    top = snap_after.compare_to(snap_before, "lineno")[:5]
+    result["top_allocations"] = [f"{s.traceback[0].filename.rsplit(os.sep, 1)[-1]}:{s.traceback[0].lineno} "
+                                 f"+{s.size_diff / 1024:.1f} KiB" for s in top]
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def report(result: dict):
+    print(f"scenario {result['scenario']}: {result['events']} events in {result['seconds']}s "
+          f"({result['throughput']} events/s)")
+    print(f"  {'kind':<10}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind, lat in result["latency_ms"].items():
+        print(f"  {kind:<10}{lat['n']:>7}{lat['p50']:>10.2f}{lat['p95']:>10.2f}{lat['p99']:>10.2f}")
+    if result["errors"]:
+        print(f"  errors: {result['errors']}")
+    print(f"  REST calls: {result['rest_total']}")
+    for route, n in result["rest_calls"].items():
+        print(f"    {n:>7}  {route}")
+    print(f"  allocations: peak {result['alloc_peak_mb']} MB, net {result['alloc_net_mb']} MB, "
+          f"max loop lag {result['loop_lag_max_ms']} ms")
+    for line in result["top_allocations"]:
+        print(f"    {line}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> bool:
+    """True when no event kind got more than `tolerance` slower at p95 (or made more REST calls)."""
+    ok = True
+    for kind, lat in result["latency_ms"].items():
+        base = baseline.get("latency_ms", {}).get(kind)
+        if base and lat["p95"] > base["p95"] * (1 + tolerance) and lat["p95"] - base["p95"] > 1.0:
+            print(f"  REGRESSION {kind}: p95 {base['p95']} -> {lat['p95']} ms")
+            ok = False
+    if baseline.get("rest_total") and result["rest_total"] > baseline["rest_total"] * (1 + tolerance):
+        print(f"  REGRESSION REST calls: {baseline['rest_total']} -> {result['rest_total']}")
+        ok = False
+    return ok
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Offline load test for the Moana bot handlers.")
+    p.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    p.add_argument("--events", type=int, default=2000)
+    p.add_argument("--rate", type=float, default=200.0, help="events per second")
+    p.add_argument("--latency", type=float, default=0.02, help="fake REST latency in seconds")
+    p.add_argument("--members", type=int, default=500)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--replay", help="jsonl file with recorded events ({\"t\": sec, \"kind\": ...})")
+    p.add_argument("--rate-scale", type=float, default=1.0, help="replay this many times faster")
+    p.add_argument("--save", help="write the result as json")
+    p.add_argument("--compare", help="baseline json from --save; exit 1 on regressions")
+    p.add_argument("--tolerance", type=float, default=0.25)
+    args = p.parse_args(argv)
+    # main.py is loaded in a temp dir, resolve file arguments first
+    for name in ("replay", "save", "compare"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = asyncio.run(run(args))
+    report(result)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        sys.exit(0 if compare(result, baseline, args.tolerance) else 1)
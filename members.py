@@ -0,0 +1,348 @@
+# members.py - member lookups and role counts without scanning the member cache
+#
+# MEMBER_CACHE = "full" keeps nextcord's member cache (every member chunked at
+# startup). "compact" turns that cache off and keeps one MemberSnapshot per
+# member instead: a __slots__ object with only the fields the info commands
+# show (name, avatar, join date, role ids). The store is filled once by
+# streaming guild.fetch_members() and kept current from the raw
+# GUILD_MEMBER_ADD/UPDATE/REMOVE gateway events, which arrive whether or not
+# nextcord caches the member. Members that are not in the store (yet) are
+# fetched over REST and kept in a small LRU cache with a TTL.
+#
+# In both modes the member count of every role is kept per guild and updated
+# from the same events, so /roleinfo does not walk all members.
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger("moana_bot")
+
+DISCORD_EPOCH = 1420070400000
+_NO_ROLES = ()
+
+
+def _timestamp(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value.timestamp()
+
+
+class MemberSnapshot:
+    """The fields of a member that the bot shows, about a tenth of a cached nextcord Member."""
+
+    __slots__ = ("id", "name", "avatar", "joined", "roles")
+
+    def __init__(self, id: int, name: str, avatar: Optional[str], joined: Optional[float], roles: tuple = _NO_ROLES):
+        self.id = id
+        self.name = name
+        self.avatar = avatar    # avatar hash, the url is built when needed
+        self.joined = joined    # unix time
+        self.roles = roles      # role ids, without @everyone
+
+    @classmethod
+    def from_member(cls, member, roles: tuple = None) -> "MemberSnapshot":
+        avatar = member.avatar.key if getattr(member, "avatar", None) else None
+        if roles is None:
+            roles = tuple(r.id for r in getattr(member, "roles", ()) if r.id != member.guild.id)
+        return cls(member.id, str(member), avatar, _timestamp(getattr(member, "joined_at", None)), roles)
+
+    @classmethod
+    def from_payload(cls, data: dict, roles: tuple = None) -> "MemberSnapshot":
+        """From a raw member payload (gateway event or REST)."""
+        user = data["user"]
+        name = user.get("username", "")
+        if user.get("discriminator") not in (None, "0"):
+            name = f"{name}#{user['discriminator']}"
+        if roles is None:
+            roles = tuple(int(r) for r in data.get("roles", ()))
+        return cls(int(user["id"]), name, user.get("avatar"), _timestamp(data.get("joined_at")), roles)
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromtimestamp(((self.id >> 22) + DISCORD_EPOCH) / 1000, timezone.utc)
+
+    @property
+    def joined_at(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.joined, timezone.utc) if self.joined is not None else None
+
+    @property
+    def avatar_url(self) -> Optional[str]:
+        if not self.avatar:
+            return None
+        ext = "gif" if self.avatar.startswith("a_") else "png"
+        return f"https://cdn.discordapp.com/avatars/{self.id}/{self.avatar}.{ext}?size=1024"
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"<MemberSnapshot {self.id} {self.name!r}>"
+
+
+class TTLCache:
+    """LRU cache whose entries also expire `ttl` seconds after they were stored."""
+
+    def __init__(self, maxsize: int = 5000, ttl: float = 300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()  # key -> (value, expires)
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] < self.clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value):
+        self._data[key] = (value, self.clock() + self.ttl)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MemberStore:
+    def __init__(self, compact: bool = True, fetch_cache_size: int = 5000, fetch_ttl: float = 300.0,
+                 clock=time.monotonic):
+        self.compact = compact
+        self.fetched = TTLCache(fetch_cache_size, fetch_ttl, clock)
+        self.rest_fetches = 0
+        self._members = {}      # guild_id -> {member_id: MemberSnapshot} (compact mode)
+        self._role_counts = {}  # guild_id -> {role_id: members}, only for counted guilds
+        self._role_ids = {}     # role_id -> the same int, so snapshots share one object per role
+        self._cached_member = lambda guild_id, member_id: None  # nextcord's cache (full mode), set by install()
+        self._populating = {}   # guild_id -> task
+        self.on_change = []     # callbacks(guild_id, member_id) when roles change or a member leaves
+
+    def _roles(self, ids) -> tuple:
+        intern = self._role_ids.setdefault
+        return tuple(intern(r, r) for r in ids) or _NO_ROLES
+
+    # bookkeeping --------------------------------------------------------------
+
+    def _count(self, guild_id: int, roles, delta: int):
+        counts = self._role_counts.get(guild_id)
+        if counts is None:
+            return
+        for r in roles:
+            counts[r] = counts.get(r, 0) + delta
+
+    def _old_roles(self, guild_id: int, member_id: int) -> Optional[tuple]:
+        if self.compact:
+            snap = self._members.get(guild_id, {}).get(member_id)
+            return snap.roles if snap else None
+        member = self._cached_member(guild_id, member_id)
+        return tuple(r.id for r in member.roles if r.id != guild_id) if member else None
+
+    def add(self, guild_id: int, snap: MemberSnapshot, replace: bool = True):
+        """Store a member (compact mode) and count its roles. Without `replace` an existing
+        entry wins, so a slow initial load never overwrites a newer gateway update."""
+        members = self._members.setdefault(guild_id, {}) if self.compact else None
+        old = members.get(snap.id) if members is not None else None
+        if old is not None:
+            if not replace:
+                return
+            self._count(guild_id, old.roles, -1)
+        if members is not None:
+            members[snap.id] = snap
+        self._count(guild_id, snap.roles, +1)
+
+    def remove(self, guild_id: int, member_id: int, roles: Optional[tuple] = None):
+        if self.compact:
+            snap = self._members.get(guild_id, {}).pop(member_id, None)
+            roles = snap.roles if snap else roles
+        self.fetched.pop((guild_id, member_id))
+        if roles:
+            self._count(guild_id, roles, -1)
+        self._changed(guild_id, member_id)
+
+    def forget_guild(self, guild_id: int):
+        self._members.pop(guild_id, None)
+        self._role_counts.pop(guild_id, None)
+        task = self._populating.pop(guild_id, None)
+        if task:
+            task.cancel()
+
+    def forget_role(self, guild_id: int, role_id: int):
+        counts = self._role_counts.get(guild_id)
+        if counts:
+            counts.pop(role_id, None)
+
+    def _changed(self, guild_id: int, member_id: int):
+        for cb in self.on_change:
+            cb(guild_id, member_id)
+
+    # raw gateway events (before nextcord's own handling) -----------------------
+
+    def _raw_add(self, data: dict):
+        guild_id = int(data["guild_id"])
+        snap = MemberSnapshot.from_payload(data, self._roles(int(r) for r in data.get("roles", ())))
+        if self.compact:
+            self.add(guild_id, snap)
+        else:
+            self._count(guild_id, snap.roles, +1)
+
+    def _raw_update(self, data: dict):
+        guild_id = int(data["guild_id"])
+        member_id = int(data["user"]["id"])
+        old = self._old_roles(guild_id, member_id)
+        roles = self._roles(int(r) for r in data.get("roles", ()))
+        if self.compact:
+            if old is not None or guild_id in self._role_counts:
+                self.add(guild_id, MemberSnapshot.from_payload(data, roles))
+        elif old is not None:
+            self._count(guild_id, old, -1)
+            self._count(guild_id, roles, +1)
+        self.fetched.pop((guild_id, member_id))
+        if old != roles:
+            self._changed(guild_id, member_id)
+
+    def _raw_remove(self, data: dict):
+        guild_id = int(data["guild_id"])
+        member_id = int(data["user"]["id"])
+        self.remove(guild_id, member_id, self._old_roles(guild_id, member_id))
+
+    def install(self, bot):
+        """Feed the raw GUILD_MEMBER_* events into the store, before nextcord parses them."""
+        parsers = bot._connection.parsers
+        for event, hook in (("GUILD_MEMBER_ADD", self._raw_add), ("GUILD_MEMBER_UPDATE", self._raw_update),
+                            ("GUILD_MEMBER_REMOVE", self._raw_remove)):
+            parsers[event] = self._hooked(hook, parsers[event])
+
+        def cached_member(guild_id, member_id):
+            guild = bot.get_guild(guild_id)
+            return guild.get_member(member_id) if guild else None
+        self._cached_member = cached_member
+
+    @staticmethod
+    def _hooked(hook, parse):
+        def hooked(data):
+            try:
+                hook(data)
+            except Exception as e:
+                logger.exception("Member store update failed: %s", e)
+            parse(data)
+        return hooked
+
+    # initial load -------------------------------------------------------------
+
+    async def populate(self, guild) -> int:
+        """Count roles (and in compact mode store every member) of a guild, once."""
+        t0 = time.perf_counter()
+        self._role_counts[guild.id] = {}
+        n = 0
+        if self.compact:
+            # members that came in through events before the load count as well
+            members = self._members.setdefault(guild.id, {})
+            for snap in members.values():
+                self._count(guild.id, snap.roles, +1)
+            async for member in guild.fetch_members(limit=None):
+                roles = self._roles(r.id for r in member.roles if r.id != guild.id)
+                self.add(guild.id, MemberSnapshot.from_member(member, roles), replace=False)
+                n += 1
+        else:
+            # one pass without awaiting, so no event is counted twice
+            for member in guild.members:
+                self._count(guild.id, [r.id for r in member.roles if r.id != guild.id], +1)
+                n += 1
+        logger.info(f"Member store: {n} members of {guild} in {time.perf_counter() - t0:.1f}s")
+        return n
+
+    def start(self, guilds):
+        """Populate every guild that is not loaded yet in the background (safe to call on every on_ready)."""
+        for guild in guilds:
+            if guild.id not in self._populating:
+                self._populating[guild.id] = asyncio.get_running_loop().create_task(self._populate_safe(guild))
+
+    async def _populate_safe(self, guild):
+        try:
+            await self.populate(guild)
+        except Exception as e:
+            self._role_counts.pop(guild.id, None)
+            self._populating.pop(guild.id, None)
+            logger.exception("Loading members of %s failed: %s", guild, e)
+
+    # lookups ------------------------------------------------------------------
+
+    def get(self, guild_id: int, member_id: int) -> Optional[MemberSnapshot]:
+        """From the store or the fetch cache, never from REST."""
+        members = self._members.get(guild_id)
+        snap = members.get(member_id) if members else None
+        return snap or self.fetched.get((guild_id, member_id))
+
+    async def fetch(self, guild, member_id: int) -> Optional[MemberSnapshot]:
+        snap = self.get(guild.id, member_id)
+        if snap is not None:
+            return snap
+        member = guild.get_member(member_id)
+        if member is None:
+            self.rest_fetches += 1
+            try:
+                member = await guild.fetch_member(member_id)
+            except Exception as e:
+                logger.debug(f"fetch_member {member_id} in {guild} failed: {e}")
+                return None
+        snap = MemberSnapshot.from_member(member)
+        self.fetched.put((guild.id, member_id), snap)
+        return snap
+
+    async def lookup(self, guild, user) -> MemberSnapshot:
+        """Snapshot for a command argument: a resolved Member is used as is, a bare User or
+        Object (member not in the interaction payload) goes through the store, cache and REST."""
+        if getattr(user, "joined_at", None) is not None:
+            return MemberSnapshot.from_member(user, _NO_ROLES)
+        snap = await self.fetch(guild, user.id) if guild else None
+        if snap is None:
+            snap = MemberSnapshot(user.id, str(getattr(user, "name", user.id)), None, None)
+            if getattr(user, "avatar", None):
+                snap.avatar = user.avatar.key
+        return snap
+
+    def select(self, guild, role_id: Optional[int] = None, joined_after: Optional[float] = None) -> list:
+        """Ids of the members with `role_id` and/or that joined after `joined_after` (unix time)."""
+        ids = []
+        if self.compact:
+            for snap in self._members.get(guild.id, {}).values():
+                if role_id is not None and role_id not in snap.roles:
+                    continue
+                if joined_after is not None and (snap.joined is None or snap.joined < joined_after):
+                    continue
+                ids.append(snap.id)
+        else:
+            for member in guild.members:
+                if role_id is not None and member.get_role(role_id) is None:
+                    continue
+                if joined_after is not None and (member.joined_at is None or member.joined_at.timestamp() < joined_after):
+                    continue
+                ids.append(member.id)
+        return ids
+
+    def role_count(self, guild_id: int, role_id: int) -> Optional[int]:
+        """Members with this role, or None while the guild is not counted yet."""
+        counts = self._role_counts.get(guild_id)
+        if counts is None:
+            return None
+        return counts.get(role_id, 0)
+
+    def __len__(self):
+        return sum(len(m) for m in self._members.values())
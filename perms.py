@@ -0,0 +1,88 @@
+# perms.py - cached staff/permission tiers per member
+#
+# Resolving "is this member staff" means walking member.roles and computing
+# guild_permissions. The result only changes when the member's roles change or
+# when a role itself changes, so it is cached per guild and per member and
+# invalidated from the matching gateway events (see main.py and members.py):
+#   member update/remove  -> drop that member (members.py on_change, only when roles changed or it left)
+#   on_guild_role_update  -> drop the guild (only for tier roles or permission changes)
+#   on_guild_role_delete  -> drop the guild
+
+import logging
+
+logger = logging.getLogger("moana_bot")
+
+# lowest to highest, every tier includes the ones before it
+TIERS = ("staff", "moderator", "admin")
+
+
+class PermissionCache:
+    def __init__(self, tier_roles, max_members: int = 100000):
+        """tier_roles(guild_id) returns {role_id: tier name from TIERS} for that guild"""
+        self.tier_roles = tier_roles
+        self.max_members = max_members
+        self._guilds = {}  # guild_id -> {member_id: frozenset of tiers}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _resolve(self, member) -> frozenset:
+        level = -1
+        tier_roles = self.tier_roles(member.guild.id)
+        for role in member.roles:
+            tier = tier_roles.get(role.id)
+            if tier is not None:
+                level = max(level, TIERS.index(tier))
+        if level < len(TIERS) - 1:
+            p = member.guild_permissions
+            if p.administrator:
+                level = len(TIERS) - 1
+            elif p.manage_messages:
+                level = max(level, 0)
+        return frozenset(TIERS[:level + 1])
+
+    def capabilities(self, member) -> frozenset:
+        """Tiers of a member, resolved once and then served from the cache."""
+        guild = getattr(member, "guild", None)
+        if guild is None:  # a User outside of a guild (DM)
+            return frozenset()
+        members = self._guilds.get(guild.id)
+        if members is None:
+            members = self._guilds[guild.id] = {}
+        caps = members.get(member.id)
+        if caps is not None:
+            self.hits += 1
+            return caps
+        self.misses += 1
+        if self._size >= self.max_members:
+            self.clear()
+            members = self._guilds[guild.id] = {}
+        caps = members[member.id] = self._resolve(member)
+        self._size += 1
+        return caps
+
+    def has(self, member, tier: str = "staff") -> bool:
+        return tier in self.capabilities(member)
+
+    # invalidation -----------------------------------------------------------
+
+    def forget_member(self, guild_id: int, member_id: int):
+        members = self._guilds.get(guild_id)
+        if members and members.pop(member_id, None) is not None:
+            self._size -= 1
+
+    def forget_guild(self, guild_id: int):
+        members = self._guilds.pop(guild_id, None)
+        if members:
+            self._size -= len(members)
+
+    def clear(self):
+        self._guilds.clear()
+        self._size = 0
+
+    def on_role_update(self, before, after):
+        if after.id in self.tier_roles(after.guild.id) or before.permissions != after.permissions:
+            self.forget_guild(after.guild.id)
+
+    def on_role_delete(self, role):
+        self.forget_guild(role.guild.id)
@@ -0,0 +1,179 @@
+# purge.py - /purge engine: filtered, age-aware deletes as a background job
+#
+# channel.history is scanned newest first, starting at the moment of the
+# command, and every message goes through one PurgeFilter. Matches younger
+# than 14 days are deleted with bulk delete, 100 per call, while the next
+# page is fetched (one bulk delete in flight). Older messages can only be
+# deleted one by one; they go through a RouteBucket (bulk.py) that spaces the
+# calls and backs off on 429s. Deleted messages are streamed to an archive
+# file (transcripts.TranscriptWriter) in the same batches, so memory stays
+# flat for purges of thousands of messages.
+
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from actions import BULK_MAX, BULK_MAX_AGE
+from bulk import RouteBucket, retry_after
+from rules import URL_RE
+from transcripts import TranscriptWriter
+
+logger = logging.getLogger("moana_bot")
+
+MAX_PATTERN = 200  # characters of a /purge regex
+
+
+class PurgeFilter:
+    """Every given condition has to match. Pinned messages are always kept."""
+
+    def __init__(self, author_id: Optional[int] = None, pattern: Optional[str] = None, links: bool = False,
+                 attachments: bool = False, bots: bool = False):
+        """Raises re.error (or ValueError for a too long pattern) for a bad regex."""
+        if pattern and len(pattern) > MAX_PATTERN:
+            raise ValueError(f"regex is langer dan {MAX_PATTERN} tekens")
+        self.author_id = author_id
+        self.regex = re.compile(pattern, re.IGNORECASE) if pattern else None
+        self.links = links
+        self.attachments = attachments
+        self.bots = bots
+
+    def __call__(self, m) -> bool:
+        if getattr(m, "pinned", False):
+            return False
+        if self.author_id is not None and m.author.id != self.author_id:
+            return False
+        if self.bots and not m.author.bot:
+            return False
+        if self.attachments and not m.attachments:
+            return False
+        if self.links and not URL_RE.search(m.content):
+            return False
+        if self.regex is not None and not self.regex.search(m.content):
+            return False
+        return True
+
+
+class PurgeJob:
+    def __init__(self, channel, match, amount: int, before=None, scan_limit: int = 10000,
+                 archive: Optional[str] = None, fmt: str = "jsonl", compress: bool = True,
+                 old_rate: float = 1.0, old_max_rate: float = 5.0):
+        self.channel = channel
+        self.match = match
+        self.amount = amount
+        self.before = before          # scan messages older than this (the command's interaction)
+        self.scan_limit = scan_limit  # messages looked at, matching or not
+        self.archive = TranscriptWriter(archive, fmt, compress) if archive else None
+        self.bucket = RouteBucket(old_rate, max_rate=old_max_rate)
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.old = 0                  # deleted one by one (older than 14 days)
+        self.started = time.monotonic()
+        self.finished = False
+        self._inflight = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    async def _bulk(self, batch):
+        try:
+            if len(batch) == 1:
+                await batch[0].delete()
+            else:
+                await self.channel.delete_messages(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Bulk delete of {len(batch)} messages in {self.channel} failed: {e}")
+            return
+        self.deleted += len(batch)
+        if self.archive:
+            await self.archive.write(batch)
+
+    async def _flush(self, batch=None):
+        """Wait for the bulk delete in flight, then start the next one (if any)."""
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+        if batch:
+            self._inflight = asyncio.ensure_future(self._bulk(batch))
+
+    async def _single(self, m):
+        while True:
+            await self.bucket.acquire()
+            try:
+                await m.delete()
+            except Exception as e:
+                status = getattr(e, "status", None)
+                if status == 429:
+                    self.bucket.limited(retry_after(e))
+                    continue
+                if status != 404:  # already gone counts as deleted
+                    self.failed += 1
+                    logger.debug(f"Deleting message {m.id} in {self.channel} failed: {e}")
+                    return
+            self.bucket.success()
+            self.deleted += 1
+            self.old += 1
+            if self.archive:
+                await self.archive.write([m])
+            return
+
+    async def run(self, progress=None, interval: float = 2.0) -> "PurgeJob":
+        """Delete up to `amount` matching messages. progress(job) is awaited every `interval` seconds."""
+        cutoff = datetime.now(timezone.utc) - BULK_MAX_AGE
+        last = time.monotonic()
+        young = []
+        if self.archive:
+            await self.archive.open(self.channel)
+        try:
+            async for m in self.channel.history(limit=self.scan_limit, before=self.before):
+                self.scanned += 1
+                if self.match(m):
+                    self.matched += 1
+                    if m.created_at > cutoff:
+                        young.append(m)
+                        if len(young) >= BULK_MAX:
+                            await self._flush(young)
+                            young = []
+                    else:
+                        # history is newest first, so from here on everything is old
+                        await self._flush(young)
+                        young = []
+                        await self._single(m)
+                    if self.matched >= self.amount:
+                        break
+                if progress and time.monotonic() - last >= interval:
+                    last = time.monotonic()
+                    await self._report(progress)
+            await self._flush(young)
+            await self._flush()
+        finally:
+            self.finished = True
+            if self._inflight is not None:
+                # history or a single delete failed (or the purge was cancelled) with a bulk delete still
+                # running: let it finish, its messages are deleted and belong in the archive
+                try:
+                    await self._inflight
+                except BaseException as e:
+                    logger.warning(f"Bulk delete in {self.channel} failed while stopping: {e!r}")
+                self._inflight = None
+            if self.archive:
+                summary = await self.archive.close()
+                logger.info(f"Purge archive {summary.path}: {summary.messages} messages, {summary.bytes} bytes")
+        if progress:
+            await self._report(progress)
+        return self
+
+    async def _report(self, progress):
+        try:
+            await progress(self)
+        except Exception as e:
+            if self.finished:  # the moderator does not get the result
+                logger.warning(f"Purge summary in {self.channel} failed: {e}")
+            else:
+                logger.debug(f"Purge progress in {self.channel} failed: {e}")
@@ -0,0 +1,116 @@
+# ratelimit.py - per-user spam limiter for on_message
+#
+# Every tracked user owns one slot in a few flat arrays: a ring buffer with the
+# timestamps of their last `limit + 1` messages, the ring position and the time
+# of their last message. A message is spam when the oldest stamp in the ring is
+# still inside the window, so a hit is O(1) and does not allocate once a user
+# has a slot. Users are kept in LRU order (most recent last), so idle users are
+# swept from the front and the store never grows past `max_users`.
+
+import asyncio
+import logging
+import time
+from array import array
+from collections import OrderedDict
+
+from background import ensure_task
+
+logger = logging.getLogger("moana_bot")
+
+
+class SpamLimiter:
+    """Sliding-window message counter with idle eviction and an LRU cap."""
+
+    __slots__ = ("limit", "window", "max_users", "clock", "_size", "_slots", "_free",
+                 "_stamps", "_pos", "_last", "_blank", "_sweeper")
+
+    def __init__(self, limit: int, window: float, max_users: int = 50000, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.max_users = max_users
+        self.clock = clock
+        self._size = limit + 1
+        self._slots = OrderedDict()  # user_id -> slot, oldest activity first
+        self._free = []              # released slots, reused before growing
+        self._stamps = array("d")    # slot * _size .. slot * _size + _size
+        self._pos = array("H")       # ring position per slot
+        self._last = array("d")      # last message time per slot
+        # a fresh ring: -inf never counts as inside the window
+        self._blank = array("d", [float("-inf")]) * self._size
+        self._sweeper = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _new_slot(self, user_id) -> int:
+        slots = self._slots
+        if len(slots) >= self.max_users:
+            _, slot = slots.popitem(last=False)
+        elif self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._last)
+            self._stamps.extend(self._blank)
+            self._pos.append(0)
+            self._last.append(0.0)
+        slots[user_id] = slot
+        return slot
+
+    def hit(self, user_id) -> bool:
+        """Register a message of user_id (any hashable key, e.g. (guild_id, user_id)). Returns True when the user is over the limit."""
+        now = self.clock()
+        size = self._size
+        stamps = self._stamps
+        slot = self._slots.get(user_id)
+        if slot is None:
+            slot = self._new_slot(user_id)
+            stamps = self._stamps
+            stamps[slot * size:slot * size + size] = self._blank
+            self._pos[slot] = 0
+        else:
+            self._slots.move_to_end(user_id)
+        base = slot * size
+        pos = self._pos[slot]
+        stamps[base + pos] = now
+        pos = (pos + 1) % size
+        self._pos[slot] = pos
+        self._last[slot] = now
+        # after advancing, pos points at the oldest of the last limit+1 messages
+        return now - stamps[base + pos] < self.window
+
+    def reset(self, user_id):
+        """Forget a user (e.g. after they got a timeout)."""
+        slot = self._slots.pop(user_id, None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def sweep(self) -> int:
+        """Evict users that did not post within the window. Returns the amount evicted."""
+        cutoff = self.clock() - self.window
+        slots = self._slots
+        last = self._last
+        evicted = 0
+        while slots:
+            user_id = next(iter(slots))
+            slot = slots[user_id]
+            if last[slot] >= cutoff:
+                break
+            del slots[user_id]
+            self._free.append(slot)
+            evicted += 1
+        return evicted
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                evicted = self.sweep()
+                if evicted:
+                    logger.debug(f"Spam limiter evicted {evicted} idle users")
+            except Exception as e:
+                logger.exception("Spam limiter sweep failed: %s", e)
+
+    def start_sweeper(self, interval: float = 60.0):
+        """Start the periodic sweeper task."""
+        self._sweeper = ensure_task(self._sweeper, self._sweep_loop, interval)
+        return self._sweeper
@@ -0,0 +1,182 @@
+# rules.py - moderation rule engine for on_message
+#
+# All rules come from a JSON file (rules.json) and are compiled once:
+#   - banned single words go in a set and are matched against the tokens of a
+#     message, phrases are folded into one trie-shaped regex
+#   - link domains are looked up in sets, walking up the labels
+#     (a.b.example.com -> b.example.com -> example.com)
+#   - invites, mention spam and caps are simple checks on the same pass
+# check() looks at every message once and returns the first matching Verdict.
+# The file is polled for changes and recompiled in a thread, then swapped in.
+
+import json
+import logging
+import os
+import re
+from typing import NamedTuple, Optional
+
+from filewatch import WatchedFile
+
+logger = logging.getLogger("moana_bot")
+
+URL_RE = re.compile(r"https?://([^/\s:?#]+)\S*", re.IGNORECASE)
+INVITE_RE = re.compile(r"(?:discord(?:app)?\.com/invite|discord\.gg|dsc\.gg)/[\w-]+", re.IGNORECASE)
+TOKEN_RE = re.compile(r"\w+")
+
+
+class Verdict(NamedTuple):
+    rule: str           # which rule matched: invite, link, word, mentions, caps
+    action: str         # "timeout", "delete" or "warn"
+    minutes: int        # timeout length, 0 when no timeout
+    notice: str         # message for the channel, {mention} is filled in
+    detail: str         # what matched (domain, word, ...) for the log
+
+
+def _trie_regex(phrases) -> Optional[re.Pattern]:
+    """One regex for many phrases, shaped like a trie so shared prefixes are matched once."""
+    trie = {}
+    for p in phrases:
+        node = trie
+        for ch in p:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node) -> str:
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not end:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if end else body
+
+    if not trie:
+        return None
+    return re.compile(r"(?<!\w)" + build(trie) + r"(?!\w)", re.IGNORECASE)
+
+
+def _domain_in(host: str, domains: frozenset) -> bool:
+    if not domains:
+        return False
+    while True:
+        if host in domains:
+            return True
+        dot = host.find(".")
+        if dot < 0:
+            return False
+        host = host[dot + 1:]
+
+
+class _Rule:
+    """Action settings shared by all rule types."""
+
+    __slots__ = ("enabled", "action", "minutes", "notice")
+
+    def __init__(self, cfg: dict, action: str = "timeout", minutes: int = 5, notice: str = ""):
+        self.enabled = cfg.get("enabled", True)
+        self.action = cfg.get("action", action)
+        self.minutes = int(cfg.get("minutes", minutes)) if self.action == "timeout" else 0
+        self.notice = cfg.get("notice", notice)
+
+    def verdict(self, rule: str, detail: str) -> Verdict:
+        return Verdict(rule, self.action, self.minutes, self.notice, detail)
+
+
+class CompiledRules:
+    """Immutable, compiled form of one rules file."""
+
+    def __init__(self, cfg: dict):
+        links = cfg.get("links", {})
+        self.links = _Rule(links, notice="{mention} is tijdelijk gemute (links zijn niet toegestaan).")
+        self.link_allow = frozenset(d.lower() for d in links.get("allow", ()))
+        self.link_deny = frozenset(d.lower() for d in links.get("deny", ()))
+        self.block_unknown = links.get("block_unknown", True)
+
+        self.invites = _Rule(cfg.get("invites", {}), notice="{mention} invite links zijn niet toegestaan.")
+
+        words = cfg.get("words", {})
+        self.words = _Rule(words, action="delete", notice="{mention} let op je taalgebruik.")
+        terms = [w.lower().strip() for w in words.get("banned", ()) if w.strip()]
+        self.word_set = frozenset(t for t in terms if TOKEN_RE.fullmatch(t))
+        self.phrase_re = _trie_regex(t for t in terms if not TOKEN_RE.fullmatch(t))
+
+        mentions = cfg.get("mentions", {})
+        self.mentions = _Rule(mentions, notice="{mention} niet zoveel mensen taggen.")
+        self.max_mentions = int(mentions.get("max", 5))
+
+        caps = cfg.get("caps", {})
+        self.caps = _Rule(caps, action="delete", notice="{mention} niet zoveel hoofdletters.")
+        self.caps_min_len = int(caps.get("min_length", 12))
+        self.caps_ratio = float(caps.get("ratio", 0.7))
+
+    def check(self, content: str, mentions: int = 0) -> Optional[Verdict]:
+        # cheapest checks first, then the ones that scan the text
+        if self.mentions.enabled and mentions > self.max_mentions:
+            return self.mentions.verdict("mentions", str(mentions))
+
+        lowered = content.lower()
+        if "http" in lowered or "discord" in lowered or "dsc.gg" in lowered:
+            if self.invites.enabled:
+                m = INVITE_RE.search(lowered)
+                if m:
+                    return self.invites.verdict("invite", m.group(0))
+            if self.links.enabled:
+                for m in URL_RE.finditer(lowered):
+                    host = m.group(1)
+                    if _domain_in(host, self.link_deny):
+                        return self.links.verdict("link", host)
+                    if self.block_unknown and not _domain_in(host, self.link_allow):
+                        return self.links.verdict("link", host)
+
+        if self.words.enabled:
+            if self.word_set:
+                for tok in TOKEN_RE.findall(lowered):
+                    if tok in self.word_set:
+                        return self.words.verdict("word", tok)
+            if self.phrase_re is not None:
+                m = self.phrase_re.search(lowered)
+                if m:
+                    return self.words.verdict("word", m.group(0))
+
+        if self.caps.enabled and len(content) >= self.caps_min_len:
+            letters = sum(1 for c in content if c.isalpha())
+            if letters and sum(1 for c in content if c.isupper()) / letters >= self.caps_ratio:
+                return self.caps.verdict("caps", "")
+        return None
+
+
+class RuleEngine(WatchedFile):
+    """Loads rules.json and keeps it up to date while the bot runs."""
+
+    watch_name = "moderation rules"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = None
+        self.rules = CompiledRules({})
+        self._watcher = None
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding="utf-8") as f:
+            cfg = json.load(f)
+        return mtime, CompiledRules(cfg)
+
+    def _apply(self, loaded):
+        self._mtime, self.rules = loaded
+
+    def load(self) -> bool:
+        """Load synchronously (at startup). Keeps the old rules if the file is broken."""
+        try:
+            self._apply(self._load())
+            logger.info(f"Loaded moderation rules from {self.path}")
+            return True
+        except FileNotFoundError:
+            logger.warning(f"No rules file {self.path}, using defaults.")
+        except Exception as e:
+            logger.exception("Loading rules failed: %s", e)
+        return False
+
+    def check(self, message) -> Optional[Verdict]:
+        return self.rules.check(message.content, len(message.raw_mentions) + len(message.raw_role_mentions))
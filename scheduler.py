@@ -0,0 +1,274 @@
+# scheduler.py - persistent timed jobs (timed unlocks, slowmode resets, ticket auto-close, reminders)
+#
+# Jobs are rows in a local SQLite database (WAL, one thread, like
+# ticketstore.py), so they survive restarts. All pending jobs are also kept in
+# memory: a dict by id and a heap of (due, id). There is no task per job, only
+# one loop.call_later timer for the earliest job. Scheduling pushes on the heap
+# (O(log n)) and re-arms the timer only when the new job is the earliest;
+# cancelling removes the job from the dict and its heap entry is skipped when it
+# comes up. The timer pops every job that is due, runs its handler as a task and
+# re-arms for the next one. Timers sleep at most `max_sleep` seconds, so a wall
+# clock change is noticed.
+#
+# Database writes are queued and written in one transaction per loop iteration,
+# so scheduling never waits for the disk. Ids are handed out in memory
+# (max id + 1 at load). A handler that fails with a network or 5xx error is
+# retried after `retry_delay` seconds, at most `attempts` times in total.
+
+import asyncio
+import heapq
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from background import open_db
+
+logger = logging.getLogger("moana_bot")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    due         REAL NOT NULL,
+    guild_id    INTEGER,
+    channel_id  INTEGER,
+    user_id     INTEGER,
+    params      TEXT,
+    key         TEXT UNIQUE,
+    tries       INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (due);
+"""
+
+
+class ScheduledJob:
+    __slots__ = ("id", "kind", "due", "guild_id", "channel_id", "user_id", "params", "key", "tries", "created_at")
+
+    def __init__(self, id: int, kind: str, due: float, guild_id: Optional[int] = None, channel_id: Optional[int] = None,
+                 user_id: Optional[int] = None, params: Optional[dict] = None, key: Optional[str] = None,
+                 tries: int = 0, created_at: float = 0.0):
+        self.id = id
+        self.kind = kind
+        self.due = due                # unix time
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.params = params
+        self.key = key                # unique name, scheduling the same key replaces the job
+        self.tries = tries
+        self.created_at = created_at
+
+    def row(self) -> tuple:
+        return (self.id, self.kind, self.due, self.guild_id, self.channel_id, self.user_id,
+                json.dumps(self.params) if self.params is not None else None, self.key, self.tries, self.created_at)
+
+
+class Scheduler:
+    def __init__(self, path: str, max_sleep: float = 300.0, retry_delay: float = 60.0, attempts: int = 3,
+                 clock=time.time):
+        self.path = path
+        self.max_sleep = max_sleep
+        self.retry_delay = retry_delay
+        self.attempts = attempts
+        self.clock = clock
+        self.handlers = {}         # kind -> async fn(job)
+        self.fired = 0
+        self._jobs = {}            # id -> ScheduledJob (pending)
+        self._heap = []            # (due, id), may hold cancelled/rescheduled entries
+        self._keys = {}            # key -> id
+        self._counts = Counter()   # (kind, user_id) -> pending jobs
+        self._next_id = 1
+        self._writes = []          # (sql, params) not written yet
+        self._flush_handle = None
+        self._timer = None
+        self._timer_at = None      # clock time the timer fires
+        self._loop = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scheduler")
+        self._db = None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    # database (executor thread) -------------------------------------------------
+
+    def _conn(self):
+        if self._db is None:
+            self._db = open_db(self.path, SCHEMA)
+        return self._db
+
+    def _load(self) -> list:
+        rows = self._conn().execute("SELECT id, kind, due, guild_id, channel_id, user_id, params, key, tries, "
+                                    "created_at FROM jobs").fetchall()
+        return [ScheduledJob(*row[:6], json.loads(row[6]) if row[6] else None, *row[7:]) for row in rows]
+
+    def _write(self, batch):
+        try:
+            with self._conn() as db:
+                for sql, params in batch:
+                    if isinstance(params, list):
+                        db.executemany(sql, params)
+                    else:
+                        db.execute(sql, params)
+        except Exception as e:
+            logger.exception("Writing %d scheduler changes failed: %s", len(batch), e)
+
+    def _queue(self, sql: str, params):
+        self._writes.append((sql, params))
+        if self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._submit_writes()  # no loop (startup, scripts): write right away
+                return
+            self._flush_handle = loop.call_soon(self._submit_writes)
+
+    def _submit_writes(self):
+        self._flush_handle = None
+        batch, self._writes = self._writes, []
+        if batch:
+            self._executor.submit(self._write, batch)
+
+    async def flush(self):
+        """Wait until every queued change is on disk."""
+        self._submit_writes()
+        await asyncio.get_running_loop().run_in_executor(self._executor, lambda: None)
+
+    # jobs -----------------------------------------------------------------------
+
+    def load(self) -> int:
+        """Load the pending jobs (blocking, at startup). Returns the amount."""
+        jobs = self._executor.submit(self._load).result()
+        self._jobs = {job.id: job for job in jobs}
+        self._heap = [(job.due, job.id) for job in jobs]
+        heapq.heapify(self._heap)
+        self._keys = {job.key: job.id for job in jobs if job.key}
+        self._counts = Counter((job.kind, job.user_id) for job in jobs)
+        self._next_id = max(self._jobs, default=0) + 1
+        logger.info(f"Loaded {len(jobs)} scheduled jobs from {self.path}")
+        return len(jobs)
+
+    def start(self):
+        """Arm the timer (safe to call on every on_ready). Jobs that came due while the bot was off run now."""
+        self._loop = asyncio.get_running_loop()
+        self._arm()
+
+    def register(self, kind: str, fn):
+        """fn(job) is awaited when a job of this kind is due."""
+        self.handlers[kind] = fn
+
+    def get(self, key: str) -> Optional[ScheduledJob]:
+        job_id = self._keys.get(key)
+        return self._jobs.get(job_id) if job_id is not None else None
+
+    def count(self, kind: str, user_id: int) -> int:
+        return self._counts[(kind, user_id)]
+
+    def pending(self, kind: Optional[str] = None, guild_id: Optional[int] = None) -> list:
+        """Pending jobs, earliest first (a full scan, for listings)."""
+        jobs = [j for j in self._jobs.values()
+                if (kind is None or j.kind == kind) and (guild_id is None or j.guild_id == guild_id)]
+        return sorted(jobs, key=lambda j: j.due)
+
+    def schedule(self, kind: str, due: float, guild_id: Optional[int] = None, channel_id: Optional[int] = None,
+                 user_id: Optional[int] = None, params: Optional[dict] = None, key: Optional[str] = None,
+                 tries: int = 0) -> ScheduledJob:
+        """Add a job that runs at `due` (unix time). A pending job with the same key is replaced."""
+        if key is not None and self._remove(self._keys.get(key)) is not None:
+            self._compact()
+        job = ScheduledJob(self._next_id, kind, due, guild_id, channel_id, user_id, params, key, tries, self.clock())
+        self._next_id += 1
+        self._add(job)
+        # the replaced job (if any) is gone with the key
+        self._queue("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", job.row())
+        return job
+
+    def schedule_in(self, kind: str, seconds: float, **kwargs) -> ScheduledJob:
+        return self.schedule(kind, self.clock() + seconds, **kwargs)
+
+    def cancel(self, key: str) -> bool:
+        """Cancel the pending job with this key. Returns False when there was none."""
+        job = self._remove(self._keys.get(key))
+        if job is None:
+            return False
+        self._queue("DELETE FROM jobs WHERE id = ?", (job.id,))
+        self._compact()
+        return True
+
+    def _add(self, job: ScheduledJob):
+        self._jobs[job.id] = job
+        if job.key is not None:
+            self._keys[job.key] = job.id
+        self._counts[(job.kind, job.user_id)] += 1
+        heapq.heappush(self._heap, (job.due, job.id))
+        if self._loop is not None and (self._timer_at is None or job.due < self._timer_at):
+            self._arm()
+
+    def _remove(self, job_id) -> Optional[ScheduledJob]:
+        job = self._jobs.pop(job_id, None) if job_id is not None else None
+        if job is None:
+            return None
+        if job.key is not None and self._keys.get(job.key) == job.id:
+            del self._keys[job.key]
+        counts = self._counts
+        counts[(job.kind, job.user_id)] -= 1
+        if not counts[(job.kind, job.user_id)]:
+            del counts[(job.kind, job.user_id)]
+        return job
+
+    def _compact(self):
+        # the heap entries of removed jobs stay until they come up; rebuild when most of the heap is dead
+        if len(self._heap) > 1024 and len(self._heap) > 2 * len(self._jobs):
+            self._heap = [(j.due, j.id) for j in self._jobs.values()]
+            heapq.heapify(self._heap)
+
+    # timer ----------------------------------------------------------------------
+
+    def _arm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = self._timer_at = None
+        heap, jobs = self._heap, self._jobs
+        while heap and heap[0][1] not in jobs:
+            heapq.heappop(heap)
+        if not heap:
+            return
+        now = self.clock()
+        delay = min(self.max_sleep, max(0.0, heap[0][0] - now))
+        self._timer_at = now + delay
+        self._timer = self._loop.call_later(delay, self._fire)
+
+    def _fire(self):
+        self._timer = self._timer_at = None
+        now = self.clock()
+        heap, jobs = self._heap, self._jobs
+        due = []
+        while heap and heap[0][0] <= now:
+            _, job_id = heapq.heappop(heap)
+            if job_id in jobs:
+                due.append(self._remove(job_id))
+        if due:
+            self._queue("DELETE FROM jobs WHERE id = ?", [(job.id,) for job in due])
+            for job in due:
+                self._loop.create_task(self._execute(job))
+        self._arm()
+
+    async def _execute(self, job: ScheduledJob):
+        self.fired += 1
+        fn = self.handlers.get(job.kind)
+        if fn is None:
+            logger.warning(f"No handler for scheduled job {job.id} ({job.kind}), dropped")
+            return
+        try:
+            await fn(job)
+        except Exception as e:
+            status = getattr(e, "status", None)
+            if (status is None or status >= 500) and job.tries + 1 < self.attempts:
+                logger.warning(f"Scheduled job {job.id} ({job.kind}) failed, retrying in {self.retry_delay:.0f}s: {e}")
+                self.schedule(job.kind, self.clock() + self.retry_delay, job.guild_id, job.channel_id, job.user_id,
+                              job.params, job.key, job.tries + 1)
+            else:
+                logger.exception("Scheduled job %s (%s) failed: %s", job.id, job.kind, e)
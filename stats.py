@@ -0,0 +1,220 @@
+# stats.py - handler latency, event loop lag and REST counters
+#
+# Stats.install(bot) wraps every handler registered with @bot.event,
+# @bot.slash_command or through a cog in a timer, counts REST requests per
+# route and catches the rate limit warnings of nextcord. Timings go into small
+# ring buffers, so a record is two perf_counter calls and an array store.
+# Percentiles are only computed when someone asks for them (/stats or the
+# prometheus export).
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from array import array
+
+from botlog import ctx
+
+logger = logging.getLogger("moana_bot")
+
+
+class Histogram:
+    """Last `size` samples (ms) plus running count/total/max."""
+
+    __slots__ = ("samples", "idx", "count", "total", "max")
+
+    def __init__(self, size: int = 1024):
+        self.samples = array("d", bytes(8 * size))
+        self.idx = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        samples = self.samples
+        samples[self.idx] = ms
+        self.idx = (self.idx + 1) % len(samples)
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentiles(self, *qs: float) -> list:
+        n = min(self.count, len(self.samples))
+        if not n:
+            return [0.0 for _ in qs]
+        data = sorted(self.samples[:n])
+        return [data[min(n - 1, int(q * n))] for q in qs]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class _RateLimitCounter(logging.Handler):
+    """Counts the rate limit warnings of nextcord.http: 'We are being rate limited' for every 429,
+    followed by 'Global rate limit has been hit' when the 429 was global."""
+
+    def __init__(self, stats):
+        super().__init__(logging.WARNING)
+        self.stats = stats
+
+    def emit(self, record):
+        msg = str(record.msg)
+        if "rate limited" in msg:
+            self.stats.rate_limits += 1
+        elif "Global rate limit" in msg:
+            self.stats.global_rate_limits += 1
+
+
+class Stats:
+    def __init__(self, slow_ms: float = 2000.0):
+        self.handlers = {}     # name -> Histogram
+        self.errors = {}       # name -> count
+        self.rest_calls = {}   # "METHOD /path" -> count
+        self.rest_total = 0
+        self.rate_limits = 0
+        self.global_rate_limits = 0  # also counted in rate_limits
+        self.loop_lag = Histogram()
+        self.slow_ms = slow_ms
+        self.started = time.time()
+        self._tasks = []
+
+    def histogram(self, name: str) -> Histogram:
+        h = self.handlers.get(name)
+        if h is None:
+            h = self.handlers[name] = Histogram()
+        return h
+
+    def timed(self, name: str):
+        """Decorator for async handlers. Keeps the signature (slash options still work)."""
+        def deco(func):
+            hist = self.histogram(name)
+            perf = time.perf_counter
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                t0 = perf()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    self.errors[name] = self.errors.get(name, 0) + 1
+                    raise
+                finally:
+                    ms = (perf() - t0) * 1000
+                    hist.add(ms)
+                    if ms > self.slow_ms:
+                        self._log_slow(name, ms, args)
+            return wrapper
+        return deco
+
+    def _log_slow(self, name: str, ms: float, args):
+        obj = next((a for a in args if hasattr(a, "guild")), None)
+        logger.warning(f"Slow handler {name}: {ms:.0f}ms", extra=ctx(obj, handler=name, latency_ms=round(ms, 1)))
+
+    def install(self, bot):
+        """Make bot.event / bot.slash_command / bot.add_cog register timed handlers and count REST calls."""
+        orig_event = bot.event
+        orig_slash = bot.slash_command
+        orig_add_cog = bot.add_cog
+
+        def event(coro):
+            return orig_event(self.timed(f"event.{coro.__name__}")(coro))
+
+        def slash_command(*args, **kwargs):
+            register = orig_slash(*args, **kwargs)
+
+            def deco(func):
+                return register(self.timed(f"cmd.{kwargs.get('name') or func.__name__}")(func))
+            return deco
+
+        def time_commands(cmds, prefix: str):
+            for cmd in cmds:
+                if getattr(cmd, "children", None):  # group: only the subcommands have a callback
+                    time_commands(cmd.children.values(), f"{prefix}{cmd.name} ")
+                elif not hasattr(cmd.callback, "__wrapped__"):  # already timed (extension reload)
+                    cmd.callback = self.timed(f"{prefix}{cmd.name}")(cmd.callback)
+
+        def add_cog(cog, *args, **kwargs):
+            time_commands(cog.application_commands, "cmd.")
+            return orig_add_cog(cog, *args, **kwargs)
+
+        bot.event = event
+        bot.slash_command = slash_command
+        bot.add_cog = add_cog
+
+        orig_request = bot.http.request
+
+        async def request(route, **kwargs):
+            key = f"{route.method} {route.path}"
+            self.rest_calls[key] = self.rest_calls.get(key, 0) + 1
+            self.rest_total += 1
+            return await orig_request(route, **kwargs)
+
+        bot.http.request = request
+        logging.getLogger("nextcord.http").addHandler(_RateLimitCounter(self))
+
+    async def _lag_loop(self, interval: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.add(max(0.0, (loop.time() - t0 - interval) * 1000))
+
+    async def _export_loop(self, path: str, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self._write_prometheus, path, self.prometheus())
+            except Exception as e:
+                logger.exception("Writing metrics failed: %s", e)
+
+    @staticmethod
+    def _write_prometheus(path: str, text: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)  # atomic for the textfile collector
+
+    def start(self, lag_interval: float = 0.5, export_path: str = None, export_interval: float = 15.0):
+        """Start the loop lag probe (and the prometheus export). Safe to call on every on_ready."""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self._lag_loop(lag_interval)))
+        if export_path:
+            self._tasks.append(loop.create_task(self._export_loop(export_path, export_interval)))
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines = [
+            "# TYPE moana_handler_latency_ms summary",
+        ]
+        for name, h in sorted(self.handlers.items()):
+            p50, p95, p99 = h.percentiles(0.5, 0.95, 0.99)
+            for q, v in (("0.5", p50), ("0.95", p95), ("0.99", p99)):
+                lines.append(f'moana_handler_latency_ms{{handler="{name}",quantile="{q}"}} {v:.3f}')
+            lines.append(f'moana_handler_latency_ms_sum{{handler="{name}"}} {h.total:.3f}')
+            lines.append(f'moana_handler_latency_ms_count{{handler="{name}"}} {h.count}')
+        lines.append("# TYPE moana_handler_errors_total counter")
+        for name, n in sorted(self.errors.items()):
+            lines.append(f'moana_handler_errors_total{{handler="{name}"}} {n}')
+        p50, p99 = self.loop_lag.percentiles(0.5, 0.99)
+        lines += [
+            "# TYPE moana_loop_lag_ms gauge",
+            f'moana_loop_lag_ms{{quantile="0.5"}} {p50:.3f}',
+            f'moana_loop_lag_ms{{quantile="0.99"}} {p99:.3f}',
+            f'moana_loop_lag_ms{{quantile="1"}} {self.loop_lag.max:.3f}',
+            "# TYPE moana_rest_requests_total counter",
+        ]
+        for key, n in sorted(self.rest_calls.items()):
+            method, path = key.split(" ", 1)
+            lines.append(f'moana_rest_requests_total{{method="{method}",route="{path}"}} {n}')
+        lines += [
+            "# TYPE moana_rate_limits_total counter",
+            f"moana_rate_limits_total {self.rate_limits}",
+            "# TYPE moana_global_rate_limits_total counter",
+            f"moana_global_rate_limits_total {self.global_rate_limits}",
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,121 @@
+# ticketstore.py - persistent ticket state (SQLite)
+#
+# Tickets are stored in a local SQLite database in WAL mode. All database work
+# runs on one dedicated thread, so the event loop never waits on disk and the
+# connection is only used from the thread that created it. Open tickets are
+# also kept in memory, indexed by channel and by (guild, owner), so the
+# "does this member already have a ticket" check and the button callbacks
+# never touch the database.
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from background import open_db
+
+logger = logging.getLogger("moana_bot")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id  INTEGER PRIMARY KEY,
+    guild_id    INTEGER NOT NULL,
+    owner_id    INTEGER NOT NULL,
+    claimer_id  INTEGER,
+    status      TEXT NOT NULL DEFAULT 'open',
+    created_at  REAL NOT NULL,
+    claimed_at  REAL,
+    closed_at   REAL
+);
+CREATE INDEX IF NOT EXISTS tickets_owner ON tickets (guild_id, owner_id, status);
+"""
+
+
+class Ticket(NamedTuple):
+    channel_id: int
+    guild_id: int
+    owner_id: int
+    claimer_id: Optional[int]
+    status: str
+    created_at: float
+    claimed_at: Optional[float]
+    closed_at: Optional[float]
+
+
+class TicketStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ticketstore")
+        self._db = None
+        self._by_channel = {}  # channel_id -> Ticket (open tickets only)
+        self._by_owner = {}    # (guild_id, owner_id) -> channel_id
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connect(self):
+        return open_db(self.path, SCHEMA)
+
+    def _load_open(self):
+        if self._db is None:
+            self._db = self._connect()
+        rows = self._db.execute("SELECT * FROM tickets WHERE status != 'closed'").fetchall()
+        return [Ticket(*row) for row in rows]
+
+    async def load(self) -> int:
+        """Open the database and load all open tickets in one query. Returns the amount."""
+        tickets = await self._run(self._load_open)
+        self._by_channel = {t.channel_id: t for t in tickets}
+        self._by_owner = {(t.guild_id, t.owner_id): t.channel_id for t in tickets}
+        logger.info(f"Loaded {len(tickets)} open tickets from {self.path}")
+        return len(tickets)
+
+    def _execute(self, sql: str, params: tuple):
+        with self._db:
+            self._db.execute(sql, params)
+
+    # lookups (memory only) ----------------------------------------------------
+
+    def get(self, channel_id: int) -> Optional[Ticket]:
+        return self._by_channel.get(channel_id)
+
+    def open_for(self, guild_id: int, owner_id: int) -> Optional[int]:
+        """Channel id of the open ticket of a member, or None."""
+        return self._by_owner.get((guild_id, owner_id))
+
+    def open_tickets(self):
+        return list(self._by_channel.values())
+
+    # changes (memory first, then the database) --------------------------------
+
+    async def create(self, channel_id: int, guild_id: int, owner_id: int) -> Ticket:
+        t = Ticket(channel_id, guild_id, owner_id, None, "open", time.time(), None, None)
+        self._by_channel[channel_id] = t
+        self._by_owner[(guild_id, owner_id)] = channel_id
+        await self._run(self._execute,
+                        "INSERT OR REPLACE INTO tickets (channel_id, guild_id, owner_id, status, created_at) "
+                        "VALUES (?, ?, ?, 'open', ?)", (channel_id, guild_id, owner_id, t.created_at))
+        return t
+
+    async def claim(self, channel_id: int, claimer_id: int) -> Optional[Ticket]:
+        t = self._by_channel.get(channel_id)
+        if t is None:
+            return None
+        t = self._by_channel[channel_id] = t._replace(claimer_id=claimer_id, status="claimed", claimed_at=time.time())
+        await self._run(self._execute,
+                        "UPDATE tickets SET claimer_id = ?, status = 'claimed', claimed_at = ? WHERE channel_id = ?",
+                        (claimer_id, t.claimed_at, channel_id))
+        return t
+
+    async def close(self, channel_id: int) -> Optional[Ticket]:
+        t = self._by_channel.pop(channel_id, None)
+        if t is None:
+            return None
+        if self._by_owner.get((t.guild_id, t.owner_id)) == channel_id:
+            del self._by_owner[(t.guild_id, t.owner_id)]
+        t = t._replace(status="closed", closed_at=time.time())
+        await self._run(self._execute,
+                        "UPDATE tickets SET status = 'closed', closed_at = ? WHERE channel_id = ?",
+                        (t.closed_at, channel_id))
+        return t
@@ -0,0 +1,184 @@
+# transcripts.py - streaming ticket transcripts
+#
+# channel.history is consumed page by page. Every page is formatted into one
+# chunk and written from a worker thread while the next page is fetched, so the
+# event loop never blocks on disk I/O and memory stays flat no matter how long
+# the ticket is. Output formats are pluggable (txt, jsonl, html), gzip optional.
+
+import asyncio
+import gzip
+import html
+import json
+import logging
+import os
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger("moana_bot")
+
+PAGE_SIZE = 100  # discord returns history in pages of 100
+
+
+class TranscriptSummary(NamedTuple):
+    path: str
+    messages: int
+    bytes: int
+
+
+class TextFormat:
+    """One line per message: [time] author (id): content"""
+    ext = "txt"
+
+    def header(self, channel) -> str:
+        return ""
+
+    def message(self, m) -> str:
+        t = m.created_at.strftime("%Y-%m-%d %H:%M:%S")
+        content = m.content.replace("\n", " ")
+        return f"[{t}] {m.author} ({m.author.id}): {content}\n"
+
+    def footer(self, count: int) -> str:
+        return ""
+
+
+class JsonlFormat(TextFormat):
+    """One JSON object per line, easy to load in other tools."""
+    ext = "jsonl"
+
+    def message(self, m) -> str:
+        return json.dumps({
+            "id": m.id,
+            "time": m.created_at.isoformat(),
+            "author": str(m.author),
+            "author_id": m.author.id,
+            "content": m.content,
+            "attachments": [a.url for a in getattr(m, "attachments", ())],
+        }, ensure_ascii=False) + "\n"
+
+
+class HtmlFormat(TextFormat):
+    """Self-contained HTML page (inline css, no external assets)."""
+    ext = "html"
+
+    def header(self, channel) -> str:
+        name = html.escape(str(channel.name))
+        return ("<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+                f"<title>Transcript #{name}</title><style>"
+                "body{font-family:sans-serif;background:#36393f;color:#dcddde;margin:2em}"
+                ".m{margin:.3em 0}.t{color:#72767d;font-size:.8em;margin-right:.5em}"
+                ".a{color:#3498db;font-weight:bold;margin-right:.5em}.c{white-space:pre-wrap}"
+                f"</style></head><body><h2>#{name}</h2>\n")
+
+    def message(self, m) -> str:
+        t = m.created_at.strftime("%Y-%m-%d %H:%M:%S")
+        links = "".join(f' <a href="{html.escape(a.url)}">[bijlage]</a>' for a in getattr(m, "attachments", ()))
+        return (f'<div class="m"><span class="t">{t}</span>'
+                f'<span class="a">{html.escape(str(m.author))}</span>'
+                f'<span class="c">{html.escape(m.content)}</span>{links}</div>\n')
+
+    def footer(self, count: int) -> str:
+        return f"<p class=\"t\">{count} berichten</p></body></html>\n"
+
+
+FORMATS = {
+    "txt": TextFormat(),
+    "jsonl": JsonlFormat(),
+    "html": HtmlFormat(),
+}
+
+
+class _ThreadedWriter:
+    """File writer that runs every blocking call in the default executor.
+    At most one write is in flight, which gives natural back-pressure."""
+
+    def __init__(self, path: str, compress: bool):
+        self.path = path
+        self.compress = compress
+        self._f = None
+        self._pending = None
+        self.bytes = 0
+
+    def _open(self):
+        if self.compress:
+            return gzip.open(self.path, "wt", encoding="utf-8")
+        return open(self.path, "w", encoding="utf-8")
+
+    async def open(self):
+        self._f = await asyncio.to_thread(self._open)
+
+    async def write(self, chunk: str):
+        if not chunk:
+            return
+        if self._pending is not None:
+            await self._pending
+        self.bytes += len(chunk.encode("utf-8"))
+        self._pending = asyncio.ensure_future(asyncio.to_thread(self._f.write, chunk))
+
+    async def close(self):
+        try:
+            if self._pending is not None:
+                await self._pending
+        finally:
+            if self._f is not None:
+                await asyncio.to_thread(self._f.close)
+
+
+class TranscriptWriter:
+    """Appends batches of messages to a transcript file as they come in (purge archives)."""
+
+    def __init__(self, path: str, fmt: str = "jsonl", compress: bool = True):
+        self.path = path
+        self.formatter = FORMATS[fmt]
+        self.count = 0
+        self._writer = _ThreadedWriter(path, compress)
+
+    async def open(self, channel):
+        await self._writer.open()
+        await self._writer.write(self.formatter.header(channel))
+
+    async def write(self, messages):
+        await self._writer.write("".join(self.formatter.message(m) for m in messages))
+        self.count += len(messages)
+
+    async def close(self) -> TranscriptSummary:
+        try:
+            await self._writer.write(self.formatter.footer(self.count))
+        finally:
+            await self._writer.close()
+        return TranscriptSummary(self.path, self.count, self._writer.bytes)
+
+
+async def save_transcript(channel, fmt: str = "txt", compress: bool = False,
+                          limit: Optional[int] = None, folder: str = "transcripts") -> Optional[TranscriptSummary]:
+    """Stream the history of a channel to the transcripts folder.
+    Returns a summary (path, message count, uncompressed bytes) or None on failure."""
+    try:
+        formatter = FORMATS[fmt]
+        # the guild id goes in the name, so a transcript that was never indexed can still be filed (archive.py)
+        guild = getattr(channel, "guild", None)
+        filename = (f"{guild.id}_" if guild else "") + \
+            f"{channel.name}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{formatter.ext}"
+        if compress:
+            filename += ".gz"
+        path = os.path.join(folder, filename)
+        writer = _ThreadedWriter(path, compress)
+        await writer.open()
+        count = 0
+        try:
+            await writer.write(formatter.header(channel))
+            page = []
+            async for m in channel.history(limit=limit, oldest_first=True):
+                page.append(formatter.message(m))
+                count += 1
+                if len(page) >= PAGE_SIZE:
+                    await writer.write("".join(page))
+                    page = []
+            await writer.write("".join(page))
+            await writer.write(formatter.footer(count))
+        finally:
+            await writer.close()
+        logger.info(f"Saved transcript {filename} ({count} messages, {writer.bytes} bytes)")
+        return TranscriptSummary(path, count, writer.bytes)
+    except Exception as e:
+        logger.exception("save_transcript failed: %s", e)
+        return None